@@ -380,7 +380,7 @@ class SeriesOfSymtabPictures (gdb.Command):
     class SnapshotBreakpoint(gdb.Breakpoint):
         
         def stop(self):
-            from symtab import produce_dot
+            from symtab import produce_dot_async
 
             tab = build_gdb_symbol_table()
             
@@ -392,10 +392,10 @@ class SeriesOfSymtabPictures (gdb.Command):
             only_ref_to_f = self.cmd.only_ref_to_f
 
             print("Producing image number {:03}".format(self.cmd.filenum))
-            produce_dot (tab.dot_data (only_orders = only_orders,
-                                       clones = clones,
-                                       only_ref_to_f = True),
-                         filename = filename)
+            produce_dot_async (tab.dot_data (only_orders = only_orders,
+                                             clones = clones,
+                                             only_ref_to_f = True),
+                               filename = filename)
             self.cmd.filenum = self.cmd.filenum + 1
             return False
             return False
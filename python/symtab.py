@@ -5,7 +5,13 @@
 # target, of course).
 
 import sys
+import os
 import re
+from array import array
+from collections import deque
+from symtab_names import NameIndex
+from symtab_analysis import CallGraphAnalysis, is_root
+from symtab_forest import SymbolForest
 
 class Symbol(object):
     """Symbol table symbol"""
@@ -33,6 +39,16 @@ class Symbol(object):
     def __str__(self):
         return "%s/%i" % (self.name, self.order)
 
+    @property
+    def visibility_mask (self):
+        """Bitmask of visibility words in terms of visibility_words"""
+        return visibility_words.mask (self.visibility)
+
+    @property
+    def flags_mask (self):
+        """Bitmask of function or varpool flags in terms of flag_words"""
+        return flag_words.mask (self.attrs)
+
     def fixup (self):
         """Fixup data after the whole symtab is loaded."""
 
@@ -51,9 +67,19 @@ class Function (Symbol):
         self.is_thunk = False
         self.attrs = ""
 
+        # Execution count from the function flags, -1 if not dumped,
+        # and the quality of the profile it comes from
+        self.count = -1
+        self.count_quality = ""
+
         self.callers_orders = []
         self.callees_orders = []
 
+        # Profile data of edges to callees, parallel to callees_orders
+        self.callees_counts = []
+        self.callees_freqs = []
+        self.callees_edge_flags = []
+
         self.callers = []
         self.callees = []
         self.clones = []
@@ -87,11 +113,7 @@ class Function (Symbol):
         return
 
     def get_origin (self):
-        f = self
-        while f.is_clone:
-            f = f.clone_of
-            pass
-        return f
+        return self.symtable.forest ().origin (self)
         
 
     pass
@@ -120,14 +142,247 @@ class Symtab(object):
         for f in self.all_symbols:
             f.fixup()
             pass
+        self.cached_forest = SymbolForest (self)
         return
 
-    def dot_data(self, only_orders=False, clones=False, only_ref_to_f=False):
-        """Produce output suitable as input for dot describing symtab"""
+    def name_order_pairs(self):
+        """Return iterable of (name, order) pairs of all symbols"""
+        return [(s.name, s.order) for s in self.all_symbols]
+
+    def symbol_links(self):
+        """Return all symbols and their clone_of and inlined_to links.
+
+        The result is a tuple of a sequence of all symbols, a function
+        returning the position in it of the symbol with a given order
+        and arrays of positions of clone_of and inlined_to of every
+        symbol, -1 where there is none."""
+
+        symbols = list (self.all_symbols)
+        index_of = {}
+        for (i, s) in enumerate (symbols):
+            index_of[s.order] = i
+            pass
+
+        n = len (symbols)
+        clone_parents = array ("l", [-1]) * n
+        inline_parents = array ("l", [-1]) * n
+        for (i, s) in enumerate (symbols):
+            if getattr (s, "is_clone", False):
+                clone_parents[i] = index_of[s.clone_of_order]
+                pass
+            if getattr (s, "is_inlined", False):
+                inline_parents[i] = index_of[s.inlined_to_order]
+                pass
+            pass
+        return (symbols, index_of.__getitem__, clone_parents, inline_parents)
+
+    def call_graph(self):
+        """Return the call graph of all functions in CSR form.
+
+        The result is a tuple of a sequence of all functions, a function
+        returning the position in it of the function with a given order,
+        a list of positions of functions which may be called from
+        outside the unit and arrays of offsets, targets, counts and
+        frequencies of edges, those of function I being between
+        offsets[I] and offsets[I+1]."""
+
+        functions = list (self.all_functions)
+        index_of = {}
+        for (i, f) in enumerate (functions):
+            index_of[f.order] = i
+            pass
+
+        offsets = array ("l", [0])
+        targets = array ("l")
+        counts = array ("l")
+        freqs = array ("d")
+        for f in functions:
+            orders = f.callees_orders
+            fcounts = getattr (f, "callees_counts", [])
+            ffreqs = getattr (f, "callees_freqs", [])
+            if len (fcounts) != len (orders) or len (ffreqs) != len (orders):
+                fcounts = ffreqs = [0] * len (orders)
+                pass
+            for (o, count, freq) in zip (orders, fcounts, ffreqs):
+                j = index_of.get (o)
+                if j is not None:
+                    targets.append (j)
+                    counts.append (count)
+                    freqs.append (freq)
+                    pass
+                pass
+            offsets.append (len (targets))
+            pass
+        roots = [i for (i, f) in enumerate (functions) if is_root (f)]
+        return (functions, index_of.__getitem__, roots, offsets, targets,
+                counts, freqs)
+
+    def name_index(self):
+        """Return NameIndex of the table, building it on first use.
+
+        It must only be used once the table is completely loaded."""
+
+        index = getattr (self, "cached_name_index", None)
+        if index is None:
+            index = NameIndex (self)
+            self.cached_name_index = index
+            pass
+        return index
+
+    def forest(self):
+        """Return SymbolForest of the table, building it on first use.
+
+        Tables loaded by fixup() have it built already, otherwise it
+        must only be used once the table is completely loaded."""
+
+        forest = getattr (self, "cached_forest", None)
+        if forest is None:
+            forest = SymbolForest (self)
+            self.cached_forest = forest
+            pass
+        return forest
+
+    def call_graph_analysis(self):
+        """Return CallGraphAnalysis of the table, computing it on first use.
+
+        It must only be used once the table is completely loaded."""
+
+        analysis = getattr (self, "cached_call_graph_analysis", None)
+        if analysis is None:
+            analysis = CallGraphAnalysis (self)
+            self.cached_call_graph_analysis = analysis
+            pass
+        return analysis
+
+    def select(self, kind=None, visibility=(), not_visibility=(), flags=(),
+               not_flags=(), inlined=None, clone=None, thunk=None):
+        """Return list of symbols with the given properties, in order.
+
+        KIND is "function" or "variable" to select only symbols of
+        that kind.  Symbols must have all words in VISIBILITY and FLAGS
+        and none of NOT_VISIBILITY and NOT_FLAGS in their visibility and
+        function or varpool flags.  INLINED, CLONE and THUNK, unless
+        None, require the corresponding property to be true or false.
+        E.g. select ("function", ["public", "comdat"], inlined=False)."""
+
+        if kind == "function":
+            syms = self.all_functions
+        elif kind == "variable":
+            syms = self.all_variables
+        else:
+            syms = self.all_symbols
+            pass
+        want_vis = visibility_words.mask (list (visibility))
+        bad_vis = visibility_words.mask (list (not_visibility))
+        want_flags = flag_words.mask (list (flags))
+        bad_flags = flag_words.mask (list (not_flags))
+        props = [(attr, val) for (attr, val) in [("is_inlined", inlined),
+                                                ("is_clone", clone),
+                                                ("is_thunk", thunk)]
+                 if val is not None]
+        r = []
+        for s in syms:
+            m = s.visibility_mask
+            if m & want_vis != want_vis or m & bad_vis:
+                continue
+            m = s.flags_mask
+            if m & want_flags != want_flags or m & bad_flags:
+                continue
+            if [a for (a, val) in props if getattr (s, a, False) != val]:
+                continue
+            r.append (s)
+            pass
+        r.sort (key=lambda s: s.order)
+        return r
+
+    def neighborhood(self, seeds, hops, kinds=("calls", "references", "clones"),
+                     direction="both"):
+        """Return set of orders of symbols at most HOPS edges from SEEDS.
+
+        SEEDS is a list of symbols.  KINDS are the kinds of edges to
+        follow, any of "calls", "references", "clones" and "inlines"
+        (from functions to their inline copies).  DIRECTION is "out" to
+        only follow edges from callers, referring symbols and clone
+        origins, "in" to only follow them backwards and "both" for
+        both."""
+
+        forward = direction in ("out", "both")
+        backward = direction in ("in", "both")
+        seen = set ([s.order for s in seeds])
+        queue = deque ([(s, 0) for s in seeds])
+        while queue:
+            (s, d) = queue.popleft ()
+            if d >= hops:
+                continue
+            nbrs = []
+            if "references" in kinds:
+                if forward:
+                    nbrs.extend (s.references)
+                if backward:
+                    nbrs.extend (s.referring)
+                pass
+            if isinstance (s, Function):
+                if "calls" in kinds:
+                    if forward:
+                        nbrs.extend (s.callees)
+                    if backward:
+                        nbrs.extend (s.callers)
+                    pass
+                if "clones" in kinds:
+                    if forward:
+                        nbrs.extend (s.clones)
+                    if backward and s.is_clone:
+                        nbrs.append (s.clone_of)
+                    pass
+                if "inlines" in kinds:
+                    if forward:
+                        nbrs.extend (s.inlinees)
+                    if backward and s.is_inlined:
+                        nbrs.append (s.inlined_to)
+                    pass
+                pass
+            for n in nbrs:
+                if n.order not in seen:
+                    seen.add (n.order)
+                    queue.append ((n, d + 1))
+                    pass
+                pass
+            pass
+        return seen
+
+    def dot_data(self, only_orders=False, clones=False, only_ref_to_f=False,
+                 restrict_to=None):
+        """Produce output suitable as input for dot describing symtab
+
+        If RESTRICT_TO is a set of symbol orders, e.g. one returned by
+        neighborhood, only those symbols and edges among them are
+        described."""
+
+        return list (self.iter_dot_lines (only_orders, clones, only_ref_to_f,
+                                          restrict_to))
+
+    def selected_symbols(self, restrict_to=None):
+        """Return lists of all symbols, functions and variables.
+
+        If RESTRICT_TO is a set of orders, return only those symbols."""
 
-        r = ["digraph G {"]
-        r.append("node [shape=ellipse, fontsize=9, height=0.1];")
-        for f in self.all_functions:
+        if restrict_to is None:
+            return (self.all_symbols, self.all_functions, self.all_variables)
+        all_symbols = [self.order_to_sym[o] for o in sorted (restrict_to)]
+        all_functions = [s for s in all_symbols if isinstance (s, Function)]
+        all_variables = [s for s in all_symbols if not isinstance (s, Function)]
+        return (all_symbols, all_functions, all_variables)
+
+    def iter_dot_lines(self, only_orders=False, clones=False,
+                       only_ref_to_f=False, restrict_to=None):
+        """Generator of the lines of dot_data, one at a time"""
+
+        (all_symbols, all_functions,
+         all_variables) = self.selected_symbols (restrict_to)
+
+        yield "digraph G {"
+        yield "node [shape=ellipse, fontsize=9, height=0.1];"
+        for f in all_functions:
             attrs = {}
             if only_orders:
                 attrs["label"] = '"' + str(f.order) + '"'
@@ -151,13 +406,13 @@ class Symtab(object):
                 pass
 
             p = [k + "=" + attrs[k] for k in attrs.keys()]
-            r.append("{0:d} [{1}]".format(f.order, ", ".join(p)))
+            yield "{0:d} [{1}]".format(f.order, ", ".join(p))
             pass
 #        del f
-        r.append("")
+        yield ""
 
-        r.append("node [shape=box, fontsize=9, height=0.1];")
-        for v in self.all_variables:
+        yield "node [shape=box, fontsize=9, height=0.1];"
+        for v in all_variables:
             attrs = {}
             if only_orders:
                 attrs["label"] = '"' + str(v.order) + '"'
@@ -166,13 +421,15 @@ class Symtab(object):
                 pass
 
             p = [k + "=" + attrs[k] for k in attrs.keys()]
-            r.append("{0:d} [{1}]".format(v.order, ", ".join(p)))
+            yield "{0:d} [{1}]".format(v.order, ", ".join(p))
             pass
 #        del v
-        r.append("")
+        yield ""
 
-        for f in self.all_functions:
+        for f in all_functions:
             for cs in f.callees:
+                if restrict_to is not None and cs.order not in restrict_to:
+                    continue
                 attrs = {}
             
                 if cs.is_inlined:
@@ -182,46 +439,226 @@ class Symtab(object):
                     pass
 
                 p = [k + "=" + attrs[k] for k in attrs.keys()]
-                r.append("{0:d} -> {1:d} [{2}]".format(f.order, cs.order,
-                                                           ", ".join(p)))
+                yield "{0:d} -> {1:d} [{2}]".format(f.order, cs.order,
+                                                    ", ".join(p))
                 pass
 
-            if clones and f.is_clone:
+            if (clones and f.is_clone
+                and (restrict_to is None or f.clone_of.order in restrict_to)):
                 attrs = {}
                 attrs["color"] = "yellowgreen"
                 attrs["style"] = "dotted"
                 p = [k + "=" + attrs[k] for k in attrs.keys()]
-                r.append("{0:d} -> {1:d} [{2}]".format(f.clone_of.order,
-                                                       f.order,
-                                                       ", ".join(p)))
+                yield "{0:d} -> {1:d} [{2}]".format(f.clone_of.order,
+                                                    f.order,
+                                                    ", ".join(p))
                 pass
 
             pass
-        r.append("")
+        yield ""
 #        del cs
 #        del f
 
-        for s in self.all_symbols:
+        for s in all_symbols:
             for ref in s.references:
+                if restrict_to is not None and ref.order not in restrict_to:
+                    continue
                 if not only_ref_to_f or isinstance (ref, Function):
                     attrs = {}
                     attrs["color"] = "black"
                     attrs["style"] = "dashed"
                     p = [k + "=" + attrs[k] for k in attrs.keys()]
-                    r.append("{0:d} -> {1:d} [{2}]".format(s.order, ref.order,
-                                                           ", ".join(p)))
+                    yield "{0:d} -> {1:d} [{2}]".format(s.order, ref.order,
+                                                        ", ".join(p))
                 pass
             pass
-        r.append("")
+        yield ""
 #        del s
 #        del ref
 
-        r.append("}")
-        return r
+        yield "}"
+        return
 
 
 # Functionality required to read symbol table from a dump file
 
+# Patterns used when reading dumps, compiled only once
+symtab_start_re = re.compile (r"Symbol table:")
+item_start_re = re.compile (r"^([^/]+)/([0-9]+)")
+sym_order_re = re.compile (r"/([0-9]+)")
+clone_of_re = re.compile (r"Clone of ([^/]+)/([0-9]+)")
+inline_copy_re = re.compile (r"Function [^/]+/([0-9]+) is inline copy in "
+                             r"([^/]+)/([0-9]+)")
+# An edge in a list of calls, group 1 is the order of the other end and
+# group 2 everything up to the next edge, i.e. parenthesized notes about
+# the edge and the name of the next symbol
+call_edge_re = re.compile (r"/([0-9]+)([^/]*)")
+edge_note_re = re.compile (r"\(([0-9]+)(?:x\)| \()|([0-9]+\.[0-9]+) per call"
+                           r"|\((inlined|indirect_inlining|speculative"
+                           r"|can throw external)\)")
+# Execution count and its quality in function flags, such as
+# "count:1073741824 (estimated locally)"
+function_count_re = re.compile (r"(?:^| )count:(-?[0-9]+)(?: \(([^)]*)\))?")
+
+# Bits of edge flags
+EDGE_INLINED = 1
+EDGE_INDIRECT_INLINING = 2
+EDGE_SPECULATIVE = 4
+EDGE_CAN_THROW = 8
+
+edge_flag_notes = {"inlined" : EDGE_INLINED,
+                   "indirect_inlining" : EDGE_INDIRECT_INLINING,
+                   "speculative" : EDGE_SPECULATIVE,
+                   "can throw external" : EDGE_CAN_THROW}
+
+# Values of attributes already seen, so that symbols with the same
+# visibility, flags etc. share a single string or list of words
+interned_attr_values = {}
+
+def simple_attr_value (val):
+    """Return VAL as it is if it is a single word, otherwise as a list.
+
+    Values are interned, the returned lists are shared and must not be
+    modified."""
+
+    r = interned_attr_values.get (val)
+    if r is not None:
+        return r
+    if val.find(" ") == -1:
+        r = val
+    else:
+        r = val.split()
+        pass
+    if len (interned_attr_values) > 65536:
+        interned_attr_values.clear ()
+        pass
+    interned_attr_values[val] = r
+    return r
+
+def attr_words (val):
+    """Return attribute value VAL, a string or a list, as list of words"""
+
+    if isinstance (val, list):
+        return val
+    return val.split()
+
+# Words which can be flags, as opposed to values such as first_run:5
+flag_word_re = re.compile (r"[A-Za-z_][-A-Za-z0-9_]*$")
+
+class WordVocabulary (object):
+    """Assignment of bits to words of attributes such as visibility.
+
+    Known words have fixed bits, words not known in advance get the
+    next free bit when first seen, so masks of such words are only
+    meaningful within one process.  Words which do not look like flags
+    get no bit at all."""
+
+    def __init__(self, known_words):
+        self.bits = {}
+        self.words = []
+        self.masks = {}
+        for w in known_words:
+            self.bit (w)
+            pass
+        return
+
+    def bit (self, word):
+        """Return the bit (a power of two) of WORD"""
+
+        b = self.bits.get (word)
+        if b is None:
+            if not flag_word_re.match (word):
+                return 0
+            b = 1 << len (self.words)
+            self.bits[word] = b
+            self.words.append (word)
+            pass
+        return b
+
+    def mask (self, val):
+        """Return bitmask of attribute value VAL, a string or list of words"""
+
+        if isinstance (val, list):
+            key = tuple (val)
+        else:
+            key = val
+            pass
+        m = self.masks.get (key)
+        if m is None:
+            m = 0
+            for w in attr_words (val):
+                m |= self.bit (w)
+                pass
+            if len (self.masks) > 4096:
+                self.masks.clear ()
+                pass
+            self.masks[key] = m
+            pass
+        return m
+
+    def words_of (self, mask):
+        """Return list of words with bits set in MASK"""
+
+        return [w for (i, w) in enumerate (self.words) if mask & (1 << i)]
+
+visibility_words = WordVocabulary ([
+    "public", "external", "externally_visible", "comdat", "weak",
+    "one_only", "virtual", "artificial", "dll_import", "force_output",
+    "forced_by_abi", "no_reorder", "in_other_partition",
+    "used_from_other_partition", "visibility_specified", "prevailing_def",
+    "prevailing_def_ironly", "prevailing_def_ironly_exp", "resolved_ir",
+    "resolved_exec", "resolved_dyn", "preempted_reg", "preempted_ir",
+    "undef"])
+
+flag_words = WordVocabulary ([
+    "body", "process", "local", "executed_once", "only_called_at_startup",
+    "only_called_at_exit", "tm_clone", "nonfreeing_fn", "icf_merged",
+    "calls_comdat_local", "redefined_extern_inline", "split_part",
+    "indirect_call_target", "unlikely_executed", "initialized", "output",
+    "read-only", "const-value-known", "writeonly"])
+
+# Qualities of profile counts, such as "precise" or "estimated locally"
+count_qualities = {}
+
+def symlist_attr_value (val):
+    """Return list of orders of symbols listed in VAL"""
+    return [int(i) for i in sym_order_re.findall (val)]
+
+# Results of call_edge_notes, most edges have one of a few kinds of notes
+parsed_edge_notes = {"" : (0, 0.0, 0)}
+
+def call_edge_notes (notes):
+    """Return (count, frequency, flags) of an edge with NOTES.
+
+    NOTES are the parenthesized remarks which follow the other end of a
+    call edge in a dump, such as "(1000x) (2.00 per call) (inlined)".
+    Missing count and frequency are zero, which is also what gcc
+    omits."""
+
+    r = parsed_edge_notes.get (notes)
+    if r is not None:
+        return r
+    count = 0
+    freq = 0.0
+    flags = 0
+    for (c, f, flag) in edge_note_re.findall (notes):
+        if c:
+            count = int (c)
+        elif f:
+            freq = float (f)
+        else:
+            flags |= edge_flag_notes[flag]
+            pass
+        pass
+    if len (parsed_edge_notes) > 65536:
+        parsed_edge_notes.clear ()
+        parsed_edge_notes[""] = (0, 0.0, 0)
+        pass
+    r = (count, freq, flags)
+    parsed_edge_notes[notes] = r
+    return r
+
+
 class CommonSymbolDumpCapabilities (object):
     """Comon capabilities of symbols read from a dump file"""
 
@@ -234,9 +671,7 @@ class CommonSymbolDumpCapabilities (object):
         val = line[len(name)+2:].strip()
         if val == "":
             return False
-        if val.find(" ") == -1:
-            return val;
-        return val.split()
+        return simple_attr_value (val)
 
 
     def symlist_attr (self, name, line):
@@ -248,37 +683,80 @@ class CommonSymbolDumpCapabilities (object):
         val = line[len(name)+2:].strip()
         if val == "":
             return False
-        str_orders = re.findall (r"/[0-9]+", val)
-        return [int(i[1:]) for i in str_orders]
+        return symlist_attr_value (val)
+
+    # Handlers of "Keyword: value" lines.  Each gets the stripped value
+    # and returns True iff it has consumed the line.
+
+    def visibility_attr (self, val):
+        if val == "":
+            return False
+        self.visibility = simple_attr_value (val)
+        return True
+
+    def availability_attr (self, val):
+        if val == "":
+            return False
+        self.availability = simple_attr_value (val)
+        return True
+
+    def referring_attr (self, val):
+        orders = symlist_attr_value (val)
+        if not orders:
+            return False
+        self.referring_orders = orders
+        return True
 
+    def references_attr (self, val):
+        orders = symlist_attr_value (val)
+        if not orders:
+            return False
+        self.references_orders = orders
+        return True
+
+    common_attr_handlers = {
+        "Visibility" : visibility_attr,
+        "Availability" : availability_attr,
+        "Referring" : referring_attr,
+        "References" : references_attr,
+        }
 
     def common_attr (self, line):
         """Proces common attrs of functions and variables.
 
            Return True iff successful"""
 
-        visibility = self.simple_attr ("Visibility", line)
-        if visibility:
-            self.visibility = visibility
-            return True
-        availability = self.simple_attr ("Availability", line)
-        if availability:
-            self.availability = availability
-            return True
-        referring = self.symlist_attr ("Referring", line)
-        if referring:
-            self.referring_orders = referring
-            return True;
-        references = self.symlist_attr ("References", line)
-        if references:
-            self.references_orders = references
-            return True
+        colon = line.find(":")
+        if colon > 0:
+            handler = self.common_attr_handlers.get (line[:colon])
+            if handler and handler (self, line[colon+1:].strip()):
+                return True
         if line.find("Address is taken") >= 0:
             self.address_taken = True
             return True
 
         return False
 
+    def other_attribute (self, line):
+        """Process a line which was not handled by any of attr_handlers"""
+
+        if line.find("Address is taken") >= 0:
+            self.address_taken = True
+            return
+        self.unhandled_attribute (line)
+        return
+
+    def process_attribute (self, line):
+        """Process a line that describes the symbol"""
+
+        colon = line.find(":")
+        if colon > 0:
+            handler = self.attr_handlers.get (line[:colon])
+            if handler and handler (self, line[colon+1:].strip()):
+                return
+        self.other_attribute (line)
+        return
+
     def unhandled_attribute (self, line):
         """Process an otherwise unhandled attribute line"""
         self.unhandled_attributes.append (line)
@@ -291,7 +769,7 @@ class DumpFunction (Function, CommonSymbolDumpCapabilities):
     def process_clone_of (self, line):
         """Process Clone of attr, return true if done so"""
 
-        match = re.match(r"Clone of ([^/]+)/([0-9]+)", line)
+        match = clone_of_re.match(line)
         if match:
             self.is_clone = True
             self.clone_of_order = int(match.group(2))
@@ -300,36 +778,64 @@ class DumpFunction (Function, CommonSymbolDumpCapabilities):
 
     def process_inlined_into (self, line):
         """Process Inlined into attr, return true if done so"""
-        
-        ito_re = re.compile (r"Function [^/]+/%i is inline copy in " % self.order
-                             + r"([^/]+)/([0-9]+)")
 
-        match = ito_re.match(line)
-        if match:
+        match = inline_copy_re.match(line)
+        if match and int(match.group(1)) == self.order:
             self.is_inlined = True
-            self.inlined_to_order = int(match.group(2))
+            self.inlined_to_order = int(match.group(3))
             return True
         return False
 
-    def process_attribute (self, line):
-        """Process a line that describes the function"""
-        if self.common_attr (line):
-            return
-        attrs = self.simple_attr ("Function flags", line)
-        if attrs:
-            self.attrs = attrs
+    def flags_attr (self, val):
+        match = function_count_re.search (val)
+        if match:
+            self.count = int (match.group (1))
+            quality = match.group (2) or ""
+            self.count_quality = count_qualities.setdefault (quality, quality)
+            val = (val[:match.start ()] + " " + val[match.end ():]).strip ()
+            if val == "":
+                return True
+            pass
+        if val == "":
+            return False
+        self.attrs = simple_attr_value (val)
+        return True
+
+    def called_by_attr (self, val):
+        orders = symlist_attr_value (val)
+        if not orders:
+            return False
+        self.callers_orders = orders
+        return True
+
+    def calls_attr (self, val):
+        edges = call_edge_re.findall (val)
+        if not edges:
+            return False
+        self.callees_orders = [int(o) for (o, notes) in edges]
+        profile = [call_edge_notes (notes[:notes.rfind(")") + 1])
+                   for (o, notes) in edges]
+        self.callees_counts = [p[0] for p in profile]
+        self.callees_freqs = [p[1] for p in profile]
+        self.callees_edge_flags = [p[2] for p in profile]
+        return True
+
+    attr_handlers = dict (CommonSymbolDumpCapabilities.common_attr_handlers)
+    attr_handlers.update ({
+        "Function flags" : flags_attr,
+        "Called by" : called_by_attr,
+        "Calls" : calls_attr,
+        })
+
+    def other_attribute (self, line):
+        """Process a line which was not handled by any of attr_handlers"""
+
+        if line.find("Address is taken") >= 0:
+            self.address_taken = True
             return
         if self.process_clone_of (line) or self.process_inlined_into (line):
             return
-        callers = self.symlist_attr ("Called by", line)
-        if callers:
-            self.callers_orders = callers
-            return
-        callees = self.symlist_attr ("Calls", line)
-        if callees:
-            self.callees_orders = callees
-            return
-        if line.strip().startswith("Thunk"):
+        if line.startswith("Thunk"):
             self.is_thunk = True
 
         self.unhandled_attribute (line)
@@ -338,33 +844,62 @@ class DumpFunction (Function, CommonSymbolDumpCapabilities):
 class DumpVariable (Variable, CommonSymbolDumpCapabilities):
     """Representation of varpool nodes that are read from a dump"""
 
-    def process_attribute (self, line):
-        """Process a line that describes the function"""
-        if self.common_attr (line):
-            return
-        attrs = self.simple_attr ("Varpool flags", line)
-        if attrs:
-            self.attrs = attrs
-            return
+    def flags_attr (self, val):
+        if val == "":
+            return False
+        self.attrs = simple_attr_value (val)
+        return True
 
-        self.unhandled_attribute (line)
-        return
+    attr_handlers = dict (CommonSymbolDumpCapabilities.common_attr_handlers)
+    attr_handlers["Varpool flags"] = flags_attr
  
 
 class DumpSymtab(Symtab):
     """Symbol table read from a dump file"""
 
-    def read_dump(self, filename):
-        """Read and process the symtab lines in the dump file."""
+    # Classes of symbols created when reading a dump
+    function_class = DumpFunction
+    variable_class = DumpVariable
+
+    # Lists of symbols sorted by sort_symbols
+    symbol_lists = ["all_symbols", "all_functions", "all_variables",
+                    "uninlined_functions"]
+
+    def add_symbol(self, sym):
+        """Add symbol SYM which has been completely read from a dump"""
+
+        if isinstance (sym, Function):
+            self.all_functions.append (sym)
+        else:
+            self.all_variables.append (sym)
+            pass
+        self.order_to_sym[sym.order] = sym
+        self.all_symbols.append (sym)
+        return
+
+    def iter_symbols(self, lines, in_table = False):
+        """Generator of symbols read from the symtab in LINES of a dump.
+
+        Each symbol is yielded as soon as all its attribute lines have
+        been read, it is not added to the table and it is not fixed
+        up, i.e. it has only orders of the symbols it refers to.  If
+        IN_TABLE is true, LINES start directly with a symbol rather than
+        somewhere before the "Symbol table:" line.  When the generator
+        finishes, table_ended tells whether the end of the table was
+        seen before LINES ran out.
+
+        Attribute lines are dispatched on the keyword before the colon
+        through the attr_handlers table of the symbol class, lines
+        without a known keyword go to its other_attribute method."""
 
-        symtab_start_re = re.compile (r"Symbol table:")
-        item_start_re = re.compile (r"^([^/]+)/([0-9]+)")
         self.line_num = 0
-        in_table = False
+        self.table_ended = False
         new_symbol = False
+        current_symbol = None
+        function_class = self.function_class
+        variable_class = self.variable_class
 
-        f = open (filename, "r")
-        for line in f:
+        for line in lines:
             self.line_num = self.line_num + 1
             if not in_table:
                 if symtab_start_re.match (line):
@@ -379,21 +914,22 @@ class DumpSymtab(Symtab):
                 # complete the new symbol
                 new_symbol = False
                 if stripped.startswith("Type: function"):
-                    current_symbol = DumpFunction(self, sym_name, sym_order)
-                    self.all_functions.append (current_symbol)
+                    current_symbol = function_class(self, sym_name, sym_order)
                     pass
                 elif stripped.startswith("Type: variable"):
-                    current_symbol = DumpVariable(self, sym_name, sym_order)
-                    self.all_variables.append (current_symbol)
+                    current_symbol = variable_class(self, sym_name, sym_order)
                     pass
                 else:
                     die (("Symbol %s on line %i is neither a function nor "
                          "variable.") % (sym_name, self.line_num - 1))
                     return
-                self.order_to_sym[sym_order] = current_symbol
-                self.all_symbols.append (current_symbol)
+                handlers = current_symbol.attr_handlers
                 pass
             elif line[0] != " ":
+                if current_symbol is not None:
+                    yield current_symbol
+                    current_symbol = None
+                    pass
                 # start new symbol
                 match = item_start_re.match(line)
                 if match:
@@ -405,46 +941,380 @@ class DumpSymtab(Symtab):
 #                    sys.stderr.write (("Symtab seems to end in the middle of "
 #                                       + "the file at line %i with string: %s")
 #                                      % (self.line_num, line))
+                    self.table_ended = True
                     break
                 pass
-            else: 
-                current_symbol.process_attribute (stripped)
+            else:
+                colon = stripped.find(":")
+                if colon > 0:
+                    handler = handlers.get (stripped[:colon])
+                    if handler and handler (current_symbol,
+                                            stripped[colon+1:].strip()):
+                        continue
+                    pass
+                current_symbol.other_attribute (stripped)
                 pass
             pass
+        if current_symbol is not None:
+            yield current_symbol
+            pass
+        return
+
+    def read_dump(self, filename, offset = 0):
+        """Read and process the symtab lines in the dump file.
+
+        If OFFSET is non-zero, reading starts at that byte offset, which
+        should be one of those returned by index_dump_sections."""
+
+        f = open (filename, "r")
+        if offset:
+            f.seek (offset)
+            pass
+        for sym in self.iter_symbols (f):
+            self.add_symbol (sym)
+            pass
         f.close()
         return
 
-    def load_from_dump(self, filename):
-        """Read the symtab info from the dump file."""
+    def load_from_dump(self, filename, section = None, sections = None,
+                       jobs = 1, instrument = None):
+        """Read the symtab info from the dump file.
+
+        By default the first symbol table in the dump is read, if
+        SECTION is given, the one with that index is.  SECTIONS can be
+        the result of index_dump_sections for the dump if it is already
+        known.  If JOBS is greater than one, the table is parsed by that
+        many processes, which send back columns of the symbols, the
+        python objects are still made here so ColumnarSymtab gains more.
+
+        INSTRUMENT, or the SYMTAB_INSTRUMENT environment variable if it
+        is None, turns on measuring of the load, see symtab_instrument.py.
+        The variable being empty or 0 means no measuring."""
+
+        if instrument is None:
+            instrument = os.environ.get ("SYMTAB_INSTRUMENT", "")
+            if instrument == "0":
+                instrument = None
+                pass
+            pass
+        if instrument:
+            from symtab_instrument import instrumented_load
+            instrumented_load (self, instrument, filename, section, sections,
+                               jobs)
+            return
 
-        self.read_dump (filename)
+        if jobs > 1:
+            for sym in iter_dump_symbols_parallel (filename, jobs, section,
+                                                   sections):
+                sym.symtable = self
+                self.add_symbol (sym)
+                pass
+            pass
+        else:
+            self.read_dump (filename, section_offset (filename, section,
+                                                      sections))
+            pass
         self.fixup()
-        
-        self.all_symbols.sort (key=lambda sym: sym.order)
-        self.all_functions.sort (key=lambda sym: sym.order)
-        self.all_variables.sort (key=lambda sym: sym.order)
-        self.uninlined_functions.sort (key=lambda sym: sym.order)
+        self.sort_symbols()
+        return
+
+    def sort_symbols(self):
+        """Sort all lists of symbols by their order"""
 
+        for name in self.symbol_lists:
+            getattr (self, name).sort (key=lambda sym: sym.order)
+            pass
         return
 
 
+# Dumps often contain more than one symbol table, e.g. before and after
+# inlining or one for each partition.
+
+def index_dump_sections (filename, block_size = 1 << 22):
+    """Return a list of byte offsets of all symbol tables in dump FILENAME.
+
+    These are the offsets of lines starting with "Symbol table:".  The
+    file is searched in large blocks rather than line by line."""
+
+    marker = b"Symbol table:"
+    r = []
+    f = open (filename, "rb")
+    base = 0
+    data = b""
+    while True:
+        block = f.read (block_size)
+        if not block:
+            break
+        data = data + block
+        i = data.find (marker)
+        while i >= 0:
+            if (i == 0 and base == 0) or (i > 0 and data[i-1:i] == b"\n"):
+                r.append (base + i)
+                pass
+            i = data.find (marker, i + 1)
+            pass
+        # Keep the end in case the marker is split between blocks.  A
+        # complete marker at the start of what is kept has already been
+        # found, the check of the preceding newline skips it.
+        cut = max (0, len (data) - len (marker))
+        base = base + cut
+        data = data[cut:]
+        pass
+    f.close()
+    return r
+
+def section_offset (filename, section, sections = None):
+    """Return byte offset of symbol table number SECTION in FILENAME.
+
+    If SECTION is None, return zero.  SECTIONS are offsets of all
+    sections, they are computed with index_dump_sections if not given."""
+
+    if section is None:
+        return 0
+    if sections is None:
+        sections = index_dump_sections (filename)
+        pass
+    if section < 0 or section >= len (sections):
+        die ("There is no symbol table number %i in %s, it has only %i."
+             % (section, filename, len (sections)))
+        pass
+    return sections[section]
+
+def iter_dump_symbols (filename, section = None, sections = None):
+    """Generator of symbols of the symtab in dump FILENAME.
+
+    Only one symbol is in memory at a time, symbols are neither fixed
+    up nor sorted, see DumpSymtab.iter_symbols.  SECTION and SECTIONS
+    select the symbol table like in DumpSymtab.load_from_dump."""
+
+    tab = DumpSymtab()
+    f = open (filename, "r")
+    offset = section_offset (filename, section, sections)
+    if offset:
+        f.seek (offset)
+        pass
+    try:
+        for sym in tab.iter_symbols (f):
+            yield sym
+            pass
+    finally:
+        f.close()
+        pass
+    return
+
+
+# Parallel parsing of one symbol table, split into chunks at lines
+# starting a new symbol.
+
+# A newline followed by a line which ends a symbol table, i.e. one that
+# is not empty, does not start with a space and does not start a symbol
+table_end_bytes_re = re.compile (br"\n(?![ \n]|[ \t\r\f\v]*(?:\n|$)"
+                                 br"|[^/\n]+/[0-9])")
+
+def find_table_end (filename, start, end, block_size = 1 << 22):
+    """Return byte offset of the end of the symbol table at START.
+
+    The table is assumed not to extend beyond END.  Like
+    index_dump_sections, this searches the file in large blocks."""
+
+    f = open (filename, "rb")
+    f.seek (start)
+    # Skip the "Symbol table:" line itself
+    base = start + len (f.readline())
+    data = b""
+    while base + len (data) < end:
+        block = f.read (min (block_size, end - base - len (data)))
+        if not block:
+            break
+        data = data + block
+        last = base + len (data) >= end
+        if last:
+            cut = len (data)
+        else:
+            # Only look at newlines followed by complete lines
+            cut = data.rfind (b"\n")
+            if cut <= 0:
+                continue
+            pass
+        match = table_end_bytes_re.search (data, 0, cut)
+        if match:
+            f.close()
+            return base + match.start() + 1
+        base = base + cut
+        data = data[cut:]
+        pass
+    f.close()
+    return end
+
+def split_dump_section (filename, start, end, parts):
+    """Return list of byte ranges covering symbol table at START.
+
+    The table must end at END.  The ranges are roughly equally sized,
+    each but the first starts with a line starting a symbol."""
+
+    bounds = [start]
+    f = open (filename, "rb")
+    for k in range (1, parts):
+        guess = start + (end - start) * k // parts
+        if guess <= bounds[-1]:
+            continue
+        f.seek (guess)
+        # Skip what is likely the rest of a line
+        pos = guess + len (f.readline())
+        while pos < end:
+            line = f.readline()
+            if line[:1] != b" " and line.strip():
+                break
+            pos = pos + len (line)
+            pass
+        if pos >= end:
+            break
+        bounds.append (pos)
+        pass
+    f.close()
+    bounds.append (end)
+    return list (zip (bounds[:-1], bounds[1:]))
+
+def parse_dump_chunk (args):
+    """Parse symbols in a byte range of a dump, in a worker process.
+
+    ARGS is a tuple of the file name, start and end of the range and a
+    flag whether the range starts within the table.  Return columns of
+    the symbols packed by a ColumnarBuilder (see its chunk_columns) and
+    whether the end of the table was seen, or None instead of the
+    columns if the table turned out to be broken.  Columns are sent
+    back to the parent much faster than pickled symbols."""
+
+    from symtab_columnar import ColumnarBuilder
+
+    (filename, start, end, in_table) = args
+    f = open (filename, "rb")
+    f.seek (start)
+    data = f.read (end - start)
+    f.close()
+    if bytes is not str:
+        data = data.decode ("utf-8")
+        pass
+
+    builder = ColumnarBuilder()
+    try:
+        for sym in builder.iter_symbols (data.split ("\n"), in_table):
+            builder.add_symbol (sym)
+            pass
+    except SystemExit:
+        # The error has already been reported
+        return (None, True)
+    return (builder.chunk_columns (), builder.table_ended)
+
+def iter_dump_chunks_parallel (filename, jobs, section = None,
+                               sections = None, chunks_per_job = 4):
+    """Generator of column chunks of a symtab in dump FILENAME parsed by
+    JOBS processes.
+
+    The chunks, as returned by ColumnarBuilder.chunk_columns, come in
+    the order of the dump, SECTION and SECTIONS select the table like
+    in DumpSymtab.load_from_dump.  The table is split into JOBS times
+    CHUNKS_PER_JOB ranges so that the results can be consumed while the
+    rest is still being parsed."""
+
+    import multiprocessing
+
+    if sections is None:
+        sections = index_dump_sections (filename)
+        pass
+    if section is None:
+        section = 0
+        if not sections:
+            return
+        pass
+    start = section_offset (filename, section, sections)
+    if section + 1 < len (sections):
+        end = sections[section + 1]
+    else:
+        end = os.path.getsize (filename)
+        pass
+
+    end = find_table_end (filename, start, end)
+    ranges = split_dump_section (filename, start, end,
+                                 jobs * chunks_per_job)
+    tasks = [(filename, a, b, a != start) for (a, b) in ranges]
+    pool = multiprocessing.Pool (jobs)
+    try:
+        for (columns, ended) in pool.imap (parse_dump_chunk, tasks):
+            if columns is None:
+                sys.exit (1)
+                pass
+            yield columns
+            if ended:
+                break
+            pass
+    finally:
+        pool.terminate()
+        pass
+    return
+
+def iter_dump_symbols_parallel (filename, jobs, section = None,
+                                sections = None, chunks_per_job = 4):
+    """Generator of symbols of a symtab in dump FILENAME parsed by JOBS
+    processes.
+
+    Symbols come in the same order as from iter_dump_symbols, without
+    any table, SECTION and SECTIONS select the table like in
+    DumpSymtab.load_from_dump.  They are made from the column chunks of
+    iter_dump_chunks_parallel, ColumnarSymtab uses those directly."""
+
+    from symtab_columnar import chunk_symbols
+
+    for columns in iter_dump_chunks_parallel (filename, jobs, section,
+                                              sections, chunks_per_job):
+        for sym in chunk_symbols (columns):
+            yield sym
+            pass
+        pass
+    return
+
+
 # Functionality to show dot data in feh etc
 
 
-def produce_dot (lines, filename = "symtab.png"):
-    from subprocess import Popen, PIPE
+def produce_dot (lines, filename = "symtab.png", format = "png"):
+    """Render dot LINES in FORMAT to FILENAME.
+
+    Images are cached by symtab_render.py, so the same graph is laid
+    out only once."""
 
-    p = Popen(['dot', '-Tpng', '-o', filename], stdin=PIPE)
-    p.communicate("\n".join(lines))
+    from symtab_render import render_to_file
+    render_to_file (lines, filename, format)
     return
 
+def produce_dot_async (lines, filename = "symtab.png", format = "png"):
+    """Start rendering dot LINES to FILENAME in the background.
+
+    Return a future whose result is FILENAME once the image is there."""
+
+    from symtab_render import render_to_file_async
+    return render_to_file_async (lines, filename, format)
+
 def display_dot (lines, wait = True, filename = "symtab.png"):
-    from subprocess import Popen, PIPE
+    """Render dot LINES to FILENAME and show it with feh.
+
+    Unless WAIT, return immediately and let feh start once the image is
+    rendered in the background."""
+
+    from subprocess import Popen
 
-    produce_dot (lines, filename = filename)
-    p = Popen(['feh', filename])
     if wait:
+        produce_dot (lines, filename = filename)
+        p = Popen(['feh', filename])
         p.communicate()
+        return
+
+    def show (future):
+        if future.exception () is None:
+            Popen(['feh', filename])
+            pass
+        return
+    produce_dot_async (lines, filename = filename).add_done_callback (show)
     return
 
 
@@ -460,19 +1330,41 @@ def symtab_main():
     """The main function."""
 
     if (len (sys.argv) < 2):
-        die ("""You need to specify the file name.""")
+        die ("""You need to specify the file name and optionally a symbol
+order or name and the number of hops around it to display.""")
         pass
 
     tab = DumpSymtab()
     tab.load_from_dump (sys.argv[1])
 
+    if len (sys.argv) > 2:
+        try:
+            seeds = [tab.order_to_sym[int (sys.argv[2])]]
+        except ValueError:
+            seeds = tab.name_index().lookup (sys.argv[2])
+            if not seeds:
+                die ("""There is no symbol called %s""" % sys.argv[2])
+                pass
+            pass
+        if len (sys.argv) > 3:
+            hops = int (sys.argv[3])
+        else:
+            hops = 1
+            pass
+        around = tab.neighborhood (seeds, hops)
+        for s in tab.dot_data(restrict_to = around):
+            print (s)
+            pass
+        display_dot (tab.dot_data (restrict_to = around))
+        return
+
 #    f = tab.order_to_sym[240]
 #    print f
 #    for i in f.inlinees:
 #        print "  %s/%i from %i" % (i.name, i.order, i.get_origin().order)
 
     for s in tab.dot_data():
-        print s
+        print (s)
         pass
     display_dot (tab.dot_data ())
     return
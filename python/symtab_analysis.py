@@ -0,0 +1,445 @@
+#!/usr/bin/python
+
+# Whole call graph analyses of a symbol table: strongly connected
+# components, the DAG of the components in topological order and
+# reachability from the roots of the program.  Everything is computed
+# once, iteratively and in time and memory linear in the size of the
+# call graph, and kept in flat arrays indexed by position of the
+# function in all_functions.
+
+import sys
+import heapq
+from array import array
+
+def is_root (f):
+    """Return true if function F may be called from outside the unit"""
+
+    vis = f.visibility
+    if not isinstance (vis, list):
+        vis = vis.split ()
+        pass
+    return "externally_visible" in vis or f.address_taken
+
+class CallGraphAnalysis (object):
+    """Strongly connected components and reachability of a call graph.
+
+    Nodes are the functions of the table, numbered by their position in
+    all_functions, edges go from callers to callees.  The analysis is
+    done at construction time, it must only be created once the table
+    is completely loaded.  The graph is taken from Symtab.call_graph,
+    so that a ColumnarSymtab needs no views of its functions to build
+    it."""
+
+    def __init__(self, tab):
+        self.symtable = tab
+        (self.functions, self.position, roots, self.succ_offsets,
+         self.succ_targets, self.succ_counts,
+         self.succ_freqs) = tab.call_graph ()
+        n = len (self.functions)
+
+        self.compute_sccs (n)
+        self.compute_condensation ()
+        self.reachable = self.reachable_from (roots)
+        return
+
+    def successors (self, i):
+        """Return indices of functions called by function number I"""
+        return self.succ_targets[self.succ_offsets[i]:self.succ_offsets[i + 1]]
+
+    def compute_sccs (self, n):
+        """Find strongly connected components with Tarjan's algorithm.
+
+        Instead of recursion, an explicit stack of nodes and positions in
+        their successor lists is used.  Components are numbered in the
+        order Tarjan's algorithm completes them, which is a reverse
+        topological order of the condensation."""
+
+        offsets = self.succ_offsets
+        targets = self.succ_targets
+        unvisited = -1
+        index = array ("l", [unvisited]) * n
+        lowlink = array ("l", [0]) * n
+        on_stack = bytearray (n)
+        component = array ("l", [unvisited]) * n
+        scc_stack = []
+        next_index = 0
+        ncomps = 0
+
+        for root in range (n):
+            if index[root] != unvisited:
+                continue
+            index[root] = lowlink[root] = next_index
+            next_index = next_index + 1
+            scc_stack.append (root)
+            on_stack[root] = 1
+            work = [(root, offsets[root])]
+            while work:
+                (v, pos) = work[-1]
+                end = offsets[v + 1]
+                descended = False
+                while pos < end:
+                    w = targets[pos]
+                    pos = pos + 1
+                    if index[w] == unvisited:
+                        work[-1] = (v, pos)
+                        index[w] = lowlink[w] = next_index
+                        next_index = next_index + 1
+                        scc_stack.append (w)
+                        on_stack[w] = 1
+                        work.append ((w, offsets[w]))
+                        descended = True
+                        break
+                    elif on_stack[w] and index[w] < lowlink[v]:
+                        lowlink[v] = index[w]
+                        pass
+                    pass
+                if descended:
+                    continue
+
+                work.pop ()
+                if lowlink[v] == index[v]:
+                    while True:
+                        w = scc_stack.pop ()
+                        on_stack[w] = 0
+                        component[w] = ncomps
+                        if w == v:
+                            break
+                        pass
+                    ncomps = ncomps + 1
+                    pass
+                if work:
+                    u = work[-1][0]
+                    if lowlink[v] < lowlink[u]:
+                        lowlink[u] = lowlink[v]
+                        pass
+                    pass
+                pass
+            pass
+
+        self.component = component
+        self.component_count = ncomps
+        return
+
+    def compute_condensation (self):
+        """Build the DAG of components and their topological order.
+
+        Members of component C are comp_members[comp_offsets[C]:
+        comp_offsets[C+1]], successors of C in the DAG are similarly
+        stored in dag_offsets and dag_targets, without duplicates."""
+
+        n = len (self.functions)
+        ncomps = self.component_count
+        component = self.component
+
+        counts = array ("l", [0]) * (ncomps + 1)
+        for i in range (n):
+            counts[component[i] + 1] += 1
+            pass
+        for c in range (ncomps):
+            counts[c + 1] += counts[c]
+            pass
+        self.comp_offsets = counts
+        fill = array ("l", counts)
+        self.comp_members = array ("l", [0]) * n
+        for i in range (n):
+            c = component[i]
+            self.comp_members[fill[c]] = i
+            fill[c] += 1
+            pass
+
+        self.dag_offsets = array ("l", [0])
+        self.dag_targets = array ("l")
+        last_seen = array ("l", [-1]) * ncomps
+        for c in range (ncomps):
+            for m in self.comp_members[counts[c]:counts[c + 1]]:
+                for w in self.successors (m):
+                    d = component[w]
+                    if d != c and last_seen[d] != c:
+                        last_seen[d] = c
+                        self.dag_targets.append (d)
+                        pass
+                    pass
+                pass
+            self.dag_offsets.append (len (self.dag_targets))
+            pass
+
+        # Tarjan completes callees before their callers
+        self.topological_order = array ("l", range (ncomps - 1, -1, -1))
+        return
+
+    def component_of (self, f):
+        """Return number of the component of function F"""
+        return self.component[self.position (f.order)]
+
+    def component_functions (self, c):
+        """Return list of functions in component number C"""
+
+        return [self.functions[i] for i in
+                self.comp_members[self.comp_offsets[c]:self.comp_offsets[c + 1]]]
+
+    def component_successors (self, c):
+        """Return numbers of components called from component C"""
+        return self.dag_targets[self.dag_offsets[c]:self.dag_offsets[c + 1]]
+
+    def is_recursive (self, f):
+        """Return true if function F is part of a call graph cycle"""
+
+        i = self.position (f.order)
+        c = self.component[i]
+        return (self.comp_offsets[c + 1] - self.comp_offsets[c] > 1
+                or i in self.successors (i))
+
+    def recursive_components (self):
+        """Return list of components with more than one function,
+        largest first"""
+
+        r = [c for c in range (self.component_count)
+             if self.comp_offsets[c + 1] - self.comp_offsets[c] > 1]
+        r.sort (key=lambda c: self.comp_offsets[c] - self.comp_offsets[c + 1])
+        return r
+
+    def reachable_from (self, starts):
+        """Return bytearray with ones for functions reachable from STARTS.
+
+        STARTS is a list of function indices, the result is indexed the
+        same way."""
+
+        seen = bytearray (len (self.functions))
+        stack = []
+        for i in starts:
+            if not seen[i]:
+                seen[i] = 1
+                stack.append (i)
+                pass
+            pass
+        while stack:
+            v = stack.pop ()
+            for w in self.successors (v):
+                if not seen[w]:
+                    seen[w] = 1
+                    stack.append (w)
+                    pass
+                pass
+            pass
+        return seen
+
+    def reachable_functions (self, f):
+        """Return list of functions reachable from function F, including F"""
+
+        seen = self.reachable_from ([self.position (f.order)])
+        return [self.functions[i] for i in range (len (seen)) if seen[i]]
+
+    def heaviest_chains (self, k, weight = "count"):
+        """Return the K heaviest call chains, heaviest first.
+
+        The weight of an edge is its profile count, or its frequency if
+        WEIGHT is "frequency", and the weight of a chain is the sum of
+        weights of its edges.  Only chains from functions not called
+        from anywhere to functions not calling anything are considered,
+        so that no chain is just a part of another one.  Recursive
+        components are treated as single nodes, entered and left by the
+        heaviest edges between them and their neighbors.
+
+        Each chain is returned as a pair of its weight and a list of
+        (caller, callee, weight) triples of its edges.  The callee of an
+        edge entering a recursive component need not be the caller of
+        the next edge leaving it, see chain_segments."""
+
+        if weight == "frequency":
+            weights = self.succ_freqs
+        else:
+            weights = self.succ_counts
+            pass
+        ncomps = self.component_count
+        component = self.component
+
+        # The heaviest edge from component C to each of its successors
+        dag_weights = array ("d", [0]) * len (self.dag_targets)
+        dag_edges = array ("l", [-1]) * len (self.dag_targets)
+        slot = array ("l", [-1]) * ncomps
+        for c in range (ncomps):
+            for pos in range (self.dag_offsets[c], self.dag_offsets[c + 1]):
+                slot[self.dag_targets[pos]] = pos
+                pass
+            for m in self.comp_members[self.comp_offsets[c]:
+                                       self.comp_offsets[c + 1]]:
+                for e in range (self.succ_offsets[m], self.succ_offsets[m + 1]):
+                    d = component[self.succ_targets[e]]
+                    if d == c:
+                        continue
+                    pos = slot[d]
+                    if dag_edges[pos] < 0 or weights[e] > dag_weights[pos]:
+                        dag_weights[pos] = weights[e]
+                        dag_edges[pos] = e
+                        pass
+                    pass
+                pass
+            pass
+
+        # Up to K best chains ending in each component, as (weight, id)
+        # pairs, where chain ids index chain_prev and chain_edge.
+        # Candidates are collected in incoming until the component is
+        # reached in topological order.
+        incoming = [[] for c in range (ncomps)]
+        has_pred = bytearray (ncomps)
+        for d in self.dag_targets:
+            has_pred[d] = 1
+            pass
+        chain_prev = []
+        chain_edge = []
+        ends = []
+        for c in self.topological_order:
+            best = []
+            if has_pred[c]:
+                chosen = heapq.nlargest (k, incoming[c])
+            else:
+                chosen = [(0.0, -1, -1)]
+                pass
+            incoming[c] = None
+            for (cw, prev, e) in chosen:
+                best.append ((cw, len (chain_prev)))
+                chain_prev.append (prev)
+                chain_edge.append (e)
+                pass
+
+            if self.dag_offsets[c] == self.dag_offsets[c + 1]:
+                ends.extend (best)
+                pass
+            for pos in range (self.dag_offsets[c], self.dag_offsets[c + 1]):
+                d = self.dag_targets[pos]
+                w = dag_weights[pos]
+                for (cw, chain) in best:
+                    incoming[d].append ((cw + w, chain, dag_edges[pos]))
+                    pass
+                pass
+            pass
+
+        edge_source = array ("l", [0]) * len (self.succ_targets)
+        for i in range (len (self.functions)):
+            for e in range (self.succ_offsets[i], self.succ_offsets[i + 1]):
+                edge_source[e] = i
+                pass
+            pass
+
+        r = []
+        for (cw, chain) in heapq.nlargest (k, ends):
+            edges = []
+            while chain_prev[chain] >= 0:
+                e = chain_edge[chain]
+                edges.append ((self.functions[edge_source[e]],
+                               self.functions[self.succ_targets[e]],
+                               weights[e]))
+                chain = chain_prev[chain]
+                pass
+            edges.reverse ()
+            r.append ((cw, edges))
+            pass
+        return r
+
+    def chain_segments (self, edges):
+        """Split EDGES of a chain from heaviest_chains into segments.
+
+        Return list of lists of functions, each a real path in the call
+        graph.  A new segment starts where the chain passes through a
+        recursive component, from the function the component is entered
+        by to a possibly different one it is left from."""
+
+        if not edges:
+            return []
+        segments = [[edges[0][0]]]
+        for (caller, callee, w) in edges:
+            if caller.order != segments[-1][-1].order:
+                segments.append ([caller])
+                pass
+            segments[-1].append (callee)
+            pass
+        return segments
+
+    def dead_functions (self):
+        """Return list of functions not reachable from any root.
+
+        Roots are externally visible functions and those which have
+        their address taken."""
+
+        return [self.functions[i] for i in range (len (self.functions))
+                if not self.reachable[i]]
+
+
+def print_usage():
+    print ("""  symtab_analysis.py - Summarize the call graph of a symtab dump
+
+Usage: symtab_analysis.py [options] dump-file
+
+Options:
+
+-h, --help           Display this help and quit.
+-k N                 Also list the N heaviest call chains.  Where a
+                     chain passes through a recursive component, the
+                     functions it enters and leaves it by are joined
+                     with ~[scc]~>.
+-F                   Weigh call chains by frequencies rather than counts.
+""")
+
+def analysis_main():
+    """Print a summary of the call graph of a dump and its dead functions"""
+
+    import getopt
+    from symtab import die
+    from symtab_cache import load_symtab
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hk:F", ["help"])
+    except getopt.GetoptError as err:
+        print_usage()
+        die(str(err))
+        pass
+
+    chains = 0
+    weight = "count"
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            print_usage()
+            sys.exit(0)
+        elif o == "-k":
+            chains = int (a)
+        elif o == "-F":
+            weight = "frequency"
+            pass
+        continue
+
+    if len (args) != 1:
+        print_usage()
+        die ("You need to specify exactly one dump file.")
+        pass
+
+    tab = load_symtab (args[0])
+    cga = tab.call_graph_analysis ()
+    recursive = cga.recursive_components ()
+    print ("Functions: %i" % len (cga.functions))
+    print ("Components: %i" % cga.component_count)
+    print ("Recursive components: %i" % len (recursive))
+    for c in recursive[:10]:
+        members = cga.component_functions (c)
+        print ("   %i functions: %s" % (len (members),
+                                        " ".join ([str (f) for f in
+                                                   members[:5]])))
+        pass
+    if chains > 0:
+        print ("Heaviest call chains:")
+        for (w, edges) in cga.heaviest_chains (chains, weight):
+            if edges:
+                segments = [" -> ".join ([str (f) for f in segment])
+                            for segment in cga.chain_segments (edges)]
+                print ("   %g: %s" % (w, " ~[scc]~> ".join (segments)))
+                pass
+            pass
+        pass
+    dead = cga.dead_functions ()
+    print ("Unreachable functions: %i" % len (dead))
+    for f in dead:
+        print ("   %s" % f)
+        pass
+    return
+
+if __name__ == '__main__':
+    analysis_main()
@@ -0,0 +1,255 @@
+#!/usr/bin/python
+
+# Benchmark of loading symbol table dumps with symtab.py.  Compares
+# the table-driven attribute parser of DumpSymtab with the original
+# one which tried every attribute name in turn on each line.
+
+import sys
+import re
+import time
+from symtab import *
+
+def die (s):
+    "Give a string warning S to stderr and abort with exit code 1."
+    sys.stderr.write (s + "\n")
+    sys.exit (1)
+    pass
+
+
+# The original line-by-line attribute processing, kept here only to
+# have something to compare with.
+
+class LegacyAttributes (object):
+    """Original processing of attributes common to functions and variables"""
+
+    def simple_attr (self, name, line):
+        idx = line.find(name + ":")
+        if (idx != 0):
+            return False
+        val = line[len(name)+2:].strip()
+        if val == "":
+            return False
+        if val.find(" ") == -1:
+            return val;
+        return val.split()
+
+    def symlist_attr (self, name, line):
+        idx = line.find(name + ":")
+        if (idx != 0):
+            return False
+        val = line[len(name)+2:].strip()
+        if val == "":
+            return False
+        str_orders = re.findall (r"/[0-9]+", val)
+        return [int(i[1:]) for i in str_orders]
+
+    def legacy_common_attr (self, line):
+        visibility = self.simple_attr ("Visibility", line)
+        if visibility:
+            self.visibility = visibility
+            return True
+        availability = self.simple_attr ("Availability", line)
+        if availability:
+            self.availability = availability
+            return True
+        referring = self.symlist_attr ("Referring", line)
+        if referring:
+            self.referring_orders = referring
+            return True;
+        references = self.symlist_attr ("References", line)
+        if references:
+            self.references_orders = references
+            return True
+        if line.find("Address is taken") >= 0:
+            self.address_taken = True
+            return True
+        return False
+
+class LegacyDumpFunction (LegacyAttributes, DumpFunction):
+    """Function read from a dump with the original attribute parser"""
+
+    def process_clone_of (self, line):
+        match = re.match(r"Clone of ([^/]+)/([0-9]+)", line)
+        if match:
+            self.is_clone = True
+            self.clone_of_order = int(match.group(2))
+            return True
+        return False
+
+    def process_inlined_into (self, line):
+        ito_re = re.compile (r"Function [^/]+/%i is inline copy in " % self.order
+                             + r"([^/]+)/([0-9]+)")
+
+        match = ito_re.match(line)
+        if match:
+            self.is_inlined = True
+            self.inlined_to_order = int(match.group(2))
+            return True
+        return False
+
+    def process_attribute (self, line):
+        if self.legacy_common_attr (line):
+            return
+        match = function_count_re.search (line)
+        if match and line.startswith ("Function flags:"):
+            self.count = int (match.group (1))
+            self.count_quality = match.group (2) or ""
+            line = (line[:match.start ()] + " " + line[match.end ():]).rstrip ()
+            if line == "Function flags:":
+                return
+            pass
+        attrs = self.simple_attr ("Function flags", line)
+        if attrs:
+            self.attrs = attrs
+            return
+        if self.process_clone_of (line) or self.process_inlined_into (line):
+            return
+        callers = self.symlist_attr ("Called by", line)
+        if callers:
+            self.callers_orders = callers
+            return
+        callees = self.symlist_attr ("Calls", line)
+        if callees:
+            self.callees_orders = callees
+            return
+        if line.strip().startswith("Thunk"):
+            self.is_thunk = True
+
+        self.unhandled_attribute (line)
+        return
+
+class LegacyDumpVariable (LegacyAttributes, DumpVariable):
+    """Variable read from a dump with the original attribute parser"""
+
+    def process_attribute (self, line):
+        if self.legacy_common_attr (line):
+            return
+        attrs = self.simple_attr ("Varpool flags", line)
+        if attrs:
+            self.attrs = attrs
+            return
+
+        self.unhandled_attribute (line)
+        return
+
+class LegacyDumpSymtab (DumpSymtab):
+    """Symbol table read from a dump file by the original parser"""
+
+    def read_dump(self, filename, offset = 0):
+        symtab_start_re = re.compile (r"Symbol table:")
+        item_start_re = re.compile (r"^([^/]+)/([0-9]+)")
+        self.line_num = 0
+        in_table = False
+        new_symbol = False
+
+        f = open (filename, "r")
+        f.seek (offset)
+        for line in f:
+            self.line_num = self.line_num + 1
+            if not in_table:
+                if symtab_start_re.match (line):
+                    in_table = True
+                    pass
+                continue
+            stripped = line.strip()
+            if stripped == "":
+                continue
+
+            if new_symbol:
+                new_symbol = False
+                if stripped.startswith("Type: function"):
+                    current_symbol = LegacyDumpFunction(self, sym_name,
+                                                        sym_order)
+                    self.all_functions.append (current_symbol)
+                    pass
+                elif stripped.startswith("Type: variable"):
+                    current_symbol = LegacyDumpVariable(self, sym_name,
+                                                        sym_order)
+                    self.all_variables.append (current_symbol)
+                    pass
+                else:
+                    die (("Symbol %s on line %i is neither a function nor "
+                         "variable.") % (sym_name, self.line_num - 1))
+                    return
+                self.order_to_sym[sym_order] = current_symbol
+                self.all_symbols.append (current_symbol)
+                pass
+            elif line[0] != " ":
+                match = item_start_re.match(line)
+                if match:
+                    new_symbol = True
+                    sym_name = match.group(1)
+                    sym_order = int(match.group(2))
+                    pass
+                else:
+                    break
+                pass
+            else:
+                current_symbol.process_attribute (stripped)
+                pass
+            pass
+        f.close()
+        return
+
+
+# The benchmark itself
+
+def time_load (symtab_class, filename, repeat):
+    """Return the best time of REPEAT loads of FILENAME and the last table"""
+
+    best = None
+    for i in range(repeat):
+        tab = symtab_class()
+        start = time.time()
+        tab.load_from_dump (filename)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+            pass
+        pass
+    return (best, tab)
+
+def symbol_digest (sym):
+    """Return a tuple of everything parsed about symbol SYM"""
+
+    r = [sym.name, sym.order, str(sym.visibility), str(sym.availability),
+         sym.address_taken, str(sym.attrs), sym.referring_orders,
+         sym.references_orders, sym.unhandled_attributes]
+    if isinstance (sym, Function):
+        r.extend ([sym.is_clone, sym.is_inlined, sym.is_thunk, sym.count,
+                   sym.count_quality,
+                   sym.callers_orders, sym.callees_orders,
+                   [i.order for i in sym.clones],
+                   [i.order for i in sym.inlinees]])
+        pass
+    return tuple (r)
+
+def bench_main():
+    """The main function."""
+
+    if (len (sys.argv) < 2):
+        die ("""You need to specify the file name of a dump.""")
+        pass
+    filename = sys.argv[1]
+    if len (sys.argv) > 2:
+        repeat = int (sys.argv[2])
+    else:
+        repeat = 3
+        pass
+
+    (legacy_time, legacy_tab) = time_load (LegacyDumpSymtab, filename, repeat)
+    (new_time, new_tab) = time_load (DumpSymtab, filename, repeat)
+
+    if ([symbol_digest (s) for s in legacy_tab.all_symbols]
+        != [symbol_digest (s) for s in new_tab.all_symbols]):
+        die ("The two parsers produced different symbol tables!")
+        pass
+
+    print ("Symbols:        {0:d}".format (len (new_tab.all_symbols)))
+    print ("Legacy parser:  {0:.3f} s".format (legacy_time))
+    print ("Table parser:   {0:.3f} s".format (new_time))
+    print ("Speedup:        {0:.2f}x".format (legacy_time / new_time))
+    return
+
+if __name__ == '__main__':
+    bench_main()
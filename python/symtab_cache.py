@@ -0,0 +1,284 @@
+#!/usr/bin/python
+
+# On-disk cache of symbol tables parsed from dumps.  The columns of a
+# ColumnarSymtab are stored in a sidecar file next to the dump so that
+# subsequent loads can simply map them into memory instead of parsing
+# the whole text dump again.
+#
+# The cache file consists of a magic string, a version number, the
+# length of a JSON header and the header itself, followed by the
+# payload with all columns, each aligned to 8 bytes.  The header
+# describes the columns and records size, modification time and SHA1
+# of the dump the cache was created from, along with a CRC of the
+# payload.  A cache which does not match its dump or fails any of the
+# checks is silently rebuilt.
+
+import sys
+import os
+import mmap
+import json
+import struct
+import zlib
+import hashlib
+from array import array
+from symtab import die
+from symtab_columnar import ColumnarSymtab
+
+cache_magic = b"SYMTABC\0"
+cache_version = 3
+cache_suffix = ".symtab-cache"
+header_struct = struct.Struct ("<II")
+
+class CacheInvalid (Exception):
+    """Raised when a cache file is corrupt or was produced differently"""
+    pass
+
+def cache_filename (filename, section = None):
+    """Return the name of the cache file of dump FILENAME.
+
+    Each explicitly requested symbol table SECTION has its own cache."""
+
+    if section is None:
+        return filename + cache_suffix
+    return "%s.%i%s" % (filename, section, cache_suffix)
+
+def file_digest (filename):
+    """Return hex SHA1 digest of the contents of FILENAME"""
+
+    h = hashlib.sha1 ()
+    f = open (filename, "rb")
+    while True:
+        chunk = f.read (1 << 20)
+        if not chunk:
+            break
+        h.update (chunk)
+        pass
+    f.close ()
+    return h.hexdigest ()
+
+def align8 (n):
+    return (n + 7) & ~7
+
+def column_bytes (col):
+    """Return raw bytes of column COL"""
+
+    if isinstance (col, array):
+        if hasattr (col, "tobytes"):
+            return col.tobytes ()
+        return col.tostring ()
+    if isinstance (col, memoryview):
+        return col.tobytes ()
+    return col
+
+def column_format (col):
+    """Return (typecode, itemsize) of column COL"""
+
+    if isinstance (col, array):
+        return (col.typecode, col.itemsize)
+    if isinstance (col, memoryview):
+        if col.format == "B" and col.itemsize == 1 and col.ndim == 1:
+            return ("bytes", 1)
+        return (col.format, col.itemsize)
+    return ("bytes", 1)
+
+def column_from_buffer (buf, typecode, start, count, itemsize):
+    """Return column of COUNT items of TYPECODE starting at START of BUF.
+
+    Where memoryviews can be cast, the column refers directly to BUF,
+    otherwise the data are copied into an array."""
+
+    end = start + count * itemsize
+    if end > len (buf):
+        raise CacheInvalid ("truncated column")
+    if typecode == "bytes":
+        if hasattr (memoryview, "cast"):
+            return memoryview (buf)[start:end]
+        return buf[start:end]
+    if hasattr (memoryview, "cast"):
+        return memoryview (buf)[start:end].cast (typecode)
+    a = array (typecode)
+    if a.itemsize != itemsize:
+        raise CacheInvalid ("different item size of typecode " + typecode)
+    a.fromstring (buf[start:end])
+    return a
+
+def serialize_columns (tab, meta):
+    """Return header and payload pieces of serialized table TAB.
+
+    META is a dictionary of additional items to put into the header."""
+
+    pieces = []
+    columns = []
+    pos = 0
+    for (name, col) in tab.columns ():
+        data = column_bytes (col)
+        (typecode, itemsize) = column_format (col)
+        columns.append ([name, typecode, itemsize, pos,
+                         len (data) // itemsize])
+        pieces.append (data)
+        padding = align8 (len (data)) - len (data)
+        if padding:
+            pieces.append (b"\0" * padding)
+            pass
+        pos = pos + len (data) + padding
+        pass
+
+    crc = 0
+    for p in pieces:
+        crc = zlib.crc32 (p, crc)
+        pass
+    header = dict (meta)
+    header.update ({"columns" : columns,
+                    "byteorder" : sys.byteorder,
+                    "payload_size" : pos,
+                    "payload_crc" : crc & 0xffffffff})
+    hdr = json.dumps (header, sort_keys=True).encode ("ascii")
+    start = align8 (len (cache_magic) + header_struct.size + len (hdr))
+    prefix = (cache_magic + header_struct.pack (cache_version, len (hdr)) + hdr)
+    prefix = prefix + b"\0" * (start - len (prefix))
+    return [prefix] + pieces
+
+def deserialize_columns (buf, check_crc = True):
+    """Return table and header of a table serialized in buffer BUF"""
+
+    mlen = len (cache_magic)
+    if len (buf) < mlen + header_struct.size or buf[:mlen] != cache_magic:
+        raise CacheInvalid ("bad magic")
+    (version, hlen) = header_struct.unpack (
+        buf[mlen:mlen + header_struct.size])
+    if version != cache_version:
+        raise CacheInvalid ("different version")
+    hstart = mlen + header_struct.size
+    try:
+        header = json.loads (bytes (buf[hstart:hstart + hlen]).decode ("ascii"))
+        start = align8 (hstart + hlen)
+        payload_size = header["payload_size"]
+        column_list = header["columns"]
+    except (ValueError, KeyError, UnicodeDecodeError):
+        raise CacheInvalid ("bad header")
+    if header.get ("byteorder") != sys.byteorder:
+        raise CacheInvalid ("different byte order")
+    if start + payload_size > len (buf):
+        raise CacheInvalid ("truncated payload")
+    if check_crc:
+        if hasattr (memoryview, "cast"):
+            payload = memoryview (buf)[start:start + payload_size]
+        else:
+            payload = buf[start:start + payload_size]
+            pass
+        if zlib.crc32 (payload) & 0xffffffff != header["payload_crc"]:
+            raise CacheInvalid ("checksum mismatch")
+        pass
+
+    columns = {}
+    for (name, typecode, itemsize, pos, count) in column_list:
+        columns[str (name)] = column_from_buffer (buf, str (typecode),
+                                                 start + pos, count, itemsize)
+        pass
+    tab = ColumnarSymtab ()
+    try:
+        tab.set_columns (columns)
+    except KeyError:
+        raise CacheInvalid ("missing column")
+    return (tab, header)
+
+def read_cache (cachename):
+    """Return table and header stored in file CACHENAME.
+
+    Raise CacheInvalid if the file is not a valid cache."""
+
+    try:
+        f = open (cachename, "rb")
+    except IOError:
+        raise CacheInvalid ("cannot open cache")
+    try:
+        try:
+            buf = mmap.mmap (f.fileno (), 0, access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError):
+            raise CacheInvalid ("cannot map cache")
+    finally:
+        f.close ()
+        pass
+    (tab, header) = deserialize_columns (buf)
+    tab.cache_buffer = buf
+    return (tab, header)
+
+def write_cache (tab, cachename, st, digest):
+    """Store table TAB to CACHENAME, with dump stat ST and hash DIGEST"""
+
+    meta = {"dump_size" : st.st_size,
+            "dump_mtime" : st.st_mtime,
+            "dump_hash" : digest}
+    tmpname = "%s.tmp%i" % (cachename, os.getpid ())
+    try:
+        f = open (tmpname, "wb")
+        for piece in serialize_columns (tab, meta):
+            f.write (piece)
+            pass
+        f.close ()
+        os.rename (tmpname, cachename)
+    except EnvironmentError as e:
+        sys.stderr.write ("Cannot write symtab cache %s: %s\n"
+                          % (cachename, str (e)))
+        try:
+            os.unlink (tmpname)
+        except EnvironmentError:
+            pass
+        pass
+    return
+
+def load_symtab (filename, use_cache = True, section = None, jobs = 1):
+    """Return ColumnarSymtab of dump FILENAME.
+
+    It is taken from the cache file of the dump if that exists and
+    matches it, otherwise the dump is parsed and the cache written.
+    SECTION selects the symbol table and JOBS the number of parsing
+    processes like in DumpSymtab.load_from_dump."""
+
+    if not use_cache:
+        tab = ColumnarSymtab ()
+        tab.load_from_dump (filename, section, jobs=jobs)
+        return tab
+
+    cachename = cache_filename (filename, section)
+    st = os.stat (filename)
+    try:
+        (tab, header) = read_cache (cachename)
+        if header["dump_size"] == st.st_size:
+            if header["dump_mtime"] == st.st_mtime:
+                return tab
+            digest = file_digest (filename)
+            if digest == header["dump_hash"]:
+                # Only touched, remember the new time
+                write_cache (tab, cachename, st, digest)
+                return tab
+            pass
+    except (CacheInvalid, KeyError):
+        pass
+
+    digest = file_digest (filename)
+    tab = ColumnarSymtab ()
+    tab.load_from_dump (filename, section, jobs=jobs)
+    write_cache (tab, cachename, st, digest)
+    return tab
+
+
+def cache_main():
+    """Create or refresh caches of all dumps given on the command line"""
+
+    import time
+
+    if (len (sys.argv) < 2):
+        die ("""You need to specify file names of dumps.""")
+        pass
+
+    for filename in sys.argv[1:]:
+        start = time.time ()
+        tab = load_symtab (filename)
+        print ("%s: %i symbols in %.3f s" % (filename, len (tab.all_symbols),
+                                             time.time () - start))
+        pass
+    return
+
+if __name__ == '__main__':
+    cache_main()
@@ -0,0 +1,1019 @@
+#!/usr/bin/python
+
+# Compact columnar representation of a symbol table.  Instead of one
+# python object with a dozen lists per symbol, everything is stored
+# in typed arrays indexed by the position of the symbol in the table
+# (symbols are sorted by their order), names and other strings are
+# interned in a single string pool and edges are kept in CSR form,
+# i.e. an array of offsets into an array of targets.
+#
+# Thin Function and Variable views give the traditional interface so
+# scripts written against symtab.py work on ColumnarSymtab too.
+
+import sys
+from array import array
+from bisect import bisect_left
+from symtab import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Bits of the flags column
+
+FLAG_FUNCTION = 1
+FLAG_CLONE = 2
+FLAG_INLINED = 4
+FLAG_THUNK = 8
+FLAG_ADDRESS_TAKEN = 16
+
+# Names of the CSR edge kinds, each has an NAME_offsets and NAME_targets
+# array in the table
+
+edge_kinds = ["callers", "callees", "references", "referring", "clones",
+              "inlinees"]
+
+# Profile data of call edges, parallel to callees_targets, with their
+# array typecodes
+
+edge_profile_columns = [("callees_counts", "l"), ("callees_freqs", "d"),
+                        ("callees_edge_flags", "B")]
+
+# Names of all columns of a ColumnarSymtab apart from the string pool
+
+column_names = (["orders", "names", "flags", "visibilities", "availabilities",
+                 "attr_strings", "clone_of", "inlined_to", "counts",
+                 "count_qualities", "function_indices", "variable_indices",
+                 "uninlined_indices"]
+                + [kind + suffix for kind in edge_kinds + ["unhandled"]
+                   for suffix in ["_offsets", "_targets"]]
+                + [c for (c, typecode) in edge_profile_columns])
+
+if bytes is str:
+    def encode_str (s):
+        return s
+    def decode_str (b):
+        return str (b)
+else:
+    def encode_str (s):
+        return s.encode ("utf-8")
+    def decode_str (b):
+        return bytes (b).decode ("utf-8")
+    pass
+
+
+class StringPool (object):
+    """Interned strings stored back to back in one buffer"""
+
+    def __init__(self):
+        self.data = b""
+        self.offsets = array ("l", [0])
+        self.chunks = []
+        self.ids = {}
+        self.add ("")
+        return
+
+    def add (self, s):
+        """Intern string S and return its identifier"""
+
+        i = self.ids.get (s)
+        if i is None:
+            i = len (self.offsets) - 1
+            b = encode_str (s)
+            self.chunks.append (b)
+            self.offsets.append (self.offsets[-1] + len (b))
+            self.ids[s] = i
+            pass
+        return i
+
+    def freeze (self):
+        """Finish adding strings, drop the interning dictionary"""
+
+        if self.chunks:
+            self.data = self.data + b"".join (self.chunks)
+            self.chunks = []
+            pass
+        self.ids = None
+        return
+
+    def set_buffers (self, data, offsets):
+        """Use already frozen DATA and OFFSETS as the content of the pool"""
+
+        self.data = data
+        self.offsets = offsets
+        self.chunks = []
+        self.ids = None
+        return
+
+    def __len__ (self):
+        return len (self.offsets) - 1
+
+    def __getitem__ (self, i):
+        return decode_str (self.data[self.offsets[i]:self.offsets[i + 1]])
+
+
+def word_attr_string (val):
+    """Return attribute value VAL, a string or list of words, as a string"""
+
+    if isinstance (val, list):
+        return " ".join (val)
+    return val
+
+
+# Views of symbols stored in a ColumnarSymtab
+
+class ColumnarSymbolMixin (object):
+    """Attributes common to views of functions and variables"""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return repr((self.name, self.order))
+
+    def __eq__ (self, other):
+        return (isinstance (other, ColumnarSymbolMixin)
+                and self.index == other.index
+                and self.symtable is other.symtable)
+
+    def __ne__ (self, other):
+        return not self.__eq__ (other)
+
+    def __hash__ (self):
+        return self.index
+
+    def fixup (self):
+        return
+
+    @property
+    def name (self):
+        t = self.symtable
+        return t.pool[t.names[self.index]]
+
+    @property
+    def order (self):
+        return self.symtable.orders[self.index]
+
+    @property
+    def visibility (self):
+        val = self.symtable.pool[self.symtable.visibilities[self.index]]
+        if val == "":
+            return []
+        return simple_attr_value (val)
+
+    @property
+    def availability (self):
+        return simple_attr_value (self.symtable.pool[
+            self.symtable.availabilities[self.index]])
+
+    @property
+    def attrs (self):
+        return simple_attr_value (self.symtable.pool[
+            self.symtable.attr_strings[self.index]])
+
+    @property
+    def address_taken (self):
+        return bool (self.symtable.flags[self.index] & FLAG_ADDRESS_TAKEN)
+
+    @property
+    def references (self):
+        return self.symtable.edge_views ("references", self.index)
+
+    @property
+    def referring (self):
+        return self.symtable.edge_views ("referring", self.index)
+
+    @property
+    def references_orders (self):
+        return self.symtable.edge_orders ("references", self.index)
+
+    @property
+    def referring_orders (self):
+        return self.symtable.edge_orders ("referring", self.index)
+
+    @property
+    def unhandled_attributes (self):
+        t = self.symtable
+        i = self.index
+        return [t.pool[j] for j in t.unhandled_targets[t.unhandled_offsets[i]:
+                                                       t.unhandled_offsets[i+1]]]
+
+
+class ColumnarFunction (ColumnarSymbolMixin, Function):
+    """View of a function stored in a ColumnarSymtab"""
+
+    __slots__ = ("symtable", "index")
+
+    def __init__(self, table, index):
+        self.symtable = table
+        self.index = index
+        return
+
+    @property
+    def is_clone (self):
+        return bool (self.symtable.flags[self.index] & FLAG_CLONE)
+
+    @property
+    def is_inlined (self):
+        return bool (self.symtable.flags[self.index] & FLAG_INLINED)
+
+    @property
+    def is_thunk (self):
+        return bool (self.symtable.flags[self.index] & FLAG_THUNK)
+
+    @property
+    def count (self):
+        return self.symtable.counts[self.index]
+
+    @property
+    def count_quality (self):
+        return self.symtable.pool[self.symtable.count_qualities[self.index]]
+
+    @property
+    def clone_of (self):
+        return self.symtable.view (self.symtable.clone_of[self.index])
+
+    @property
+    def clone_of_order (self):
+        return self.symtable.orders[self.symtable.clone_of[self.index]]
+
+    @property
+    def inlined_to (self):
+        return self.symtable.view (self.symtable.inlined_to[self.index])
+
+    @property
+    def inlined_to_order (self):
+        return self.symtable.orders[self.symtable.inlined_to[self.index]]
+
+    @property
+    def callers (self):
+        return self.symtable.edge_views ("callers", self.index)
+
+    @property
+    def callees (self):
+        return self.symtable.edge_views ("callees", self.index)
+
+    @property
+    def callers_orders (self):
+        return self.symtable.edge_orders ("callers", self.index)
+
+    @property
+    def callees_orders (self):
+        return self.symtable.edge_orders ("callees", self.index)
+
+    @property
+    def callees_counts (self):
+        return self.symtable.edge_profile ("callees_counts", self.index)
+
+    @property
+    def callees_freqs (self):
+        return self.symtable.edge_profile ("callees_freqs", self.index)
+
+    @property
+    def callees_edge_flags (self):
+        return self.symtable.edge_profile ("callees_edge_flags", self.index)
+
+    @property
+    def clones (self):
+        return self.symtable.edge_views ("clones", self.index)
+
+    @property
+    def inlinees (self):
+        return self.symtable.edge_views ("inlinees", self.index)
+
+
+class ColumnarVariable (ColumnarSymbolMixin, Variable):
+    """View of a variable stored in a ColumnarSymtab"""
+
+    __slots__ = ("symtable", "index")
+
+    def __init__(self, table, index):
+        self.symtable = table
+        self.index = index
+        return
+
+
+class SymbolViews (object):
+    """Sequence of views of symbols with the given indices"""
+
+    def __init__(self, table, indices):
+        self.symtable = table
+        self.indices = indices
+        return
+
+    def __len__ (self):
+        return len (self.indices)
+
+    def __getitem__ (self, i):
+        if isinstance (i, slice):
+            return [self.symtable.view (j) for j in self.indices[i]]
+        return self.symtable.view (self.indices[i])
+
+    def __iter__ (self):
+        view = self.symtable.view
+        for i in self.indices:
+            yield view (i)
+            pass
+        return
+
+
+class OrderMap (object):
+    """Read-only mapping from symbol orders to views, like order_to_sym"""
+
+    def __init__(self, table):
+        self.symtable = table
+        return
+
+    def __getitem__ (self, order):
+        i = self.symtable.order_index (order)
+        if i < 0:
+            raise KeyError (order)
+        return self.symtable.view (i)
+
+    def get (self, order, default = None):
+        i = self.symtable.order_index (order)
+        if i < 0:
+            return default
+        return self.symtable.view (i)
+
+    def __contains__ (self, order):
+        return self.symtable.order_index (order) >= 0
+
+    def __len__ (self):
+        return len (self.symtable.orders)
+
+    def __iter__ (self):
+        return iter (self.symtable.orders)
+
+    def keys (self):
+        return list (self.symtable.orders)
+
+
+class ColumnarSymtab (Symtab):
+    """Symbol table stored in typed arrays rather than in python objects"""
+
+    def __init__(self):
+        self.pool = StringPool()
+        self.pool.freeze()
+        self.orders = array ("i")
+        self.names = array ("i")
+        self.flags = array ("B")
+        self.visibilities = array ("i")
+        self.availabilities = array ("i")
+        self.attr_strings = array ("i")
+        self.clone_of = array ("i")
+        self.inlined_to = array ("i")
+        self.counts = array ("l")
+        self.count_qualities = array ("i")
+        for kind in edge_kinds + ["unhandled"]:
+            setattr (self, kind + "_offsets", array ("l", [0]))
+            setattr (self, kind + "_targets", array ("i"))
+            pass
+        for (c, typecode) in edge_profile_columns:
+            setattr (self, c, array (typecode))
+            pass
+        self.function_indices = array ("i")
+        self.variable_indices = array ("i")
+        self.uninlined_indices = array ("i")
+        self.set_views ()
+        return
+
+    def set_views (self):
+        """Set up the traditional Symtab sequences over the columns"""
+
+        self.order_to_sym = OrderMap (self)
+        self.all_symbols = SymbolViews (self, array ("i", range (len (
+                        self.orders))))
+        self.all_functions = SymbolViews (self, self.function_indices)
+        self.all_variables = SymbolViews (self, self.variable_indices)
+        self.uninlined_functions = SymbolViews (self, self.uninlined_indices)
+        return
+
+    def fixup (self):
+        return
+
+    def columns (self):
+        """Return a list of (name, column) pairs holding all the data"""
+
+        r = [("pool_data", self.pool.data), ("pool_offsets", self.pool.offsets)]
+        r.extend ([(c, getattr (self, c)) for c in column_names])
+        return r
+
+    def set_columns (self, columns):
+        """Take all data from dictionary COLUMNS as returned by columns()"""
+
+        self.pool = StringPool ()
+        self.pool.set_buffers (columns["pool_data"], columns["pool_offsets"])
+        for c in column_names:
+            setattr (self, c, columns[c])
+            pass
+        self.set_views ()
+        return
+
+    def name_order_pairs (self):
+        names = {}
+        pool = self.pool
+        for (order, name_id) in zip (self.orders, self.names):
+            name = names.get (name_id)
+            if name is None:
+                name = pool[name_id]
+                names[name_id] = name
+                pass
+            yield (name, order)
+            pass
+        return
+
+    def symbol_index (self, order):
+        """Return index of the symbol with ORDER, raise KeyError if there
+        is none"""
+
+        i = self.order_index (order)
+        if i < 0:
+            raise KeyError (order)
+        return i
+
+    def symbol_links (self):
+        """Return the links of Symtab.symbol_links, which are the clone_of
+        and inlined_to columns themselves"""
+
+        return (self.all_symbols, self.symbol_index, self.clone_of,
+                self.inlined_to)
+
+    def call_graph (self):
+        """Return the call graph of Symtab.call_graph taken from the callee
+        edge columns, without making views of the functions"""
+
+        nsyms = len (self.orders)
+        positions = array ("l", [-1]) * nsyms
+        for (p, i) in enumerate (self.function_indices):
+            positions[i] = p
+            pass
+
+        def position (order):
+            p = positions[self.symbol_index (order)]
+            if p < 0:
+                raise KeyError (order)
+            return p
+
+        src_offsets = self.callees_offsets
+        src_targets = self.callees_targets
+        src_counts = self.callees_counts
+        src_freqs = self.callees_freqs
+        if (len (src_counts) != len (src_targets)
+            or len (src_freqs) != len (src_targets)):
+            src_counts = src_freqs = [0] * len (src_targets)
+            pass
+        offsets = array ("l", [0])
+        targets = array ("l")
+        counts = array ("l")
+        freqs = array ("d")
+        for i in self.function_indices:
+            for e in range (src_offsets[i], src_offsets[i + 1]):
+                p = positions[src_targets[e]]
+                if p >= 0:
+                    targets.append (p)
+                    counts.append (src_counts[e])
+                    freqs.append (src_freqs[e])
+                    pass
+                pass
+            offsets.append (len (targets))
+            pass
+
+        external = self.word_test ("visibilities", visibility_words,
+                                   ["externally_visible"], [])
+        roots = [p for (p, i) in enumerate (self.function_indices)
+                 if external[i] or self.flags[i] & FLAG_ADDRESS_TAKEN]
+        return (self.all_functions, position, roots, offsets, targets, counts,
+                freqs)
+
+    def view (self, i):
+        """Return a view of the symbol with index I"""
+
+        if self.flags[i] & FLAG_FUNCTION:
+            return ColumnarFunction (self, i)
+        return ColumnarVariable (self, i)
+
+    def order_index (self, order):
+        """Return index of the symbol with ORDER or -1 if there is none"""
+
+        i = bisect_left (self.orders, order)
+        if i < len (self.orders) and self.orders[i] == order:
+            return i
+        return -1
+
+    def edge_targets (self, kind, i):
+        """Return indices of symbols of edges of KIND of symbol I"""
+
+        offsets = getattr (self, kind + "_offsets")
+        return getattr (self, kind + "_targets")[offsets[i]:offsets[i + 1]]
+
+    def edge_views (self, kind, i):
+        return [self.view (j) for j in self.edge_targets (kind, i)]
+
+    def edge_orders (self, kind, i):
+        return [self.orders[j] for j in self.edge_targets (kind, i)]
+
+    def edge_profile (self, column, i):
+        """Return list of values of COLUMN for edges to callees of symbol I"""
+
+        start = self.callees_offsets[i]
+        return list (getattr (self, column)[start:self.callees_offsets[i + 1]])
+
+    def column_array (self, column):
+        """Return COLUMN as a numpy array sharing memory with it"""
+
+        col = getattr (self, column)
+        if isinstance (col, memoryview):
+            typecode = col.format
+        else:
+            typecode = col.typecode
+            pass
+        return numpy.frombuffer (col, dtype=numpy.dtype (typecode))
+
+    def distinct_ids (self, column):
+        """Return sorted list of distinct string ids in COLUMN"""
+
+        cache = getattr (self, "cached_distinct_ids", None)
+        if cache is None:
+            cache = {}
+            self.cached_distinct_ids = cache
+            pass
+        ids = cache.get (column)
+        if ids is None:
+            if numpy is not None:
+                ids = [int (i) for i in numpy.unique (self.column_array (
+                            column))]
+            else:
+                ids = sorted (set (getattr (self, column)))
+                pass
+            cache[column] = ids
+            pass
+        return ids
+
+    def word_masks (self, column, vocabulary):
+        """Return bitmasks of words in string COLUMN of every symbol.
+
+        COLUMN is "visibilities" or "attr_strings", VOCABULARY the
+        corresponding WordVocabulary.  With numpy, the result is a
+        numpy array, of unsigned 64-bit integers if the vocabulary is
+        small enough."""
+
+        pool = self.pool
+        masks = {}
+        for i in self.distinct_ids (column):
+            masks[i] = vocabulary.mask (simple_attr_value (pool[i]))
+            pass
+        if numpy is None:
+            return [masks[i] for i in getattr (self, column)]
+        if len (vocabulary.words) <= 64:
+            dtype = numpy.uint64
+        else:
+            dtype = object
+            pass
+        lookup = numpy.zeros (len (pool), dtype=dtype)
+        for (i, m) in masks.items ():
+            lookup[i] = m
+            pass
+        return lookup[self.column_array (column)]
+
+    def visibility_masks (self):
+        return self.word_masks ("visibilities", visibility_words)
+
+    def flag_masks (self):
+        return self.word_masks ("attr_strings", flag_words)
+
+    def word_test (self, column, vocabulary, present, absent):
+        """Return per symbol booleans telling if string COLUMN of it has
+        all words in PRESENT and none in ABSENT."""
+
+        want = vocabulary.mask (list (present))
+        bad = vocabulary.mask (list (absent))
+        pool = self.pool
+        good = []
+        for i in self.distinct_ids (column):
+            m = vocabulary.mask (simple_attr_value (pool[i]))
+            if m & want == want and not m & bad:
+                good.append (i)
+                pass
+            pass
+        if numpy is None:
+            good = set (good)
+            return [i in good for i in getattr (self, column)]
+        lookup = numpy.zeros (len (pool), dtype=bool)
+        lookup[good] = True
+        return lookup[self.column_array (column)]
+
+    def select_indices (self, kind=None, visibility=(), not_visibility=(),
+                        flags=(), not_flags=(), inlined=None, clone=None,
+                        thunk=None):
+        """Return indices of symbols selected like in Symtab.select.
+
+        With numpy, all tests are done over whole columns at once and
+        the result is a numpy array."""
+
+        tests = []
+        if kind == "function":
+            tests.append ((FLAG_FUNCTION, True))
+        elif kind == "variable":
+            tests.append ((FLAG_FUNCTION, False))
+            pass
+        for (bit, val) in [(FLAG_INLINED, inlined), (FLAG_CLONE, clone),
+                           (FLAG_THUNK, thunk)]:
+            if val is not None:
+                tests.append ((bit, val))
+                pass
+            pass
+        word_tests = []
+        if visibility or not_visibility:
+            word_tests.append (self.word_test ("visibilities",
+                                               visibility_words,
+                                               visibility, not_visibility))
+            pass
+        if flags or not_flags:
+            word_tests.append (self.word_test ("attr_strings", flag_words,
+                                               flags, not_flags))
+            pass
+
+        if numpy is None:
+            r = []
+            for (i, f) in enumerate (self.flags):
+                if ([bit for (bit, val) in tests if bool (f & bit) != val]
+                    or [t for t in word_tests if not t[i]]):
+                    continue
+                r.append (i)
+                pass
+            return array ("i", r)
+
+        flag_col = self.column_array ("flags")
+        sel = numpy.ones (len (flag_col), dtype=bool)
+        for (bit, val) in tests:
+            sel &= ((flag_col & bit) != 0) == val
+            pass
+        for t in word_tests:
+            sel &= t
+            pass
+        return numpy.nonzero (sel)[0]
+
+    def select (self, *args, **kwargs):
+        return SymbolViews (self, self.select_indices (*args, **kwargs))
+
+    def load_from_dump (self, filename, section = None, sections = None,
+                        jobs = 1):
+        """Read the symtab info from the dump file.
+
+        SECTION, SECTIONS and JOBS have the same meaning as in
+        DumpSymtab.load_from_dump."""
+
+        builder = ColumnarBuilder ()
+        if jobs > 1:
+            for columns in iter_dump_chunks_parallel (filename, jobs, section,
+                                                      sections):
+                builder.add_chunk (columns)
+                pass
+            pass
+        else:
+            builder.read_dump (filename, section_offset (filename, section,
+                                                         sections))
+            pass
+        builder.finish (self)
+        return
+
+
+# Construction of a ColumnarSymtab from a dump
+
+class ColumnarBuilder (DumpSymtab):
+    """Dump reader which packs every symbol into columns as soon as it
+    has been read instead of keeping it around."""
+
+    def __init__(self):
+        DumpSymtab.__init__ (self)
+        self.pool = StringPool ()
+
+        # Columns in the order of the dump, with orders instead of
+        # indices in the edge and clone/inline columns
+        self.orders = array ("i")
+        self.names = array ("i")
+        self.flags = array ("B")
+        self.visibilities = array ("i")
+        self.availabilities = array ("i")
+        self.attr_strings = array ("i")
+        self.clone_of = array ("i")
+        self.inlined_to = array ("i")
+        self.counts = array ("l")
+        self.count_qualities = array ("i")
+        self.edge_offsets = {}
+        self.edge_orders = {}
+        for kind in edge_kinds[:4] + ["unhandled"]:
+            self.edge_offsets[kind] = array ("l", [0])
+            self.edge_orders[kind] = array ("i")
+            pass
+        for (c, typecode) in edge_profile_columns:
+            setattr (self, c, array (typecode))
+            pass
+        return
+
+    def add_symbol (self, sym):
+        """Append data of symbol SYM to the columns"""
+
+        pool = self.pool
+        self.orders.append (sym.order)
+        self.names.append (pool.add (sym.name))
+        self.visibilities.append (pool.add (word_attr_string (sym.visibility)))
+        self.availabilities.append (pool.add (word_attr_string (
+                    sym.availability)))
+        self.attr_strings.append (pool.add (word_attr_string (sym.attrs)))
+
+        flags = 0
+        if sym.address_taken:
+            flags |= FLAG_ADDRESS_TAKEN
+            pass
+        edges = [("references", sym.references_orders),
+                 ("referring", sym.referring_orders)]
+        if isinstance (sym, Function):
+            flags |= FLAG_FUNCTION
+            if sym.is_clone:
+                flags |= FLAG_CLONE
+                pass
+            if sym.is_inlined:
+                flags |= FLAG_INLINED
+                pass
+            if sym.is_thunk:
+                flags |= FLAG_THUNK
+                pass
+            self.counts.append (sym.count)
+            self.count_qualities.append (pool.add (sym.count_quality))
+            edges.append (("callers", sym.callers_orders))
+            edges.append (("callees", sym.callees_orders))
+            n = len (sym.callees_orders)
+            for (c, typecode) in edge_profile_columns:
+                vals = getattr (sym, c)
+                if len (vals) != n:
+                    vals = [0] * n
+                    pass
+                getattr (self, c).extend (vals)
+                pass
+        else:
+            self.counts.append (-1)
+            self.count_qualities.append (0)
+            pass
+        self.flags.append (flags)
+        if flags & FLAG_CLONE:
+            self.clone_of.append (sym.clone_of_order)
+        else:
+            self.clone_of.append (-1)
+            pass
+        if flags & FLAG_INLINED:
+            self.inlined_to.append (sym.inlined_to_order)
+        else:
+            self.inlined_to.append (-1)
+            pass
+
+        edges.append (("unhandled", [pool.add (s)
+                                     for s in sym.unhandled_attributes]))
+        for (kind, targets) in edges:
+            self.edge_orders[kind].extend (targets)
+            pass
+        for kind in self.edge_offsets:
+            self.edge_offsets[kind].append (len (self.edge_orders[kind]))
+            pass
+        return
+
+    # Columns of symbols in the order of the dump, which is how chunks
+    # of parallel parsing are sent back to the parent process
+    chunk_column_names = ["orders", "names", "flags", "visibilities",
+                          "availabilities", "attr_strings", "clone_of",
+                          "inlined_to", "counts", "count_qualities"]
+
+    def chunk_columns (self):
+        """Return dictionary of the columns of all symbols added so far.
+
+        Edges and clone/inline links are by orders and all strings in
+        the pool of the chunk, the result can be given to add_chunk of
+        another builder."""
+
+        self.pool.freeze ()
+        r = {"pool_data" : self.pool.data, "pool_offsets" : self.pool.offsets}
+        for c in self.chunk_column_names:
+            r[c] = getattr (self, c)
+            pass
+        for kind in self.edge_offsets:
+            r[kind + "_offsets"] = self.edge_offsets[kind]
+            r[kind + "_targets"] = self.edge_orders[kind]
+            pass
+        for (c, typecode) in edge_profile_columns:
+            r[c] = getattr (self, c)
+            pass
+        return r
+
+    def add_chunk (self, columns):
+        """Append symbols in COLUMNS returned by chunk_columns"""
+
+        chunk_pool = StringPool ()
+        chunk_pool.set_buffers (columns["pool_data"], columns["pool_offsets"])
+        ids = array ("i", [self.pool.add (chunk_pool[i])
+                           for i in range (len (chunk_pool))])
+        for c in self.chunk_column_names:
+            if c in ("names", "visibilities", "availabilities",
+                     "attr_strings", "count_qualities"):
+                getattr (self, c).extend (array ("i", [ids[i]
+                                                       for i in columns[c]]))
+            else:
+                getattr (self, c).extend (columns[c])
+                pass
+            pass
+        for kind in self.edge_offsets:
+            base = len (self.edge_orders[kind])
+            self.edge_offsets[kind].extend (array ("l", [
+                        base + o for o in columns[kind + "_offsets"][1:]]))
+            targets = columns[kind + "_targets"]
+            if kind == "unhandled":
+                targets = array ("i", [ids[i] for i in targets])
+                pass
+            self.edge_orders[kind].extend (targets)
+            pass
+        for (c, typecode) in edge_profile_columns:
+            getattr (self, c).extend (columns[c])
+            pass
+        return
+
+    def finish (self, tab):
+        """Sort the packed symbols by order and store them to TAB"""
+
+        n = len (self.orders)
+        perm = sorted (range (n), key=self.orders.__getitem__)
+        index_of = {}
+        for (i, p) in enumerate (perm):
+            index_of[self.orders[p]] = i
+            pass
+
+        self.pool.freeze ()
+        tab.pool = self.pool
+        for (c, typecode) in edge_profile_columns:
+            setattr (tab, c, array (typecode))
+            pass
+        for col in ["orders", "names", "flags", "visibilities",
+                    "availabilities", "attr_strings", "counts",
+                    "count_qualities"]:
+            src = getattr (self, col)
+            setattr (tab, col, array (src.typecode, [src[p] for p in perm]))
+            pass
+        tab.clone_of = array ("i", [index_of[self.clone_of[p]]
+                                    if self.clone_of[p] >= 0 else -1
+                                    for p in perm])
+        tab.inlined_to = array ("i", [index_of[self.inlined_to[p]]
+                                      if self.inlined_to[p] >= 0 else -1
+                                      for p in perm])
+
+        for kind in self.edge_offsets:
+            src_offsets = self.edge_offsets[kind]
+            src_targets = self.edge_orders[kind]
+            offsets = array ("l", [0])
+            targets = array ("i")
+            if kind == "callees":
+                profile = [(getattr (self, c), getattr (tab, c))
+                           for (c, typecode) in edge_profile_columns]
+            else:
+                profile = []
+                pass
+            for p in perm:
+                vals = src_targets[src_offsets[p]:src_offsets[p + 1]]
+                if kind != "unhandled":
+                    vals = [index_of[o] for o in vals]
+                    pass
+                targets.extend (vals)
+                offsets.append (len (targets))
+                for (src, dst) in profile:
+                    dst.extend (src[src_offsets[p]:src_offsets[p + 1]])
+                    pass
+                pass
+            setattr (tab, kind + "_offsets", offsets)
+            setattr (tab, kind + "_targets", targets)
+            self.edge_offsets[kind] = None
+            self.edge_orders[kind] = None
+            pass
+
+        tab.function_indices = array ("i", [i for i in range (n)
+                                            if tab.flags[i] & FLAG_FUNCTION])
+        tab.variable_indices = array ("i", [i for i in range (n)
+                                            if not tab.flags[i] & FLAG_FUNCTION])
+        tab.uninlined_indices = array ("i", [i for i in tab.function_indices
+                                             if not tab.flags[i] & FLAG_INLINED])
+        tab.clones_offsets, tab.clones_targets = invert_links (tab.clone_of)
+        tab.inlinees_offsets, tab.inlinees_targets = invert_links (
+            tab.inlined_to)
+        tab.set_views ()
+        return
+
+
+def chunk_symbols (columns):
+    """Generator of DumpFunctions and DumpVariables (with no table) of
+    the symbols in COLUMNS returned by ColumnarBuilder.chunk_columns"""
+
+    pool = StringPool ()
+    pool.set_buffers (columns["pool_data"], columns["pool_offsets"])
+    strings = [pool[i] for i in range (len (pool))]
+    edges = [(kind + "_orders", columns[kind + "_offsets"],
+              columns[kind + "_targets"])
+             for kind in ["references", "referring"]]
+    calls = [(kind + "_orders", columns[kind + "_offsets"],
+              columns[kind + "_targets"])
+             for kind in ["callers", "callees"]]
+    callees_offsets = columns["callees_offsets"]
+    unhandled_offsets = columns["unhandled_offsets"]
+    unhandled_targets = columns["unhandled_targets"]
+    profile = [(c, columns[c]) for (c, typecode) in edge_profile_columns]
+
+    names = columns["names"]
+    flags_col = columns["flags"]
+    visibilities = columns["visibilities"]
+    availabilities = columns["availabilities"]
+    attr_strings = columns["attr_strings"]
+    for (i, order) in enumerate (columns["orders"]):
+        flags = flags_col[i]
+        if flags & FLAG_FUNCTION:
+            sym = DumpFunction (None, strings[names[i]], order)
+        else:
+            sym = DumpVariable (None, strings[names[i]], order)
+            pass
+        val = strings[visibilities[i]]
+        if val != "":
+            sym.visibility = simple_attr_value (val)
+            pass
+        sym.availability = simple_attr_value (strings[availabilities[i]])
+        sym.attrs = simple_attr_value (strings[attr_strings[i]])
+        sym.address_taken = bool (flags & FLAG_ADDRESS_TAKEN)
+        sym.unhandled_attributes = [strings[j] for j in unhandled_targets[
+                unhandled_offsets[i]:unhandled_offsets[i + 1]]]
+        for (attr, offsets, targets) in edges:
+            setattr (sym, attr, list (targets[offsets[i]:offsets[i + 1]]))
+            pass
+        if flags & FLAG_FUNCTION:
+            for (attr, offsets, targets) in calls:
+                setattr (sym, attr, list (targets[offsets[i]:offsets[i + 1]]))
+                pass
+            start = callees_offsets[i]
+            end = callees_offsets[i + 1]
+            if end > start:
+                for (c, col) in profile:
+                    setattr (sym, c, list (col[start:end]))
+                    pass
+                pass
+            sym.count = columns["counts"][i]
+            sym.count_quality = strings[columns["count_qualities"][i]]
+            if flags & FLAG_CLONE:
+                sym.is_clone = True
+                sym.clone_of_order = columns["clone_of"][i]
+                pass
+            if flags & FLAG_INLINED:
+                sym.is_inlined = True
+                sym.inlined_to_order = columns["inlined_to"][i]
+                pass
+            sym.is_thunk = bool (flags & FLAG_THUNK)
+            pass
+        yield sym
+        pass
+    return
+
+
+def invert_links (links):
+    """Return CSR offsets and targets of children given parent LINKS"""
+
+    n = len (links)
+    counts = array ("l", [0]) * (n + 1)
+    for p in links:
+        if p >= 0:
+            counts[p + 1] += 1
+            pass
+        pass
+    for i in range (n):
+        counts[i + 1] += counts[i]
+        pass
+    pos = array ("l", counts)
+    targets = array ("i", [0]) * counts[n]
+    for (i, p) in enumerate (links):
+        if p >= 0:
+            targets[pos[p]] = i
+            pos[p] += 1
+            pass
+        pass
+    return (counts, targets)
+
+
+def columnar_main():
+    """Load a dump given on the command line and print a summary of it"""
+
+    if (len (sys.argv) < 2):
+        die ("""You need to specify the file name.""")
+        pass
+
+    tab = ColumnarSymtab()
+    tab.load_from_dump (sys.argv[1])
+    for f in tab.uninlined_functions:
+        print ("%s/%i callers: %i, callees: %i, inlinees: %i, clones: %i"
+               % (f.name, f.order, len(f.callers), len(f.callees),
+                  len(f.inlinees), len(f.clones)))
+        pass
+    return
+
+if __name__ == '__main__':
+    columnar_main()
@@ -0,0 +1,260 @@
+#!/usr/bin/python
+
+# Benchmark of comparing inlining in two dumps with
+# symtab_compare_inlining.py.  Compares the hash join of per-function
+# Counters with the original merge of sorted lists, which counted the
+# inline copies of each origin by scanning the whole list of inlinees
+# again, so that its cost grows with the product of the numbers of
+# inlinees and their origins in a function.  The generated dumps
+# therefore consist of large functions with thousands of inline copies
+# of thousands of origins.
+
+import sys
+import os
+import time
+import getopt
+import tempfile
+import symtab_compare_inlining
+from symtab import *
+from symtab_cache import load_symtab
+from symtab_compare_inlining import (compare_tables, report_extra_function,
+                                     report_extra_inlining_in_func)
+from symtab_gen_dump import DumpGenerator
+
+
+# The original comparison, kept here only to have something to compare
+# with.  It sorts by name, matches in a merge and counts multiplicities
+# with list.count.
+
+def legacy_compare_same_functions (st1, st2, f1, f2):
+    ils1 = sorted ([f.get_origin().order for f in f1.inlinees])
+    ils2 = sorted ([f.get_origin().order for f in f2.inlinees])
+    u1 = [(st1.order_to_sym[u], ils1.count(u)) for u in sorted (set (ils1))]
+    u2 = [(st2.order_to_sym[u], ils2.count(u)) for u in sorted (set (ils2))]
+    u1.sort (key=lambda u: u[0].name)
+    u2.sort (key=lambda u: u[0].name)
+
+    i1 = 0
+    i2 = 0
+    ex1 = []
+    ex2 = []
+    while True:
+        if i1 >= len (u1):
+            ex2.extend ([(x[0], x[1], 0) for x in u2[i2:]])
+            break
+        if i2 >= len (u2):
+            ex1.extend ([(x[0], x[1], 0) for x in u1[i1:]])
+            break
+        z1 = u1[i1]
+        z2 = u2[i2]
+        if z1[0].name == z2[0].name:
+            i1 = i1 + 1
+            i2 = i2 + 1
+            if z1[1] > z2[1]:
+                ex1.append ((z1[0], z1[1], z2[1]))
+            elif z1[1] < z2[1]:
+                ex2.append ((z2[0], z2[1], z1[1]))
+                pass
+        elif z1[0].name < z2[0].name:
+            ex1.append((z1[0], z1[1], 0))
+            i1 = i1 + 1
+        else:
+            ex2.append((z2[0], z2[1], 0))
+            i2 = i2 + 1
+            pass
+        pass
+    if ex1:
+        report_extra_inlining_in_func (1, st1, f1, ex1)
+        pass
+    if ex2:
+        report_extra_inlining_in_func (2, st2, f2, ex2)
+        pass
+    return
+
+def legacy_compare_tables (st1, st2):
+    l1 = sorted ([f for f in st1.uninlined_functions if len (f.callers) > 0],
+                 key=lambda sym: sym.name)
+    l2 = sorted ([f for f in st2.uninlined_functions if len (f.callers) > 0],
+                 key=lambda sym: sym.name)
+    i1 = 0
+    i2 = 0
+    while i1 < len (l1) and i2 < len (l2):
+        f1 = l1[i1]
+        f2 = l2[i2]
+        if f1.name == f2.name:
+            legacy_compare_same_functions (st1, st2, f1, f2)
+            i1 = i1 + 1
+            i2 = i2 + 1
+        elif f1.name < f2.name:
+            report_extra_function (1, st1, f1)
+            i1 = i1 + 1
+        else:
+            report_extra_function (2, st2, f2)
+            i2 = i2 + 1
+            pass
+        pass
+    for f in l1[i1:]:
+        report_extra_function (1, st1, f)
+        pass
+    for f in l2[i2:]:
+        report_extra_function (2, st2, f)
+        pass
+    return
+
+
+class LineCounter (object):
+    """File-like object which only counts lines written to it"""
+
+    def __init__(self):
+        self.lines = 0
+        return
+
+    def write (self, s):
+        self.lines = self.lines + s.count ("\n")
+        return
+
+def time_compare (compare, st1, st2, repeat):
+    """Return best time of REPEAT runs of COMPARE and lines it printed"""
+
+    best = None
+    for i in range (repeat):
+        out = LineCounter ()
+        saved = sys.stdout
+        sys.stdout = out
+        start = time.time ()
+        try:
+            compare (st1, st2)
+        finally:
+            sys.stdout = saved
+            pass
+        elapsed = time.time () - start
+        if best is None or elapsed < best:
+            best = elapsed
+            pass
+        pass
+    return (best, out.lines)
+
+def print_usage():
+    print ("""  symtab_compare_bench.py - Time comparison of inlining in two dumps
+
+Usage: symtab_compare_bench.py [options] dump-file-1 dump-file-2
+       symtab_compare_bench.py [options] -G number-of-symbols
+
+Options:
+
+-h, --help           Display this help and quit.
+-r N                 Run each comparison N times, 3 by default.
+-G                   Compare two dumps generated by symtab_gen_dump.py
+                     with the given number of symbols which differ in
+                     the fraction of inline copies.
+-i RATIO             Fraction of inline copies in the first generated
+                     dump, 0.6 by default, the second has 0.05 more.
+-b SIZE              Size of blocks of the generated dumps, each starting
+                     with a function with inline copies of functions
+                     following it, 20000 by default, 0 for no blocks.
+-O N                 Number of origins of inline copies in a block,
+                     4000 by default.
+-L                   Do not run the original comparison.
+""")
+
+def compare_bench_main():
+    """The main function."""
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hr:Gi:Lb:O:", ["help"])
+    except getopt.GetoptError as err:
+        print_usage()
+        die(str(err))
+        pass
+
+    repeat = 3
+    generate = False
+    inline_ratio = 0.6
+    inline_block = 20000
+    inline_origins = 4000
+    legacy = True
+    try:
+        for o, a in opts:
+            if o in ("-h", "--help"):
+                print_usage()
+                sys.exit(0)
+            elif o == "-r":
+                repeat = int (a)
+            elif o == "-G":
+                generate = True
+            elif o == "-i":
+                inline_ratio = float (a)
+            elif o == "-L":
+                legacy = False
+            elif o == "-b":
+                inline_block = int (a)
+            elif o == "-O":
+                inline_origins = int (a)
+                pass
+            continue
+    except ValueError as err:
+        die ("Invalid option value: %s" % str (err))
+        pass
+
+    start = time.time ()
+    if generate:
+        if len (args) != 1:
+            print_usage()
+            die ("You need to specify the number of symbols.")
+            pass
+        try:
+            symbols = int (args[0])
+        except ValueError:
+            die ("The number of symbols must be an integer.")
+            pass
+        if inline_block > 0 and inline_origins + 1 >= inline_block:
+            die ("Blocks must be larger than the number of origins plus one.")
+            pass
+        tabs = []
+        for ratio in [inline_ratio, inline_ratio + 0.05]:
+            (fd, filename) = tempfile.mkstemp (prefix="symtab-",
+                                               suffix=".dump")
+            out = os.fdopen (fd, "w")
+            DumpGenerator (symbols, inline_ratio=ratio,
+                           inline_block=inline_block,
+                           inline_origins=inline_origins).write (out)
+            out.close ()
+            try:
+                tabs.append (load_symtab (filename, use_cache=False))
+            finally:
+                os.unlink (filename)
+                pass
+            pass
+        (st1, st2) = tabs
+    else:
+        if len (args) != 2:
+            print_usage()
+            die ("You need to specify two dump files.")
+            pass
+        st1 = load_symtab (args[0])
+        st2 = load_symtab (args[1])
+        pass
+    load_time = time.time () - start
+
+    # Build the forests so that only the comparison itself is timed
+    st1.forest ()
+    st2.forest ()
+    symtab_compare_inlining.match_by = "name"
+    (new_time, new_lines) = time_compare (compare_tables, st1, st2, repeat)
+
+    print ("Functions:      {0:d} and {1:d}".format (len (st1.all_functions),
+                                                    len (st2.all_functions)))
+    print ("Loading:        {0:.3f} s".format (load_time))
+    print ("Report lines:   {0:d}".format (new_lines))
+    print ("Hash join:      {0:.3f} s".format (new_time))
+    if legacy:
+        (legacy_time, legacy_lines) = time_compare (legacy_compare_tables,
+                                                    st1, st2, repeat)
+        print ("Original:       {0:.3f} s, {1:d} report lines".format (
+                legacy_time, legacy_lines))
+        print ("Speedup:        {0:.2f}x".format (legacy_time / new_time))
+        pass
+    return
+
+if __name__ == '__main__':
+    compare_bench_main()
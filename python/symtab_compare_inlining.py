@@ -2,10 +2,19 @@
 
 # This scripts takes two filenames of inline dumps as parameters,
 # extracts their symbol table and compares inlining decisions in them.
+#
+# Given more dumps, e.g. of builds with different inlining parameters,
+# it loads them all in parallel, builds a sparse matrix of the number
+# of inline copies of every origin in every caller in every build and
+# lists the pairs on which the builds disagree the most.
 
 import sys
-import re
-from symtab import *
+import getopt
+import multiprocessing
+from collections import Counter
+from symtab_cache import load_symtab
+from symtab_names import clone_key, clone_numbers
+from symtab_inline_dump import load_inline_decisions
 
 def die (s):
     "Give a string warning S to stderr and abort with exit code 1."
@@ -13,49 +22,52 @@ def die (s):
     sys.exit (1)
     pass
 
-#by_order = True
-by_order = False
+# How functions are matched between dumps: "name", "order" or
+# "clone", see function_key
+match_by = "name"
 
-def compare_functions (f1, f2):
-    global by_order
+# InlineDecisions of the first and second dump if inlining differences
+# are to be annotated with the estimates of the inliner
+inline_decisions = None
 
-    if by_order:
-        if f1.order == f2.order:
-            return 0
-        elif f1.order < f2.order:
-            return -1
-        else:
-            return 1
-        pass
-    else:
-        if f1.name == f2.name:
-            return 0
-        elif f1.name < f2.name:
-            return -1
-        else:
-            return 1
-        pass
-    pass
+def function_key (f):
+    """Return the key by which function F is matched with functions of
+    the other dump"""
+
+    if match_by == "order":
+        return f.order
+    if match_by == "clone":
+        return clone_key (f.name)
+    return f.name
+
+def function_tiebreak (f):
+    """Return sort key of functions with the same key, those with the same
+    position are matched with each other"""
+
+    if match_by == "clone":
+        return (clone_numbers (f.name), f.name, f.order)
+    return f.order
 
 def report_extra_function (num, st, f):
     """Extra top-level function F in dump number NUM, symtab ST"""
 
-    print "In file %i: extra un-inlined function %s/%i" % (num, f.name, f.order)
+    print ("In file %i: extra un-inlined function %s/%i"
+           % (num, f.name, f.order))
     if f.is_clone:
         o = f.get_origin ()
-        print "  Originally a clone of %s/%i" % (o.name, o.order)
+        print ("  Originally a clone of %s/%i" % (o.name, o.order))
         pass
-    print "  Callers: %i, Callees: %i, Inlinees: %i" % (len(f.callers),
-                                                        len(f.callees),
-                                                        len(f.inlinees))
+    print ("  Callers: %i, Callees: %i, Inlinees: %i" % (len(f.callers),
+                                                         len(f.callees),
+                                                         len(f.inlinees)))
     if len(f.inlinees) > 0:
-        print "  Inlinees:"
+        print ("  Inlinees:")
         for i in f.inlinees:
             o = i.get_origin ()
-            print "    %s/%i" % (o.name, o.order)
+            print ("    %s/%i" % (o.name, o.order))
             pass
         pass
-    print ""
+    print ("")
     return
 
 def report_extra_inlining_in_func (num, st, f, ex):
@@ -70,71 +82,79 @@ inlined into the function in the other dump."""
 
     for z in ex:
         c = z[0]
-        print ("  Function %s/%i inlined %i times (as opposed to %i times)"
-               % (c.name, c.order, z[1], z[2]))
+        line = ("  Function %s/%i inlined %i times (as opposed to %i times)"
+                % (c.name, c.order, z[1], z[2]))
+        if inline_decisions is not None:
+            line = line + estimates_note (num, f, c)
+            pass
+        print (line)
         pass
 
-    print ""
+    print ("")
     return
 
-def compare_same_functions (st1, st2, f1, f2):
-    global by_order
+def inlinee_counts (f):
+    """Return Counter of keys of origins of inlinees of F and dictionary
+    mapping the keys to the origins"""
+
+    counts = Counter ()
+    origins = {}
+    for i in f.inlinees:
+        o = i.get_origin ()
+        k = function_key (o)
+        counts[k] += 1
+        if k not in origins:
+            origins[k] = o
+            pass
+        pass
+    return (counts, origins)
+
+def estimates_note (num, f, c):
+    """Return text describing estimated effects of inlining C into F in
+    dump NUM"""
+
+    (size, time, badness) = inline_decisions[num - 1].estimates (f, c)
+    if badness is None:
+        return ", no inliner record"
+    note = ", size %+i" % size
+    if time is not None:
+        note = note + ", time %+.2f" % time
+        pass
+    return note + ", badness %g" % badness
 
-    ils1 = map (lambda f: f.get_origin().order, f1.inlinees)
-    ils2 = map (lambda f: f.get_origin().order, f2.inlinees)
-    ils1.sort ()
-    ils2.sort ()
+def inlining_impact (num, f, z):
+    """Return sort key of extra inlining Z into F in dump NUM by the size
+    and time estimates, biggest first"""
 
-    u1 = map (lambda u: (st1.order_to_sym[u], ils1.count(u)),
-              sorted (set (ils1)))
-    u2 = map (lambda u: (st2.order_to_sym[u], ils2.count(u)),
-              sorted (set (ils2)))
+    (size, time, badness) = inline_decisions[num - 1].estimates (f, z[0])
+    return (-abs (size), -abs (time or 0.0))
 
-    if not by_order:
-        u1.sort (key=lambda u: u[0].name)
-        u2.sort (key=lambda u: u[0].name)
-        pass
+def inlining_differences (f1, f2):
+    """Return lists of extra inlinings into F1 and F2.
 
-    i1 = 0;
-    i2 = 0;
+    The items are tuples of the origin of the inlinee and the numbers of
+    inline copies in the function and in the other one."""
+
+    (c1, o1) = inlinee_counts (f1)
+    (c2, o2) = inlinee_counts (f2)
 
     ex1 = []
     ex2 = []
-
-    while True:
-        if i1 >= len (u1):
-            ex2.extend (map (lambda x: (x[0], x[1], 0), u2[i2:]))
-            break
-        if i2 >= len (u2):
-            ex1.extend (map (lambda x: (x[0], x[1], 0), u1[i1:]))
-            break
-
-        z1 = u1[i1]
-        z2 = u2[i2]
-        
-        if compare_functions (z1[0], z2[0]) == 0:
-            i1 = i1 + 1
-            i2 = i2 + 1
-
-            if z1[1] == z2[1]:
-                continue
-            if z1[1] > z2[1]:
-                ex1.append ((z1[0], z1[1], z2[1]))
-                pass
-            else:
-                ex2.append ((z1[0], z2[1], z1[1]))
-                pass
-            pass
-        elif compare_functions (z1[0], z2[0]) < 0:
-            ex1.append((z1[0], z1[1], 0))
-            i1 = i1 + 1
-            pass
-        else:
-            ex2.append((z2[0], z2[1], 0))
-            i2 = i2 + 1
+    for k in sorted (set (c1) | set (c2)):
+        n1 = c1[k]
+        n2 = c2[k]
+        if n1 > n2:
+            ex1.append ((o1[k], n1, n2))
+        elif n2 > n1:
+            ex2.append ((o2[k], n2, n1))
             pass
         pass
+    return (ex1, ex2)
+
+def compare_same_functions (st1, st2, f1, f2):
+    """Report differences in inlining into F1 of ST1 and F2 of ST2"""
 
+    (ex1, ex2) = inlining_differences (f1, f2)
     if len (ex1) > 0:
         report_extra_inlining_in_func (1, st1, f1, ex1)
         pass
@@ -144,78 +164,240 @@ def compare_same_functions (st1, st2, f1, f2):
 
     return
 
-def list_all_remaining (num, st, it):
-    try:
-        while True:
-            f = it.next()
-            report_extra_function (num, st, f)
+def function_index (st):
+    """Return dictionary mapping keys to lists of un-inlined functions of
+    ST which have callers"""
+
+    index = {}
+    for f in st.uninlined_functions:
+        if len (f.callers) > 0:
+            index.setdefault (function_key (f), []).append (f)
+            pass
+        pass
+    for fns in index.values ():
+        fns.sort (key=function_tiebreak)
+        pass
+    return index
+
+def compare_tables (st1, st2):
+    """Report all differences in inlining between ST1 and ST2.
+
+    Functions with the same key are paired in the order of the tables,
+    the cost is linear in the number of functions and inlinees.  With
+    inline_decisions, differences in inlining are reported after extra
+    functions, sorted by their estimated effects."""
+
+    idx1 = function_index (st1)
+    idx2 = function_index (st2)
+    differences = []
+    for k in sorted (set (idx1) | set (idx2)):
+        l1 = idx1.get (k, [])
+        l2 = idx2.get (k, [])
+        for (f1, f2) in zip (l1, l2):
+            if inline_decisions is None:
+                compare_same_functions (st1, st2, f1, f2)
+                continue
+            (ex1, ex2) = inlining_differences (f1, f2)
+            for (num, st, f, ex) in [(1, st1, f1, ex1), (2, st2, f2, ex2)]:
+                if ex:
+                    ex.sort (key=lambda z: inlining_impact (num, f, z))
+                    differences.append ((inlining_impact (num, f, ex[0]),
+                                         num, st, f, ex))
+                    pass
+                pass
+            pass
+        for f in l1[len (l2):]:
+            report_extra_function (1, st1, f)
+            pass
+        for f in l2[len (l1):]:
+            report_extra_function (2, st2, f)
             pass
-    except StopIteration:
+        pass
+    differences.sort (key=lambda d: d[0])
+    for (impact, num, st, f, ex) in differences:
+        report_extra_inlining_in_func (num, st, f, ex)
         pass
     return
 
-def main():
-    """The main function."""
-    global by_order
+def inlining_column (args):
+    """Return keys of functions and inline multiplicities of one dump.
+
+    ARGS is a pair of the file name and the value of match_by to use.
+    The multiplicities are in a dictionary mapping pairs of keys of the
+    caller and of the origin of the inlinee to the number of inline
+    copies.  This runs in worker processes of inlining_matrix."""
+
+    global match_by
+    (filename, match_by) = args
+    index = function_index (load_symtab (filename))
+    counts = {}
+    for (k, fns) in index.items ():
+        for f in fns:
+            for (o, n) in inlinee_counts (f)[0].items ():
+                counts[(k, o)] = counts.get ((k, o), 0) + n
+                pass
+            pass
+        pass
+    return (set (index), counts)
+
+def inlining_matrix (filenames, jobs = 1):
+    """Return functions and sparse inlining matrix of dumps FILENAMES.
+
+    The first is a list of sets of keys of un-inlined functions of every
+    dump, the second a dictionary mapping pairs of keys of a caller and
+    an inlinee origin to dictionaries of numbers of inline copies in
+    every build where there are any.  Dumps are loaded by JOBS
+    processes."""
+
+    tasks = [(f, match_by) for f in filenames]
+    if jobs > 1:
+        pool = multiprocessing.Pool (min (jobs, len (filenames)))
+        try:
+            columns = pool.map (inlining_column, tasks)
+        finally:
+            pool.close ()
+            pool.join ()
+            pass
+    else:
+        columns = [inlining_column (t) for t in tasks]
+        pass
 
-    if (len (sys.argv) < 3):
-        die ("""You need to specify the two file names of inline dumps.""")
+    functions = []
+    matrix = {}
+    for (b, (keys, counts)) in enumerate (columns):
+        functions.append (keys)
+        for (k, n) in counts.items ():
+            matrix.setdefault (k, {})[b] = n
+            pass
+        pass
+    return (functions, matrix)
+
+def inlining_disagreements (functions, matrix):
+    """Return list of differing inlining decisions in an inlining matrix.
+
+    Each item is a tuple of the number of builds which differ from the
+    most common number of inline copies, the (caller, origin) pair and
+    the list of numbers of copies in all builds, None where the caller
+    does not exist.  The list is sorted by the number of differing
+    builds, highest first."""
+
+    r = []
+    for (k, row) in matrix.items ():
+        counts = [row.get (b, 0) if k[0] in functions[b] else None
+                  for b in range (len (functions))]
+        present = [n for n in counts if n is not None]
+        differing = len (present) - Counter (present).most_common (1)[0][1]
+        if differing > 0:
+            r.append ((differing, k, counts))
+            pass
         pass
+    r.sort (key=lambda d: (-d[0], d[1]))
+    return r
 
-    st1 = DumpSymtab()
-    st1.load_from_dump (sys.argv[1])
+def report_disagreements (filenames, disagreements):
+    for (b, f) in enumerate (filenames):
+        print ("Build %i: %s" % (b, f))
+        pass
+    print ("")
+    for (differing, (caller, origin), counts) in disagreements:
+        print ("%s inlined into %s: %i of %i builds differ"
+               % (origin, caller, differing,
+                  len ([n for n in counts if n is not None])))
+        print ("  " + " ".join (["-" if n is None else str (n)
+                                 for n in counts]))
+        pass
+    return
 
-    st2 = DumpSymtab()
-    st2.load_from_dump (sys.argv[2])
+def print_usage():
+    print ("""  symtab_compare_inlining.py - Compare inlining decisions in dumps
+
+Usage: symtab_compare_inlining.py [options] dump-file-1 dump-file-2...
+
+Options:
+
+-h, --help           Display this help and quit.
+-o                   Match functions by their order instead of name.
+-m HOW               Match functions by "name" (the default), "order" or
+                     "clone", which ignores numbers of clone suffixes
+                     such as .constprop.3 and pairs clones of the same
+                     kind in the order of their numbers.
+-e                   Show size and time changes estimated by the inliner
+                     and its badness with every difference in inlining,
+                     the dumps must contain -fdump-ipa-inline-details
+                     output.  Differences are then sorted by the size
+                     change of the biggest one in every function and
+                     listed after extra functions (two dumps only).
+-j N                 Load the dumps with N processes (more than two only),
+                     by default with as many as there are CPUs.
+-n N                 Only list the first N differing inlining decisions
+                     (more than two dumps only).
+
+With two dumps, differences in inlining of every function are listed.
+With more, each inlining which differs between the builds is listed
+with the numbers of inline copies in every build, "-" where the
+caller does not exist, those on which most builds differ come first.
+""")
 
-    l1 = filter (lambda sym: len(sym.callers)>0, st1.uninlined_functions)
-    l2 = filter (lambda sym: len(sym.callers)>0, st2.uninlined_functions)
-    
-    if not by_order:
-        l1.sort (key=lambda sym: sym.name)
-        l2.sort (key=lambda sym: sym.name)
+def main():
+    """The main function."""
+    global match_by, inline_decisions
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hom:ej:n:", ["help"])
+    except getopt.GetoptError as err:
+        print_usage()
+        die(str(err))
         pass
 
-    i1 = iter(l1)
-    i2 = iter(l2)
+    jobs = None
+    limit = None
+    estimates = False
+    try:
+        for o, a in opts:
+            if o in ("-h", "--help"):
+                print_usage()
+                sys.exit(0)
+            elif o == "-o":
+                match_by = "order"
+            elif o == "-m":
+                if a not in ("name", "order", "clone"):
+                    die ("Unknown way of matching functions %s." % a)
+                    pass
+                match_by = a
+            elif o == "-e":
+                estimates = True
+            elif o == "-j":
+                jobs = int (a)
+            elif o == "-n":
+                limit = int (a)
+                pass
+            continue
+    except ValueError as err:
+        die ("Invalid option value: %s" % str (err))
+        pass
 
-    fetch1 = True
-    fetch2 = True
+    if (len (args) < 2):
+        die ("""You need to specify the two file names of inline dumps.""")
+        pass
 
-    while True:
-        if fetch1:
-            try:
-                f1 = i1.next()
-                fetch1 = False
-            except StopIteration:
-                list_all_remaining (2, st2, i2)
-                break;
+    if len (args) > 2:
+        if jobs is None:
+            jobs = multiprocessing.cpu_count ()
             pass
+        (functions, matrix) = inlining_matrix (args, jobs)
+        report_disagreements (args, inlining_disagreements (functions,
+                                                            matrix)[:limit])
+        return
+
+    st1 = load_symtab (args[0])
+    st2 = load_symtab (args[1])
+    if estimates:
+        inline_decisions = [load_inline_decisions (args[0], st1),
+                            load_inline_decisions (args[1], st2)]
+        pass
 
-        if fetch2:
-            try:
-                f2 = i2.next()
-                fetch2 = False
-            except StopIteration:
-                list_all_remaining (1, st1, i1)
-                break;
-            pass
+    compare_tables (st1, st2)
 
-        if compare_functions (f1, f2) == 0:
-            compare_same_functions (st1, st2, f1, f2)
-            fetch1 = True
-            fetch2 = True
-            pass
-        elif compare_functions (f1, f2) < 0:
-            report_extra_function (1, st1, f1)
-            fetch1 = True
-            pass
-        else:
-            report_extra_function (2, st2, f2)
-            fetch2 = True
-            pass
-        pass
-            
 #    for f in l1:
 #        print ("%s/%i callers: %i, callees: %i, inlinees: %i, clones: %i"
 #               % (f.name, f.order, len(f.callers), len(f.callees), len(f.inlinees),
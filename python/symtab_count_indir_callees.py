@@ -7,6 +7,7 @@
 import sys
 import re
 from symtab import *
+from symtab_cache import load_symtab
 
 def die (s):
     "Give a string warning S to stderr and abort with exit code 1."
@@ -57,25 +58,35 @@ def main():
     global max_depth, count, callee_sum, max_stack
 
     if (len (sys.argv) < 3):
-        die ("""You need to specify the symtab name and the top func sym order.""")
+        die ("""You need to specify the symtab name and the top func sym order
+or name.""")
         pass
 
-    tab = DumpSymtab()
-    tab.load_from_dump (sys.argv[1])
+    tab = load_symtab (sys.argv[1])
 
     try:
         top_order = int(sys.argv[2]);
-    except:
-        die ("""The second parameter is not a number""");
+        top_symbol = tab.order_to_sym[top_order];
+    except ValueError:
+        candidates = tab.name_index().lookup (sys.argv[2])
+        if len (candidates) == 0:
+            die ("""There is no symbol called %s""" % sys.argv[2]);
+        elif len (candidates) > 1:
+            die ("""Symbol name %s is ambiguous, use one of orders: %s"""
+                 % (sys.argv[2], " ".join ([str (s.order)
+                                            for s in candidates])));
+            pass
+        top_symbol = candidates[0]
         pass
     
-    top_symbol = tab.order_to_sym[top_order];
     print ("Top symbol is {:s}".format (top_symbol))
     
     process_function (top_symbol, 1);
     print ("Max depth was {:d}, count is {:d}".format (max_depth, count))
     print ("Callee sum: {:d}".format (callee_sum))
     print ("Number of functions: {:d}".format (len(tab.all_functions)))
+    print ("Functions reachable from top: {:d}".format (
+        len (tab.call_graph_analysis ().reachable_functions (top_symbol))))
     print ("Max stack:")
     for i in max_stack:
         print ("   {:s}".format (i))
@@ -0,0 +1,300 @@
+#!/usr/bin/python
+
+# Persistent store of symbol tables of many builds in an SQLite
+# database.  Dumps are parsed in parallel (through the symtab cache)
+# and bulk-loaded with batched inserts, after which questions about the
+# history of a symbol across all the builds are answered by indexed
+# queries instead of parsing every dump again.
+
+import sys
+import os
+import time
+import getopt
+import sqlite3
+import multiprocessing
+from symtab import *
+from symtab_cache import load_symtab, file_digest
+from symtab_columnar import FLAG_FUNCTION, FLAG_INLINED
+
+# Kinds of edges in the edges table
+EDGE_CALL = 0
+EDGE_REFERENCE = 1
+
+batch_size = 10000
+
+schema = """
+CREATE TABLE IF NOT EXISTS builds (
+  build_id INTEGER PRIMARY KEY,
+  name TEXT UNIQUE NOT NULL,
+  dump TEXT,
+  dump_sha1 TEXT,
+  ingested REAL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+  build_id INTEGER NOT NULL,
+  ord INTEGER NOT NULL,
+  name TEXT NOT NULL,
+  flags INTEGER NOT NULL,
+  visibility TEXT,
+  availability TEXT,
+  attrs TEXT,
+  clone_of INTEGER,
+  inlined_to INTEGER,
+  count INTEGER,
+  count_quality TEXT,
+  PRIMARY KEY (build_id, ord)
+);
+CREATE INDEX IF NOT EXISTS symbols_by_name ON symbols (name, build_id);
+CREATE TABLE IF NOT EXISTS edges (
+  build_id INTEGER NOT NULL,
+  kind INTEGER NOT NULL,
+  src INTEGER NOT NULL,
+  dst INTEGER NOT NULL,
+  count INTEGER,
+  freq REAL,
+  flags INTEGER
+);
+CREATE INDEX IF NOT EXISTS edges_by_src ON edges (build_id, src);
+CREATE INDEX IF NOT EXISTS edges_by_dst ON edges (build_id, dst);
+"""
+
+def open_db (filename):
+    """Return connection to database FILENAME, creating tables if needed"""
+
+    db = sqlite3.connect (filename)
+    db.executescript (schema)
+    # Databases from before function counts were stored
+    columns = [r[1] for r in db.execute ("PRAGMA table_info (symbols)")]
+    if "count" not in columns:
+        db.execute ("ALTER TABLE symbols ADD COLUMN count INTEGER")
+        db.execute ("ALTER TABLE symbols ADD COLUMN count_quality TEXT")
+        pass
+    return db
+
+def table_rows (filename):
+    """Return rows of symbols and edges of the table in dump FILENAME.
+
+    Rows lack the leading build id, which is only known when they are
+    inserted.  This runs in worker processes of ingest."""
+
+    tab = load_symtab (filename)
+    pool = tab.pool
+    orders = tab.orders
+    symbols = []
+    for i in range (len (orders)):
+        clone_of = tab.clone_of[i]
+        inlined_to = tab.inlined_to[i]
+        symbols.append ((orders[i], pool[tab.names[i]], tab.flags[i],
+                         pool[tab.visibilities[i]],
+                         pool[tab.availabilities[i]],
+                         pool[tab.attr_strings[i]],
+                         orders[clone_of] if clone_of >= 0 else None,
+                         orders[inlined_to] if inlined_to >= 0 else None,
+                         tab.counts[i] if tab.counts[i] >= 0 else None,
+                         pool[tab.count_qualities[i]] or None))
+        pass
+
+    edges = []
+    offsets = tab.callees_offsets
+    targets = tab.callees_targets
+    for i in range (len (orders)):
+        for e in range (offsets[i], offsets[i + 1]):
+            edges.append ((EDGE_CALL, orders[i], orders[targets[e]],
+                           tab.callees_counts[e], tab.callees_freqs[e],
+                           tab.callees_edge_flags[e]))
+            pass
+        pass
+    offsets = tab.references_offsets
+    targets = tab.references_targets
+    for i in range (len (orders)):
+        for e in range (offsets[i], offsets[i + 1]):
+            edges.append ((EDGE_REFERENCE, orders[i], orders[targets[e]],
+                           None, None, None))
+            pass
+        pass
+    return (file_digest (filename), symbols, edges)
+
+def insert_batched (db, sql, build_id, rows):
+    """Insert ROWS prefixed with BUILD_ID with SQL, in batches"""
+
+    for start in range (0, len (rows), batch_size):
+        db.executemany (sql, [(build_id,) + r
+                              for r in rows[start:start + batch_size]])
+        pass
+    return
+
+def ingest (db, builds, jobs = 1):
+    """Parse and store dumps of BUILDS, a list of (name, filename) pairs.
+
+    Dumps are parsed by JOBS processes, each build is stored in its own
+    transaction as soon as it has been parsed, replacing any previous
+    build of the same name."""
+
+    filenames = [f for (name, f) in builds]
+    if jobs > 1 and len (builds) > 1:
+        pool = multiprocessing.Pool (jobs)
+        results = pool.imap (table_rows, filenames)
+    else:
+        pool = None
+        results = (table_rows (f) for f in filenames)
+        pass
+
+    for ((name, filename), (digest, symbols, edges)) in zip (builds, results):
+        with db:
+            old = db.execute ("SELECT build_id FROM builds WHERE name = ?",
+                              (name,)).fetchone ()
+            if old is not None:
+                for t in ["symbols", "edges", "builds"]:
+                    db.execute ("DELETE FROM %s WHERE build_id = ?" % t, old)
+                    pass
+                pass
+            cur = db.execute ("INSERT INTO builds (name, dump, dump_sha1, "
+                              "ingested) VALUES (?, ?, ?, ?)",
+                              (name, os.path.abspath (filename), digest,
+                               time.time ()))
+            build_id = cur.lastrowid
+            insert_batched (db, "INSERT INTO symbols VALUES "
+                            "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", build_id,
+                            symbols)
+            insert_batched (db, "INSERT INTO edges VALUES "
+                            "(?, ?, ?, ?, ?, ?, ?)", build_id, edges)
+            pass
+        print ("%s: %i symbols, %i edges" % (name, len (symbols), len (edges)))
+        pass
+    if pool is not None:
+        pool.close ()
+        pool.join ()
+        pass
+    return
+
+def inlining_history (db, callee, caller):
+    """Return list of (build, count) of inline copies of CALLEE in CALLER.
+
+    All builds are listed in the order they were ingested, COUNT is
+    None if there is no function called CALLER in the build."""
+
+    return db.execute ("""
+      SELECT b.name,
+             (SELECT count(*) FROM symbols s JOIN symbols r
+                ON r.build_id = s.build_id AND r.ord = s.inlined_to
+              WHERE s.build_id = b.build_id AND s.name = ?
+                AND r.name = ?),
+             (SELECT count(*) FROM symbols r
+              WHERE r.build_id = b.build_id AND r.name = ?)
+      FROM builds b ORDER BY b.build_id""",
+                       (callee, caller, caller)).fetchall ()
+
+def symbol_history (db, name):
+    """Return list of per build summaries of symbols called NAME.
+
+    Each item is (build, order, flags, callers, callees, inline copies
+    in other functions)."""
+
+    return db.execute ("""
+      SELECT b.name, s.ord, s.flags,
+             (SELECT count(*) FROM edges e WHERE e.build_id = s.build_id
+                AND e.kind = ? AND e.dst = s.ord),
+             (SELECT count(*) FROM edges e WHERE e.build_id = s.build_id
+                AND e.kind = ? AND e.src = s.ord),
+             s.inlined_to
+      FROM symbols s JOIN builds b ON b.build_id = s.build_id
+      WHERE s.name = ? ORDER BY b.build_id, s.ord""",
+                       (EDGE_CALL, EDGE_CALL, name)).fetchall ()
+
+def print_usage():
+    print ("""  symtab_db.py - Store symtabs of many builds in an SQLite database
+
+Usage: symtab_db.py [options] ingest [NAME=]dump-file...
+       symtab_db.py [options] builds
+       symtab_db.py [options] history symbol-name
+       symtab_db.py [options] inlining callee-name caller-name
+
+Options:
+
+-h, --help           Display this help and quit.
+-d FILE              The database, symtab.db by default.
+-j N                 Parse dumps with N processes when ingesting.
+
+Builds are named by the dump file name unless NAME= is given.  The
+history command lists a symbol in every build, inlining lists the
+number of inline copies of the callee in the caller in every build.
+""")
+
+def db_main():
+    """The main function."""
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hd:j:", ["help"])
+    except getopt.GetoptError as err:
+        print_usage()
+        die(str(err))
+        pass
+
+    dbname = "symtab.db"
+    jobs = 1
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            print_usage()
+            sys.exit(0)
+        elif o == "-d":
+            dbname = a
+        elif o == "-j":
+            try:
+                jobs = int (a)
+            except ValueError:
+                die ("The number of jobs must be an integer.")
+                pass
+            pass
+        continue
+
+    if not args:
+        print_usage()
+        die ("You need to specify a command.")
+        pass
+    command = args[0]
+    db = open_db (dbname)
+    if command == "ingest" and len (args) > 1:
+        builds = []
+        for a in args[1:]:
+            if "=" in a:
+                builds.append (tuple (a.split ("=", 1)))
+            else:
+                builds.append ((a, a))
+                pass
+            pass
+        ingest (db, builds, jobs)
+    elif command == "builds" and len (args) == 1:
+        for (name, dump, count) in db.execute (
+            "SELECT name, dump, (SELECT count(*) FROM symbols s "
+            "WHERE s.build_id = b.build_id) FROM builds b "
+            "ORDER BY build_id"):
+            print ("%s: %s, %i symbols" % (name, dump, count))
+            pass
+    elif command == "history" and len (args) == 2:
+        for (build, order, flags, callers, callees,
+             inlined_to) in symbol_history (db, args[1]):
+            kind = "function" if flags & FLAG_FUNCTION else "variable"
+            if flags & FLAG_INLINED:
+                kind = "inline copy in %i" % inlined_to
+                pass
+            print ("%s: %s/%i %s, %i callers, %i callees"
+                   % (build, args[1], order, kind, callers, callees))
+            pass
+    elif command == "inlining" and len (args) == 3:
+        for (build, count, callers) in inlining_history (db, args[1],
+                                                         args[2]):
+            if callers == 0:
+                print ("%s: no %s" % (build, args[2]))
+            else:
+                print ("%s: %i" % (build, count))
+                pass
+            pass
+    else:
+        print_usage()
+        die ("Unknown command or wrong number of arguments.")
+        pass
+    db.close ()
+    return
+
+if __name__ == '__main__':
+    db_main()
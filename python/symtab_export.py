@@ -0,0 +1,223 @@
+#!/usr/bin/python
+
+# Export a symbol table graph in DOT, GraphML or JSON lines format.
+# Everything is written to the output file as the table is walked, so
+# nothing proportional to the size of the graph is kept in memory.
+
+import sys
+import getopt
+import json
+from xml.sax.saxutils import escape
+from symtab import *
+from symtab_cache import load_symtab
+
+def symbol_kind (s):
+    if isinstance (s, Function):
+        return "function"
+    return "variable"
+
+def symbol_flags (s):
+    """Return list of names of boolean properties of symbol S"""
+
+    r = []
+    if s.address_taken:
+        r.append ("address_taken")
+        pass
+    if isinstance (s, Function):
+        if s.is_clone:
+            r.append ("clone")
+            pass
+        if s.is_inlined:
+            r.append ("inlined")
+            pass
+        if s.is_thunk:
+            r.append ("thunk")
+            pass
+        pass
+    return r
+
+def iter_edges (tab, clones = False, restrict_to = None):
+    """Generator of (source, target, kind) tuples of edges of TAB.
+
+    Kind is "call" or "reference", or "clone" for edges from clone
+    origins to clones if CLONES is true.  RESTRICT_TO limits the edges
+    to those among the given set of orders."""
+
+    (all_symbols, all_functions,
+     all_variables) = tab.selected_symbols (restrict_to)
+    for s in all_symbols:
+        if isinstance (s, Function):
+            for o in s.callees_orders:
+                if restrict_to is None or o in restrict_to:
+                    yield (s.order, o, "call")
+                    pass
+                pass
+            if (clones and s.is_clone
+                and (restrict_to is None or s.clone_of_order in restrict_to)):
+                yield (s.clone_of_order, s.order, "clone")
+                pass
+            pass
+        for o in s.references_orders:
+            if restrict_to is None or o in restrict_to:
+                yield (s.order, o, "reference")
+                pass
+            pass
+        pass
+    return
+
+def write_dot (tab, out, clones = False, restrict_to = None):
+    """Write TAB to file OUT in the format of Symtab.dot_data"""
+
+    for line in tab.iter_dot_lines (clones = clones, restrict_to = restrict_to):
+        out.write (line)
+        out.write ("\n")
+        pass
+    return
+
+graphml_keys = [("name", "node", "string"),
+                ("kind", "node", "string"),
+                ("availability", "node", "string"),
+                ("visibility", "node", "string"),
+                ("flags", "node", "string"),
+                ("kind", "edge", "string")]
+
+def write_graphml (tab, out, clones = False, restrict_to = None):
+    """Write TAB to file OUT as GraphML"""
+
+    out.write ('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write ('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    for (name, domain, typ) in graphml_keys:
+        out.write ('  <key id="%s_%s" for="%s" attr.name="%s" attr.type="%s"/>\n'
+                   % (domain, name, domain, name, typ))
+        pass
+    out.write ('  <graph id="symtab" edgedefault="directed">\n')
+
+    (all_symbols, all_functions,
+     all_variables) = tab.selected_symbols (restrict_to)
+    for s in all_symbols:
+        out.write ('    <node id="n%i">' % s.order)
+        for (key, val) in [("name", s.name),
+                           ("kind", symbol_kind (s)),
+                           ("availability", " ".join (attr_words (
+                                s.availability))),
+                           ("visibility", " ".join (attr_words (
+                                s.visibility))),
+                           ("flags", " ".join (symbol_flags (s)))]:
+            out.write ('<data key="node_%s">%s</data>' % (key, escape (val)))
+            pass
+        out.write ('</node>\n')
+        pass
+
+    for (src, dst, kind) in iter_edges (tab, clones, restrict_to):
+        out.write ('    <edge source="n%i" target="n%i">'
+                   '<data key="edge_kind">%s</data></edge>\n'
+                   % (src, dst, kind))
+        pass
+    out.write ('  </graph>\n</graphml>\n')
+    return
+
+def write_jsonl (tab, out, clones = False, restrict_to = None):
+    """Write TAB to file OUT as JSON lines.
+
+    Each line is an object with "type" either "node" or "edge".  Nodes
+    have "id" (the order), "name", "kind", "availability",
+    "visibility" and "flags", edges have "source", "target" and
+    "kind".  All nodes come before all edges."""
+
+    (all_symbols, all_functions,
+     all_variables) = tab.selected_symbols (restrict_to)
+    for s in all_symbols:
+        out.write (json.dumps ({"type" : "node",
+                                "id" : s.order,
+                                "name" : s.name,
+                                "kind" : symbol_kind (s),
+                                "availability" : " ".join (attr_words (
+                                    s.availability)),
+                                "visibility" : attr_words (s.visibility),
+                                "flags" : symbol_flags (s)},
+                               sort_keys=True))
+        out.write ("\n")
+        pass
+    for (src, dst, kind) in iter_edges (tab, clones, restrict_to):
+        out.write ('{"kind": "%s", "source": %i, "target": %i, '
+                   '"type": "edge"}\n' % (kind, src, dst))
+        pass
+    return
+
+writers = {"dot" : write_dot,
+           "graphml" : write_graphml,
+           "jsonl" : write_jsonl}
+
+def print_usage():
+    print ("""  symtab_export.py - Export symtab graph from a dump
+
+Usage: symtab_export.py [options] dump-file
+
+Options:
+
+-h, --help           Display this help and quit.
+-f FORMAT            Output format, one of dot (the default), graphml and jsonl.
+-o FILE              Write to FILE instead of standard output.
+-c                   Also output edges from clone origins to clones.
+-a ORDER             Only export symbols around the one with ORDER.
+-n HOPS              Number of hops around the -a symbol, one by default.
+""")
+
+def export_main():
+    """The main function."""
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hf:o:ca:n:",
+                                       ["help"])
+    except getopt.GetoptError as err:
+        print_usage()
+        die(str(err))
+        pass
+
+    writer = write_dot
+    outname = None
+    clones = False
+    around = None
+    hops = 1
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            print_usage()
+            sys.exit(0)
+        elif o == "-f":
+            if a not in writers:
+                die ("Unknown output format %s" % a)
+                pass
+            writer = writers[a]
+        elif o == "-o":
+            outname = a
+        elif o == "-c":
+            clones = True
+        elif o == "-a":
+            around = int (a)
+        elif o == "-n":
+            hops = int (a)
+            pass
+        continue
+
+    if len (args) != 1:
+        print_usage()
+        die ("You need to specify exactly one dump file.")
+        pass
+
+    tab = load_symtab (args[0])
+    restrict_to = None
+    if around is not None:
+        restrict_to = tab.neighborhood ([tab.order_to_sym[around]], hops)
+        pass
+
+    if outname is None:
+        writer (tab, sys.stdout, clones, restrict_to)
+    else:
+        out = open (outname, "w")
+        writer (tab, out, clones, restrict_to)
+        out.close ()
+        pass
+    return
+
+if __name__ == '__main__':
+    export_main()
@@ -0,0 +1,108 @@
+#!/usr/bin/python
+
+# Index of the forests formed by clone_of and inlined_to links of a
+# symbol table.  For every symbol it records the original function
+# its clone chain starts with, the function its chain of inline copies
+# ends in, how deep in that chain it is and how many inline copies
+# hang below it, so that all of these are array lookups rather than
+# walks along the links.
+
+from array import array
+
+def resolve_chains (parents):
+    """Return roots and depths of nodes of a forest given by PARENTS.
+
+    PARENTS[i] is the index of the parent of node I or -1 if I is a
+    root.  Every node is visited a constant number of times, regardless
+    of the shape of the forest."""
+
+    n = len (parents)
+    roots = array ("l", [-1]) * n
+    depths = array ("l", [0]) * n
+    for i in range (n):
+        if roots[i] >= 0:
+            continue
+        path = []
+        j = i
+        while roots[j] < 0 and parents[j] >= 0:
+            path.append (j)
+            if len (path) > n:
+                raise ValueError ("cycle in symbol links at index %i" % i)
+            j = parents[j]
+            pass
+        if roots[j] < 0:
+            roots[j] = j
+            pass
+        root = roots[j]
+        depth = depths[j]
+        while path:
+            j = path.pop ()
+            depth = depth + 1
+            roots[j] = root
+            depths[j] = depth
+            pass
+        pass
+    return (roots, depths)
+
+def subtree_sizes (parents, depths):
+    """Return numbers of nodes in subtrees of a forest, including roots"""
+
+    n = len (parents)
+    by_depth = [[] for d in range (max (depths) + 1 if n else 0)]
+    for i in range (n):
+        by_depth[depths[i]].append (i)
+        pass
+    sizes = array ("l", [1]) * n
+    for level in reversed (by_depth):
+        for i in level:
+            if parents[i] >= 0:
+                sizes[parents[i]] += sizes[i]
+                pass
+            pass
+        pass
+    return sizes
+
+
+class SymbolForest (object):
+    """Clone and inline forests of all symbols of a table.
+
+    Symbols are numbered by their position in all_symbols, variables
+    are single node trees in both forests.  The links are taken from
+    Symtab.symbol_links, so that a ColumnarSymtab needs no views of its
+    symbols to build the index.  It is built at construction time, it
+    does not notice symbols added later."""
+
+    def __init__(self, tab):
+        self.symtable = tab
+        (self.symbols, self.position, clone_parents,
+         inline_parents) = tab.symbol_links ()
+
+        (self.origins, self.clone_depths) = resolve_chains (clone_parents)
+        (self.inline_roots, self.inline_depths) = resolve_chains (
+            inline_parents)
+        self.inline_subtree_sizes = subtree_sizes (inline_parents,
+                                                   self.inline_depths)
+        return
+
+    def origin (self, f):
+        """Return the function F is a (possibly indirect) clone of, or F"""
+        return self.symbols[self.origins[self.position (f.order)]]
+
+    def clone_depth (self, f):
+        """Return number of clone_of links from F to its origin"""
+        return self.clone_depths[self.position (f.order)]
+
+    def inline_root (self, f):
+        """Return the function all inline copies containing F end up in.
+
+        That is F itself if it is not an inline copy."""
+
+        return self.symbols[self.inline_roots[self.position (f.order)]]
+
+    def inline_depth (self, f):
+        """Return number of inlined_to links from F to its inline root"""
+        return self.inline_depths[self.position (f.order)]
+
+    def inline_subtree_size (self, f):
+        """Return number of inline copies in the body of F, plus one"""
+        return self.inline_subtree_sizes[self.position (f.order)]
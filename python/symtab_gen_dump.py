@@ -0,0 +1,443 @@
+#!/usr/bin/python
+
+# Generator of synthetic symbol table dumps in the format read by
+# symtab.py.  The same parameters and seed always give the same dump,
+# so that loaders can be benchmarked on identical input everywhere.
+#
+# Everything about a symbol, including its callers, is a function of
+# its index, so symbols are written one after another without keeping
+# anything about the others in memory and tables of tens of millions
+# of symbols can be generated.  Calls go from symbol I to symbols I + A
+# for a fixed set of offsets A, each present with a probability given
+# by the edge density, so the callers of a symbol can be found by
+# looking at the same offsets backwards.
+#
+# Alternatively, symbols can be laid out in blocks, each starting with
+# a function followed by a few origin functions and then by slots for
+# inline copies of the origins in the first function, so that tables
+# with many inline copies of the same functions in one caller can be
+# generated too.
+
+import sys
+import getopt
+from symtab import die
+
+clone_kinds = ["constprop", "isra", "part"]
+
+count_qualities = ["estimated locally", "precise", "guessed", "adjusted"]
+
+visibilities = ["externally_visible public", "public", "public comdat weak",
+                "", "prevailing_def_ironly", "external public"]
+
+# Salts of the individual random decisions about a symbol
+SALT_VARIABLE = 1
+SALT_INLINE = 2
+SALT_CLONE = 3
+SALT_VISIBILITY = 4
+SALT_ADDRESS = 5
+SALT_COUNT = 6
+SALT_FUNCTION_COUNT = 7
+SALT_CALL = 100
+SALT_REF = 200
+
+def unit_hash (seed, i, salt):
+    """Return a pseudo-random number in [0, 1) determined by the arguments"""
+
+    x = (i * 0x9E3779B1 + salt * 0x85EBCA77 + seed * 0xC2B2AE3D) & 0xffffffff
+    x ^= x >> 15
+    x = (x * 0x2C1B3C6D) & 0xffffffff
+    x ^= x >> 12
+    x = (x * 0x297A2D39) & 0xffffffff
+    x ^= x >> 15
+    return x / 4294967296.0
+
+def edge_offsets (seed, salt, count, n):
+    """Return COUNT distinct offsets of edges in a table of N symbols"""
+
+    r = []
+    k = 0
+    while len (r) < min (count, n - 1):
+        a = 1 + int (unit_hash (seed, k, salt) * (n - 1))
+        if a not in r:
+            r.append (a)
+            pass
+        k = k + 1
+        pass
+    return r
+
+
+class DumpGenerator (object):
+    """Description of a synthetic symbol table.
+
+    SYMBOLS is the number of symbols, CALL_DENSITY and REF_DENSITY the
+    average numbers of calls and references of a function, CLONE_RATIO
+    and INLINE_RATIO the fractions of functions which are clones and
+    inline copies, CLONE_DEPTH the maximum length of chains of clones
+    and VARIABLE_RATIO the fraction of variables among symbols.  With
+    PROFILE, call edges and functions with a body have counts.
+
+    If INLINE_BLOCK is not zero, symbols are in blocks of INLINE_BLOCK
+    symbols, the first INLINE_ORIGINS after the first one of a block
+    are origins and the rest are inline copies of them in the first
+    one, each with probability INLINE_RATIO."""
+
+    def __init__(self, symbols, call_density = 3.0, ref_density = 1.0,
+                 clone_ratio = 0.1, clone_depth = 2, inline_ratio = 0.1,
+                 variable_ratio = 0.15, profile = True, seed = 1,
+                 inline_block = 0, inline_origins = 1):
+        self.n = symbols
+        self.seed = seed
+        self.clone_ratio = clone_ratio
+        self.clone_depth = clone_depth
+        self.inline_ratio = inline_ratio
+        self.variable_ratio = variable_ratio
+        self.profile = profile
+        self.inline_block = inline_block
+        self.inline_origins = inline_origins
+
+        # Every offset is used with a probability of one half at most
+        slots = max (1, int (2 * call_density + 0.5))
+        self.call_offsets = edge_offsets (seed, SALT_CALL, slots, symbols)
+        self.call_prob = call_density / slots
+        slots = max (1, int (2 * ref_density + 0.5))
+        self.ref_offsets = edge_offsets (seed, SALT_REF, slots, symbols)
+        self.ref_prob = ref_density / slots
+        self.clone_stride = 7
+        return
+
+    def is_variable (self, i):
+        return unit_hash (self.seed, i, SALT_VARIABLE) < self.variable_ratio
+
+    def is_function (self, i):
+        return 0 <= i < self.n and not self.is_variable (i)
+
+    def block_position (self, i):
+        """Return position of symbol I in its block, -1 without blocks"""
+
+        if self.inline_block <= 0:
+            return -1
+        return i % self.inline_block
+
+    def inline_origin (self, i):
+        """Return the origin of inline copy I in a block"""
+
+        pos = self.block_position (i)
+        return i - pos + 1 + (pos - 1) % self.inline_origins
+
+    def is_inline_copy (self, i):
+        """Return true if function I is inlined into function I - 1, or in
+        blocks, into the first function of its block"""
+
+        if not self.is_function (i):
+            return False
+        pos = self.block_position (i)
+        if pos < 0:
+            parent = i - 1
+        elif pos <= self.inline_origins:
+            return False
+        else:
+            parent = i - pos
+            if not self.is_function (self.inline_origin (i)):
+                return False
+            pass
+        return (self.is_function (parent)
+                and unit_hash (self.seed, i, SALT_INLINE) < self.inline_ratio)
+
+    def inline_parent (self, i):
+        """Return the function inline copy I is inlined into"""
+
+        pos = self.block_position (i)
+        if pos < 0:
+            return i - 1
+        return i - pos
+
+    def inline_children (self, i):
+        """Return list of inline copies inlined into function I"""
+
+        pos = self.block_position (i)
+        if pos < 0:
+            if self.is_inline_copy (i + 1):
+                return [i + 1]
+            return []
+        if pos > 0:
+            return []
+        return [j for j in range (i + self.inline_origins + 1,
+                                  min (i + self.inline_block, self.n))
+                if self.is_inline_copy (j)]
+
+    def inline_root (self, i):
+        while self.is_inline_copy (i):
+            i = self.inline_parent (i)
+            pass
+        return i
+
+    def clone_depth_of (self, i):
+        """Return length of the chain of clones ending in function I"""
+
+        if (unit_hash (self.seed, i, SALT_CLONE) >= self.clone_ratio
+            or (self.block_position (i) >= 0 and self.is_inline_copy (i))):
+            return 0
+        p = i - self.clone_stride
+        if not self.is_function (p) or self.is_inline_copy (p):
+            return 0
+        d = self.clone_depth_of (p) + 1
+        if d > self.clone_depth:
+            return 0
+        return d
+
+    def name (self, i):
+        if self.is_variable (i):
+            return "var%i" % i
+        if self.block_position (i) >= 0 and self.is_inline_copy (i):
+            return self.name (self.inline_origin (i))
+        d = self.clone_depth_of (i)
+        suffixes = []
+        while d > 0:
+            suffixes.append (".%s.%i" % (clone_kinds[i % len (clone_kinds)], d))
+            i = i - self.clone_stride
+            d = d - 1
+            pass
+        suffixes.reverse ()
+        return "fn%i%s" % (i, "".join (suffixes))
+
+    def call_target (self, i, k):
+        """Return callee of the K-th potential call of function I or -1"""
+
+        if unit_hash (self.seed, i, SALT_CALL + k) >= self.call_prob:
+            return -1
+        j = (i + self.call_offsets[k]) % self.n
+        if not self.is_function (j) or self.is_inline_copy (j):
+            return -1
+        return j
+
+    def ref_target (self, i, k):
+        """Return variable the K-th potential reference of I refers to or -1"""
+
+        if unit_hash (self.seed, i, SALT_REF + k) >= self.ref_prob:
+            return -1
+        j = (i + self.ref_offsets[k]) % self.n
+        if not self.is_variable (j):
+            return -1
+        return j
+
+    def edge_notes (self, i, j, inlined):
+        notes = ""
+        if self.profile:
+            count = int (unit_hash (self.seed, i * 31 + j, SALT_COUNT) * 100000)
+            notes = "(%ix) (%.2f per call)" % (count, count / 10000.0)
+        else:
+            notes = "(1.00 per call)"
+            pass
+        if inlined:
+            notes = notes + " (inlined)"
+            pass
+        return notes
+
+    def count_note (self, i):
+        """Return the count of function I as it starts its flags"""
+
+        if not self.profile:
+            return ""
+        h = unit_hash (self.seed, i, SALT_FUNCTION_COUNT)
+        quality = count_qualities[int (h * 16) % len (count_qualities)]
+        return "count:%i (%s) " % (int (h * 1000000), quality)
+
+    def edge_list (self, edges):
+        return " ".join (["%s/%i %s" % (self.name (j), j, notes)
+                          for (j, notes) in edges])
+
+    def symbol_lines (self, i):
+        """Return list of lines describing symbol I"""
+
+        name = self.name (i)
+        variable = self.is_variable (i)
+        r = ["%s/%i (%s) @0x7f%010x" % (name, i, name, i)]
+        r.append ("  Type: %s definition analyzed"
+                  % ("variable" if variable else "function"))
+        vis = visibilities[int (unit_hash (self.seed, i, SALT_VISIBILITY)
+                                * len (visibilities))]
+        r.append ("  Visibility: " + vis)
+
+        refs = [j for j in [self.ref_target (i, k)
+                            for k in range (len (self.ref_offsets))] if j >= 0]
+        r.append ("  References: " + " ".join (["%s/%i (addr)"
+                                                % (self.name (j), j)
+                                                for j in refs]))
+        referring = []
+        if variable:
+            for k in range (len (self.ref_offsets)):
+                p = (i - self.ref_offsets[k]) % self.n
+                if self.ref_target (p, k) == i:
+                    referring.append ("%s/%i (addr)" % (self.name (p), p))
+                    pass
+                pass
+            pass
+        r.append ("  Referring: " + " ".join (referring))
+        if unit_hash (self.seed, i, SALT_ADDRESS) < 0.05:
+            r.append ("  Address is taken.")
+            pass
+
+        if variable:
+            r.append ("  Availability: available")
+            r.append ("  Varpool flags: initialized")
+            return r
+
+        inline_copy = self.is_inline_copy (i)
+        if inline_copy:
+            root = self.inline_root (i)
+            r.append ("  Function %s/%i is inline copy in %s/%i"
+                      % (name, i, self.name (root), root))
+            pass
+        d = self.clone_depth_of (i)
+        if d > 0:
+            p = i - self.clone_stride
+            r.append ("  Clone of %s/%i" % (self.name (p), p))
+        elif self.block_position (i) >= 0 and inline_copy:
+            p = self.inline_origin (i)
+            r.append ("  Clone of %s/%i" % (self.name (p), p))
+            pass
+        if vis.startswith ("external") and not inline_copy:
+            r.append ("  Availability: not_available")
+            r.append ("  Function flags:")
+        else:
+            r.append ("  Availability: available")
+            r.append ("  Function flags: %sbody" % self.count_note (i))
+            pass
+
+        callers = []
+        if inline_copy:
+            p = self.inline_parent (i)
+            callers.append ((p, self.edge_notes (p, i, True)))
+        else:
+            for k in range (len (self.call_offsets)):
+                p = (i - self.call_offsets[k]) % self.n
+                if self.is_function (p) and self.call_target (p, k) == i:
+                    callers.append ((p, self.edge_notes (p, i, False)))
+                    pass
+                pass
+            pass
+        r.append ("  Called by: " + self.edge_list (callers))
+
+        callees = [(j, self.edge_notes (i, j, True))
+                   for j in self.inline_children (i)]
+        for k in range (len (self.call_offsets)):
+            j = self.call_target (i, k)
+            if j >= 0:
+                callees.append ((j, self.edge_notes (i, j, False)))
+                pass
+            pass
+        r.append ("  Calls: " + self.edge_list (callees))
+        return r
+
+    def write (self, out):
+        """Write the whole dump to file OUT"""
+
+        out.write ("Symbol table:\n\n")
+        for i in range (self.n):
+            out.write ("\n".join (self.symbol_lines (i)))
+            out.write ("\n")
+            pass
+        out.write ("\n")
+        return
+
+
+def print_usage():
+    print ("""  symtab_gen_dump.py - Generate a synthetic symbol table dump
+
+Usage: symtab_gen_dump.py [options] number-of-symbols
+
+Options:
+
+-h, --help           Display this help and quit.
+-o FILE              Write to FILE instead of standard output.
+-e DENSITY           Average number of calls of a function, 3 by default.
+-r DENSITY           Average number of references of a symbol, 1 by default.
+-c RATIO             Fraction of functions which are clones, 0.1 by default.
+-d DEPTH             Maximum length of chains of clones, 2 by default.
+-i RATIO             Fraction of functions which are inline copies,
+                     0.1 by default.
+-v RATIO             Fraction of symbols which are variables, 0.15 by default.
+-b SIZE              Lay symbols out in blocks of SIZE, the first function
+                     of each having inline copies of the following ones.
+-O N                 Number of origins of inline copies in a block, 1 by
+                     default.
+-P                   Do not put profile counts on call edges and
+                     functions.
+-s SEED              Seed of the generator, 1 by default.
+""")
+
+def gen_main():
+    """The main function."""
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "ho:e:r:c:d:i:v:Ps:b:O:",
+                                       ["help"])
+    except getopt.GetoptError as err:
+        print_usage()
+        die(str(err))
+        pass
+
+    outname = None
+    params = {}
+    try:
+        for o, a in opts:
+            if o in ("-h", "--help"):
+                print_usage()
+                sys.exit(0)
+            elif o == "-o":
+                outname = a
+            elif o == "-e":
+                params["call_density"] = float (a)
+            elif o == "-r":
+                params["ref_density"] = float (a)
+            elif o == "-c":
+                params["clone_ratio"] = float (a)
+            elif o == "-d":
+                params["clone_depth"] = int (a)
+            elif o == "-i":
+                params["inline_ratio"] = float (a)
+            elif o == "-v":
+                params["variable_ratio"] = float (a)
+            elif o == "-P":
+                params["profile"] = False
+            elif o == "-s":
+                params["seed"] = int (a)
+            elif o == "-b":
+                params["inline_block"] = int (a)
+            elif o == "-O":
+                params["inline_origins"] = int (a)
+                pass
+            continue
+    except ValueError as err:
+        die ("Invalid option value: %s" % str (err))
+        pass
+
+    if len (args) != 1:
+        print_usage()
+        die ("You need to specify the number of symbols.")
+        pass
+    try:
+        symbols = int (args[0])
+    except ValueError:
+        die ("The number of symbols must be an integer.")
+        pass
+    if symbols < 2:
+        die ("There must be at least two symbols.")
+        pass
+    if (params.get ("inline_block", 0) > 0
+        and params.get ("inline_origins", 1) + 1 >= params["inline_block"]):
+        die ("Blocks must be larger than the number of origins plus one.")
+        pass
+
+    gen = DumpGenerator (symbols, **params)
+    if outname is None:
+        gen.write (sys.stdout)
+    else:
+        out = open (outname, "w")
+        gen.write (out)
+        out.close ()
+        pass
+    return
+
+if __name__ == '__main__':
+    gen_main()
@@ -0,0 +1,238 @@
+#!/usr/bin/python
+
+# Records of the decisions of the IPA inliner, as dumped with
+# -fdump-ipa-inline-details before the symbol table, and their index
+# by the function inlined into and the origin of the inlined function,
+# so that differences in inlining found by comparing symbol tables can
+# be annotated with the estimated size and time effects of the
+# decisions behind them.
+#
+# A record starts with a "Considering CALLEE with SIZE size" line and
+# its indented lines give the caller, badness, the estimates of the
+# badness calculation and, if the call was inlined, the "Inlined into"
+# line with the new time and size of the caller.
+
+import sys
+import re
+from symtab import *
+
+number = r"([-+]?(?:[0-9]+(?:\.[0-9]*)?(?:e[-+]?[0-9]+)?|inf|nan))"
+
+considering_re = re.compile (r"Considering (.+)/([0-9]+) with (-?[0-9]+) "
+                             r"size")
+to_be_inlined_re = re.compile (r"to be inlined into (.+)/([0-9]+)"
+                               r"(?: in (.*))?$")
+badness_re = re.compile (r"Estimated badness is " + number
+                         + r"(?:, frequency " + number + ")?")
+growth_re = re.compile (r"size growth (-?[0-9]+)")
+time_re = re.compile (r"time w/o inlining " + number + r", time with inlining "
+                      + number)
+inlined_re = re.compile (r"Inlined (?:(.+)/([0-9]+) )?into (.+)/([0-9]+) "
+                         r"which now has time " + number
+                         + r" and size (-?[0-9]+), net change of "
+                         r"([-+]?[0-9]+)")
+not_inlined_re = re.compile (r"(?:not inlinable|not inlining|Not inlining)"
+                             r"[^:]*: *(.*)$")
+
+class InlineRecord (object):
+    """One decision of the inliner about a call of CALLEE in CALLER"""
+
+    def __init__(self, callee_name, callee_order, callee_size):
+        self.callee_name = callee_name
+        self.callee_order = callee_order
+        self.callee_size = callee_size
+        self.caller_name = None
+        self.caller_order = None
+        self.location = None
+        self.badness = None
+        self.frequency = None
+        self.size_growth = None
+        self.time_without = None
+        self.time_with = None
+        self.inlined = False
+        self.caller_time = None
+        self.caller_size = None
+        self.size_change = None
+        self.time_change = None
+        self.reason = None
+        return
+
+    def __repr__(self):
+        return ("InlineRecord(%s/%i -> %s/%s, inlined=%s)"
+                % (self.callee_name, self.callee_order, self.caller_name,
+                   self.caller_order, self.inlined))
+
+    def process_line (self, line):
+        """Take data from LINE, an indented line of the record"""
+
+        match = to_be_inlined_re.search (line)
+        if match:
+            self.caller_name = match.group (1)
+            self.caller_order = int (match.group (2))
+            self.location = match.group (3)
+            return
+        match = badness_re.search (line)
+        if match:
+            self.badness = float (match.group (1))
+            if match.group (2) is not None:
+                self.frequency = float (match.group (2))
+                pass
+            return
+        match = inlined_re.search (line)
+        if match:
+            self.inlined = True
+            self.caller_name = match.group (3)
+            self.caller_order = int (match.group (4))
+            self.caller_time = float (match.group (5))
+            self.caller_size = int (match.group (6))
+            self.size_change = int (match.group (7))
+            return
+        match = growth_re.search (line)
+        if match:
+            self.size_growth = int (match.group (1))
+            pass
+        match = time_re.search (line)
+        if match:
+            self.time_without = float (match.group (1))
+            self.time_with = float (match.group (2))
+            return
+        match = not_inlined_re.search (line)
+        if match:
+            self.reason = match.group (1).strip ()
+            pass
+        return
+
+def iter_inline_records (lines):
+    """Generator of InlineRecords in LINES of a dump"""
+
+    record = None
+    for line in lines:
+        if line.startswith ("Considering "):
+            if record is not None:
+                yield record
+                pass
+            match = considering_re.match (line)
+            if match:
+                record = InlineRecord (match.group (1), int (match.group (2)),
+                                       int (match.group (3)))
+            else:
+                record = None
+                pass
+            continue
+        if record is None:
+            continue
+        if line[:1] in (" ", "\t"):
+            record.process_line (line.strip ())
+        elif line.strip () != "":
+            yield record
+            record = None
+            pass
+        pass
+    if record is not None:
+        yield record
+        pass
+    return
+
+def read_inline_records (filename):
+    """Return list of InlineRecords in dump FILENAME"""
+
+    f = open (filename, "r")
+    r = list (iter_inline_records (f))
+    f.close ()
+    return r
+
+
+class InlineDecisions (object):
+    """InlineRecords of a dump indexed by the un-inlined function the call
+    ended up in and the origin of the callee, both by their orders in
+    symbol table TAB of the same dump"""
+
+    def __init__(self, tab, records):
+        self.index = {}
+        forest = tab.forest ()
+        last_time = {}
+        for r in records:
+            if r.caller_order is None:
+                continue
+            caller = tab.order_to_sym.get (r.caller_order)
+            if isinstance (caller, Function):
+                root = forest.inline_root (caller).order
+            else:
+                root = r.caller_order
+                pass
+            callee = tab.order_to_sym.get (r.callee_order)
+            if isinstance (callee, Function):
+                origin = forest.origin (callee).order
+            else:
+                origin = r.callee_order
+                pass
+
+            if r.inlined:
+                if r.time_without is not None:
+                    r.time_change = r.time_with - r.time_without
+                elif root in last_time:
+                    r.time_change = r.caller_time - last_time[root]
+                    pass
+                last_time[root] = r.caller_time
+                pass
+            self.index.setdefault ((root, origin), []).append (r)
+            pass
+        return
+
+    def records (self, f, origin):
+        """Return list of InlineRecords of calls of ORIGIN in function F"""
+        return self.index.get ((f.order, origin.order), [])
+
+    def estimates (self, f, origin):
+        """Return estimated effects of inlining ORIGIN into function F.
+
+        The result is a tuple of the sum of size changes, sum of time
+        changes (None if not known) of the inlined calls and the best
+        badness of all calls, None if there is no record."""
+
+        size = 0
+        time = None
+        badness = None
+        for r in self.records (f, origin):
+            if r.inlined:
+                size = size + (r.size_change or 0)
+                if r.time_change is not None:
+                    time = (time or 0.0) + r.time_change
+                    pass
+                pass
+            if r.badness is not None and (badness is None
+                                          or r.badness < badness):
+                badness = r.badness
+                pass
+            pass
+        return (size, time, badness)
+
+def load_inline_decisions (filename, tab):
+    """Return InlineDecisions of dump FILENAME with symbol table TAB"""
+    return InlineDecisions (tab, read_inline_records (filename))
+
+
+def inline_dump_main():
+    """Print all inlining decisions recorded in a dump"""
+
+    if len (sys.argv) != 2:
+        die ("You need to specify exactly one dump file.")
+        pass
+
+    for r in read_inline_records (sys.argv[1]):
+        if r.inlined:
+            what = "inlined, size %+i" % r.size_change
+        else:
+            what = "not inlined"
+            if r.reason:
+                what = what + " (%s)" % r.reason
+                pass
+            pass
+        print ("%s/%i into %s/%s: badness %s, %s"
+               % (r.callee_name, r.callee_order, r.caller_name,
+                  r.caller_order, r.badness, what))
+        pass
+    return
+
+if __name__ == '__main__':
+    inline_dump_main()
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+
+# Measuring where the time and memory go when a dump is loaded.  When
+# DumpSymtab.load_from_dump is given the instrument argument or the
+# SYMTAB_INSTRUMENT environment variable is set, the load is done here
+# instead, phase by phase, with symbol classes whose attribute handlers
+# count the lines they process.  A JSON report is written at the end.
+# Nothing of this is even imported when instrumentation is off.
+#
+# SYMTAB_INSTRUMENT (or a string instrument argument) is the file name
+# of the report, "-" means standard error, an empty value or 0 leaves
+# instrumentation off.  If SYMTAB_TRACEMALLOC is set to a value other
+# than an empty one or 0 and tracemalloc is available, memory
+# allocated by python is traced and reported too.
+
+import sys
+import os
+import time
+import json
+from symtab import iter_dump_symbols_parallel, section_offset
+
+timer = getattr (time, "perf_counter", time.time)
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+def counting_handler (keyword, handler, instr):
+    """Return attribute HANDLER counting its lines and time in INSTR"""
+
+    def counted (sym, val):
+        start = timer ()
+        r = handler (sym, val)
+        instr.attribute_time += timer () - start
+        instr.keyword_lines[keyword] = instr.keyword_lines.get (keyword, 0) + 1
+        return r
+    return counted
+
+def instrumented_class (cls, instr):
+    """Return a subclass of symbol class CLS reporting to INSTR"""
+
+    handlers = {}
+    for (keyword, handler) in cls.attr_handlers.items ():
+        handlers[keyword] = counting_handler (keyword, handler, instr)
+        pass
+
+    def other_attribute (self, line):
+        start = timer ()
+        cls.other_attribute (self, line)
+        instr.attribute_time += timer () - start
+        instr.other_lines += 1
+        return
+
+    def unhandled_attribute (self, line):
+        cls.unhandled_attribute (self, line)
+        key = line.split (":")[0][:60]
+        instr.unhandled[key] = instr.unhandled.get (key, 0) + 1
+        return
+
+    return type ("Instrumented" + cls.__name__, (cls,),
+                 {"attr_handlers" : handlers,
+                  "other_attribute" : other_attribute,
+                  "unhandled_attribute" : unhandled_attribute})
+
+
+class LoadInstrumentation (object):
+    """Timers, memory statistics and line counters of loading a dump"""
+
+    def __init__(self, trace_memory = False):
+        self.trace_memory = trace_memory and tracemalloc is not None
+        self.phases = []
+        self.keyword_lines = {}
+        self.other_lines = 0
+        self.unhandled = {}
+        self.attribute_time = 0.0
+        self.top_allocations = []
+        self.info = {}
+        self.phase_name = None
+        return
+
+    def start_phase (self, name):
+        self.phase_name = name
+        if self.trace_memory and hasattr (tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak ()
+            pass
+        self.phase_start = timer ()
+        return
+
+    def end_phase (self):
+        phase = {"phase" : self.phase_name,
+                 "time" : timer () - self.phase_start}
+        if self.trace_memory:
+            (current, peak) = tracemalloc.get_traced_memory ()
+            phase["traced_current"] = current
+            phase["traced_peak"] = peak
+            pass
+        self.phases.append (phase)
+        return
+
+    def load (self, tab, filename, section, sections, jobs):
+        """Load TAB from a dump like DumpSymtab.load_from_dump does"""
+
+        started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing ():
+            tracemalloc.start ()
+            started_tracing = True
+            pass
+
+        self.start_phase ("index")
+        offset = section_offset (filename, section, sections)
+        self.end_phase ()
+
+        if jobs > 1:
+            # Symbols are parsed by other processes with plain classes
+            self.start_phase ("read_dump_parallel")
+            for sym in iter_dump_symbols_parallel (filename, jobs, section,
+                                                   sections):
+                sym.symtable = tab
+                tab.add_symbol (sym)
+                pass
+            self.end_phase ()
+        else:
+            tab.function_class = instrumented_class (tab.function_class, self)
+            tab.variable_class = instrumented_class (tab.variable_class, self)
+            self.start_phase ("read_dump")
+            try:
+                tab.read_dump (filename, offset)
+            finally:
+                del tab.function_class
+                del tab.variable_class
+                pass
+            self.end_phase ()
+            self.phases[-1]["attribute_time"] = self.attribute_time
+            self.info["lines"] = tab.line_num
+            pass
+
+        self.start_phase ("fixup")
+        tab.fixup ()
+        self.end_phase ()
+        for name in tab.symbol_lists:
+            self.start_phase ("sort_" + name)
+            getattr (tab, name).sort (key=lambda sym: sym.order)
+            self.end_phase ()
+            pass
+
+        if self.trace_memory:
+            stats = tracemalloc.take_snapshot ().statistics ("lineno")
+            self.top_allocations = [str (s) for s in stats[:10]]
+            if started_tracing:
+                tracemalloc.stop ()
+                pass
+            pass
+        self.info["symbols"] = len (tab.all_symbols)
+        self.info["functions"] = len (tab.all_functions)
+        self.info["variables"] = len (tab.all_variables)
+        return
+
+    def report (self):
+        """Return dictionary with all the measurements"""
+
+        r = {"phases" : self.phases,
+             "total_time" : sum ([p["time"] for p in self.phases]),
+             "keyword_lines" : self.keyword_lines,
+             "other_lines" : self.other_lines,
+             "unhandled_attributes" : self.unhandled,
+             "unhandled_count" : sum (self.unhandled.values ())}
+        r.update (self.info)
+        if self.trace_memory:
+            r["top_allocations"] = self.top_allocations
+            pass
+        return r
+
+    def write_report (self, dest):
+        """Write the report as JSON to file name DEST, - is stderr"""
+
+        data = json.dumps (self.report (), sort_keys=True, indent=2)
+        if dest == "-":
+            sys.stderr.write (data + "\n")
+        else:
+            f = open (dest, "w")
+            f.write (data + "\n")
+            f.close ()
+            pass
+        return
+
+
+def instrumented_load (tab, instrument, filename, section, sections, jobs):
+    """Load TAB from FILENAME, measured as INSTRUMENT requests.
+
+    INSTRUMENT is a LoadInstrumentation, which just collects the data,
+    or the name of the file to write the report to, - for standard
+    error, or True to also use standard error."""
+
+    if isinstance (instrument, LoadInstrumentation):
+        instrument.load (tab, filename, section, sections, jobs)
+        return
+    if instrument is True:
+        dest = "-"
+    else:
+        dest = instrument
+        pass
+    instr = LoadInstrumentation (os.environ.get ("SYMTAB_TRACEMALLOC", "")
+                                 not in ("", "0"))
+    instr.load (tab, filename, section, sections, jobs)
+    instr.write_report (dest)
+    return
@@ -0,0 +1,247 @@
+#!/usr/bin/python
+
+# Whole-program symbol table merged from the symtab dumps of all ltrans
+# partitions of an LTO build.  The dumps are parsed in parallel and
+# symbols are unified across partitions by name and order: a symbol
+# marked in_other_partition is a boundary copy of the one defined in
+# another partition and contributes only the edges from that partition.
+# Inline copies only ever exist in their own partition, as do any
+# symbols whose order collides with a different symbol of another
+# partition, those get fresh orders above all others.
+
+import sys
+import getopt
+import multiprocessing
+from symtab import *
+
+def read_partition (args):
+    """Return list of symbols (with no table) of dump of one partition.
+
+    ARGS is a pair of the file name and the section of the dump, this
+    runs in worker processes of PartitionedSymtab.load_partitions."""
+
+    (filename, section) = args
+    syms = list (iter_dump_symbols (filename, section))
+    for sym in syms:
+        sym.symtable = None
+        pass
+    return syms
+
+def in_other_partition (sym):
+    """Return true if SYM is only a boundary copy of a symbol defined in
+    another partition"""
+    return "in_other_partition" in attr_words (sym.visibility)
+
+def partition_stats (filename, syms):
+    """Return dictionary with balance statistics of partition SYMS"""
+
+    others = set ([s.order for s in syms if in_other_partition (s)])
+    calls = 0
+    refs = 0
+    cross = 0
+    for s in syms:
+        if isinstance (s, Function):
+            calls = calls + len (s.callees_orders)
+            cross = cross + len ([o for o in s.callees_orders if o in others])
+            pass
+        refs = refs + len (s.references_orders)
+        cross = cross + len ([o for o in s.references_orders if o in others])
+        pass
+    return {"dump" : filename,
+            "symbols" : len (syms),
+            "defined" : len (syms) - len (others),
+            "functions" : len ([s for s in syms if isinstance (s, Function)]),
+            "call_edges" : calls,
+            "reference_edges" : refs,
+            "cross_partition_edges" : cross}
+
+def merge_orders (orders, more):
+    """Append to list ORDERS those of list MORE it does not contain yet"""
+
+    present = set (orders)
+    for o in more:
+        if o not in present:
+            orders.append (o)
+            present.add (o)
+            pass
+        pass
+    return
+
+
+def remap_symbol_orders (sym, m):
+    """Translate orders in SYM from its partition to global ones using M"""
+
+    sym.order = m[sym.order]
+    sym.referring_orders = [m.get (o, o) for o in sym.referring_orders]
+    sym.references_orders = [m.get (o, o) for o in sym.references_orders]
+    if isinstance (sym, Function):
+        sym.callers_orders = [m.get (o, o) for o in sym.callers_orders]
+        sym.callees_orders = [m.get (o, o) for o in sym.callees_orders]
+        if sym.is_clone:
+            sym.clone_of_order = m.get (sym.clone_of_order, sym.clone_of_order)
+            pass
+        if sym.is_inlined:
+            sym.inlined_to_order = m.get (sym.inlined_to_order,
+                                          sym.inlined_to_order)
+            pass
+        pass
+    return
+
+
+class PartitionedSymtab(DumpSymtab):
+    """Whole-program symbol table of all ltrans partitions.
+
+    Every symbol has a partition attribute, the index of the partition
+    which defines it or None if all its copies are boundary ones.
+    After loading, stats is a list of dictionaries with statistics of
+    every partition, see partition_stats."""
+
+    def __init__(self):
+        DumpSymtab.__init__ (self)
+        self.stats = []
+        return
+
+    def load_partitions (self, filenames, jobs = 1, section = None):
+        """Load and merge symbol tables of dumps FILENAMES with JOBS
+        processes, SECTION selects the table in each dump."""
+
+        tasks = [(f, section) for f in filenames]
+        if jobs > 1 and len (filenames) > 1:
+            pool = multiprocessing.Pool (min (jobs, len (filenames)))
+            try:
+                partitions = pool.map (read_partition, tasks)
+            finally:
+                pool.close ()
+                pool.join ()
+                pass
+        else:
+            partitions = [read_partition (t) for t in tasks]
+            pass
+
+        # Global orders of symbols of every partition and who defines them
+        fresh = 1 + max ([s.order for syms in partitions for s in syms] or [0])
+        keys = {}
+        names = {}
+        maps = []
+        for syms in partitions:
+            syms.sort (key=lambda sym: sym.order)
+            m = {}
+            for s in syms:
+                key = (s.name, s.order)
+                local = getattr (s, "is_inlined", False)
+                if key in keys and not local:
+                    m[s.order] = keys[key]
+                elif s.order in names:
+                    m[s.order] = fresh
+                    fresh = fresh + 1
+                else:
+                    m[s.order] = s.order
+                    if not local:
+                        keys[key] = s.order
+                        pass
+                    pass
+                names[m[s.order]] = s.name
+                pass
+            maps.append (m)
+            pass
+
+        copies = {}
+        for (p, syms) in enumerate (partitions):
+            self.stats.append (partition_stats (filenames[p], syms))
+            m = maps[p]
+            for s in syms:
+                remap_symbol_orders (s, m)
+                s.symtable = self
+                s.partition = None if in_other_partition (s) else p
+                copies.setdefault (s.order, []).append (s)
+                pass
+            pass
+
+        for order in sorted (copies.keys ()):
+            syms = copies[order]
+            defined = [s for s in syms if s.partition is not None]
+            sym = (defined or syms)[0]
+            for s in syms:
+                if s is sym:
+                    continue
+                merge_orders (sym.referring_orders, s.referring_orders)
+                if isinstance (sym, Function) and isinstance (s, Function):
+                    merge_orders (sym.callers_orders, s.callers_orders)
+                    pass
+                pass
+            self.add_symbol (sym)
+            pass
+        self.fixup ()
+        self.sort_symbols ()
+        return
+
+
+def print_usage():
+    print ("""  symtab_ltrans.py - Merge symtabs of ltrans partitions
+                     and show how balanced they are
+
+Usage: symtab_ltrans.py [options] ltrans-dump-file...
+
+Options:
+
+-h, --help           Display this help and quit.
+-j N                 Parse the dumps with N processes.
+-s N                 Use symbol table number N of every dump.
+""")
+
+def ltrans_main():
+    """The main function."""
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hj:s:", ["help"])
+    except getopt.GetoptError as err:
+        print_usage()
+        die(str(err))
+        pass
+
+    jobs = 1
+    section = None
+    try:
+        for o, a in opts:
+            if o in ("-h", "--help"):
+                print_usage()
+                sys.exit(0)
+            elif o == "-j":
+                jobs = int (a)
+            elif o == "-s":
+                section = int (a)
+                pass
+            continue
+    except ValueError as err:
+        die ("Invalid option value: %s" % str (err))
+        pass
+
+    if not args:
+        print_usage()
+        die ("You need to specify the dump files of the partitions.")
+        pass
+
+    tab = PartitionedSymtab ()
+    tab.load_partitions (args, jobs, section)
+    for (p, st) in enumerate (tab.stats):
+        print ("%i %s: %i symbols (%i defined, %i functions), %i call edges, "
+               "%i reference edges, %i cross-partition edges"
+               % (p, st["dump"], st["symbols"], st["defined"],
+                  st["functions"], st["call_edges"], st["reference_edges"],
+                  st["cross_partition_edges"]))
+        pass
+    defined = [st["defined"] for st in tab.stats]
+    cross = sum ([st["cross_partition_edges"] for st in tab.stats])
+    edges = sum ([st["call_edges"] + st["reference_edges"]
+                  for st in tab.stats])
+    print ("Whole program: %i symbols, %i functions, %i variables"
+           % (len (tab.all_symbols), len (tab.all_functions),
+              len (tab.all_variables)))
+    print ("Largest partition defines %.2f times the average, "
+           "%.1f%% of edges cross partitions"
+           % (max (defined) * len (defined) / float (max (1, sum (defined))),
+              100.0 * cross / max (1, edges)))
+    return
+
+if __name__ == '__main__':
+    ltrans_main()
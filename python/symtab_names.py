@@ -0,0 +1,161 @@
+#!/usr/bin/python
+
+# Index of symbol names of a symbol table for quick lookups by exact
+# name, name prefix, regular expression or name of the original
+# function, i.e. with clone suffixes such as .isra.0, .constprop.1,
+# .part.2 or .cold stripped.
+
+import re
+from bisect import bisect_left
+
+# Suffixes appended to names of clones by IPA-SRA, IPA-CP, function
+# splitting, hot/cold partitioning, LTO privatization, local aliases,
+# speculative devirtualization and versioning, possibly several of them
+# after each other.  Only some of them may lack a number.
+numbered_clone_kinds = ["isra", "constprop", "part", "lto_priv",
+                        "specialized", "clone"]
+unnumbered_clone_kinds = ["cold", "localalias"]
+clone_suffixes_re = re.compile (r"(?:\.(?:(?:%s)\.[0-9]+"
+                                r"|(?:%s)(?:\.[0-9]+)?))+$"
+                                % ("|".join (numbered_clone_kinds),
+                                   "|".join (unnumbered_clone_kinds)))
+clone_suffix_re = re.compile (r"\.([a-z_]+)(?:\.([0-9]+))?")
+
+# Characters with special meaning at the start of a regular expression
+regex_special = set (".^$*+?{}[]\\|()")
+
+def clone_suffixes_start (name):
+    """Return index in NAME where its clone suffixes start"""
+
+    match = clone_suffixes_re.search (name)
+    if not match or match.start () == 0:
+        return len (name)
+    return match.start ()
+
+def base_name (name):
+    """Return NAME with all clone suffixes stripped"""
+    return name[:clone_suffixes_start (name)]
+
+def clone_suffixes (name):
+    """Return list of (kind, number) pairs of clone suffixes of NAME, in
+    order, the number is -1 if the suffix has none"""
+
+    return [(kind, int (number) if number else -1)
+            for (kind, number) in clone_suffix_re.findall (
+            name[clone_suffixes_start (name):])]
+
+def clone_kinds (name):
+    """Return tuple of kinds of clone suffixes of NAME, in order"""
+    return tuple ([kind for (kind, number) in clone_suffixes (name)])
+
+def clone_numbers (name):
+    """Return tuple of numbers of clone suffixes of NAME, in order"""
+    return tuple ([number for (kind, number) in clone_suffixes (name)])
+
+def clone_key (name):
+    """Return NAME with numbers of its clone suffixes removed, so that
+    e.g. foo.constprop.3 and foo.constprop.0 have the same key"""
+
+    return base_name (name) + "".join (["." + k for k in clone_kinds (name)])
+
+def literal_prefix (pattern):
+    """Return the literal string every match of regex PATTERN starts with"""
+
+    if "|" in pattern:
+        return ""
+    r = []
+    for (i, c) in enumerate (pattern):
+        if c in regex_special:
+            # A quantifier makes the preceding character optional
+            if c in "*?{" and r:
+                r.pop ()
+                pass
+            break
+        r.append (c)
+        pass
+    return "".join (r)
+
+
+class NameIndex (object):
+    """Name lookups in a symbol table.
+
+    The index is built from all symbols of the table at construction
+    time, it does not notice symbols added later."""
+
+    def __init__(self, tab):
+        self.symtable = tab
+        self.orders = {}
+        for (name, order) in tab.name_order_pairs ():
+            l = self.orders.get (name)
+            if l is None:
+                self.orders[name] = [order]
+            else:
+                l.append (order)
+                pass
+            pass
+
+        self.names = sorted (self.orders)
+        self.base_names = {}
+        for name in self.names:
+            b = base_name (name)
+            if b in self.base_names:
+                self.base_names[b].append (name)
+            else:
+                self.base_names[b] = [name]
+                pass
+            pass
+        return
+
+    def symbols (self, names):
+        """Return list of symbols with any of NAMES, sorted by order"""
+
+        orders = []
+        for name in names:
+            orders.extend (self.orders[name])
+            pass
+        orders.sort ()
+        return [self.symtable.order_to_sym[o] for o in orders]
+
+    def lookup (self, name):
+        """Return list of symbols called exactly NAME"""
+
+        if name not in self.orders:
+            return []
+        return self.symbols ([name])
+
+    def names_with_prefix (self, prefix):
+        """Return sorted list of distinct names starting with PREFIX"""
+
+        i = bisect_left (self.names, prefix)
+        j = i
+        while j < len (self.names) and self.names[j].startswith (prefix):
+            j = j + 1
+            pass
+        return self.names[i:j]
+
+    def with_prefix (self, prefix):
+        """Return list of symbols with names starting with PREFIX"""
+        return self.symbols (self.names_with_prefix (prefix))
+
+    def with_base_name (self, name):
+        """Return list of symbols which are NAME or its clones.
+
+        Clone suffixes of NAME itself are ignored."""
+
+        return self.symbols (self.base_names.get (base_name (name), []))
+
+    def matching (self, pattern):
+        """Return list of symbols with names matching regex PATTERN.
+
+        Like re.match, the pattern must match at the beginning of the
+        name.  Only names with the literal prefix of the pattern are
+        examined and each distinct name only once."""
+
+        regex = re.compile (pattern)
+        prefix = literal_prefix (pattern)
+        if prefix:
+            candidates = self.names_with_prefix (prefix)
+        else:
+            candidates = self.names
+            pass
+        return self.symbols ([n for n in candidates if regex.match (n)])
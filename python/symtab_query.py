@@ -0,0 +1,242 @@
+#!/usr/bin/python
+
+# Ask questions about a symbol table without writing a new script for
+# each of them.  A filter expression is evaluated over whole columns of
+# a ColumnarSymtab (loaded from its cache if possible) as numpy boolean
+# masks and matching symbols can be sorted and cut to the top N.
+#
+# Example: all public comdat functions which are not inlined, with the
+# ten largest numbers of callers first:
+#
+#   symtab_query.py -w 'function & vis("public", "comdat") & ~inlined' \
+#                   -s -callers -n 10 -p callers -p callees dump
+
+import sys
+import re
+import getopt
+from symtab import *
+from symtab_cache import load_symtab
+from symtab_columnar import (numpy, FLAG_FUNCTION, FLAG_CLONE, FLAG_INLINED,
+                             FLAG_THUNK, FLAG_ADDRESS_TAKEN)
+
+# Columns of flags, usable as boolean masks in expressions
+flag_columns = {"function" : FLAG_FUNCTION,
+                "clone" : FLAG_CLONE,
+                "inlined" : FLAG_INLINED,
+                "thunk" : FLAG_THUNK,
+                "address_taken" : FLAG_ADDRESS_TAKEN}
+
+# Columns with numbers of edges of each kind of every symbol
+count_columns = ["callers", "callees", "references", "referring", "clones",
+                 "inlinees"]
+
+class QueryColumns (dict):
+    """Names usable in query expressions, computed on first use"""
+
+    def __init__(self, tab):
+        dict.__init__ (self)
+        self.symtable = tab
+        self.update ({"vis" : self.vis,
+                      "flag" : self.flag,
+                      "avail" : self.avail,
+                      "name_is" : self.name_is,
+                      "name_prefix" : self.name_prefix,
+                      "name_matches" : self.name_matches,
+                      "numpy" : numpy})
+        return
+
+    def __missing__ (self, key):
+        tab = self.symtable
+        if key in flag_columns:
+            val = (tab.column_array ("flags") & flag_columns[key]) != 0
+        elif key == "variable":
+            val = (tab.column_array ("flags") & FLAG_FUNCTION) == 0
+        elif key == "order":
+            val = tab.column_array ("orders")
+        elif key == "count":
+            val = tab.column_array ("counts")
+        elif key in count_columns:
+            val = numpy.diff (tab.column_array (key + "_offsets"))
+        else:
+            raise KeyError (key)
+        self[key] = val
+        return val
+
+    def vis (self, *words):
+        """Mask of symbols with all WORDS in their visibility"""
+        return self.symtable.word_test ("visibilities", visibility_words,
+                                        words, ())
+
+    def flag (self, *words):
+        """Mask of symbols with all WORDS in their function or varpool flags"""
+        return self.symtable.word_test ("attr_strings", flag_words, words, ())
+
+    def string_test (self, column, pred):
+        """Mask of symbols with strings in COLUMN satisfying PRED"""
+
+        tab = self.symtable
+        lookup = numpy.zeros (len (tab.pool), dtype=bool)
+        good = [i for i in tab.distinct_ids (column) if pred (tab.pool[i])]
+        lookup[good] = True
+        return lookup[tab.column_array (column)]
+
+    def avail (self, availability):
+        """Mask of symbols with the given AVAILABILITY"""
+        return self.string_test ("availabilities",
+                                 lambda s: s == availability)
+
+    def name_is (self, name):
+        return self.string_test ("names", lambda s: s == name)
+
+    def name_prefix (self, prefix):
+        return self.string_test ("names", lambda s: s.startswith (prefix))
+
+    def name_matches (self, pattern):
+        """Mask of symbols with names matching regular expression PATTERN"""
+
+        regex = re.compile (pattern)
+        return self.string_test ("names", lambda s: regex.search (s))
+
+
+def evaluate (columns, expr):
+    """Return value of query expression EXPR over COLUMNS"""
+
+    try:
+        return eval (expr, {"__builtins__" : {}}, columns)
+    except KeyError as e:
+        die ("Unknown name %s in expression %s" % (str (e), expr))
+    except (SyntaxError, NameError, TypeError, ValueError) as e:
+        die ("Cannot evaluate %s: %s" % (expr, str (e)))
+        pass
+    return
+
+def run_query (tab, where = None, sort = None, limit = None):
+    """Return numpy array of indices of symbols of TAB matching a query.
+
+    WHERE is a filter expression, SORT an expression giving the sorting
+    key, prefixed with a minus sign for descending order, and LIMIT the
+    maximum number of returned symbols."""
+
+    columns = QueryColumns (tab)
+    n = len (tab.orders)
+    if where:
+        mask = numpy.asarray (evaluate (columns, where), dtype=bool)
+        if mask.shape != (n,):
+            die ("Filter %s does not give a value for each symbol" % where)
+            pass
+        indices = numpy.nonzero (mask)[0]
+    else:
+        indices = numpy.arange (n)
+        pass
+
+    if sort:
+        descending = sort.startswith ("-")
+        if descending:
+            sort = sort[1:]
+            pass
+        key = numpy.asarray (evaluate (columns, sort))
+        if key.shape != (n,):
+            die ("Sort key %s does not give a value for each symbol" % sort)
+            pass
+        key = key[indices]
+        if descending:
+            key = -key.astype (numpy.float64)
+            pass
+        indices = indices[numpy.argsort (key, kind="stable")]
+        pass
+    if limit is not None:
+        indices = indices[:limit]
+        pass
+    return (indices, columns)
+
+def print_usage():
+    print ("""  symtab_query.py - Query a symtab dump with column expressions
+
+Usage: symtab_query.py [options] dump-file
+
+Options:
+
+-h, --help           Display this help and quit.
+-w EXPR              Only list symbols for which EXPR is true.
+-s EXPR              Sort by value of EXPR, descending if prefixed with -.
+-n N                 Only list the first N symbols.
+-p EXPR              Also print the value of EXPR, may be given repeatedly.
+-c                   Only print the number of matching symbols.
+-N                   Do not use the cache of the dump.
+
+Expressions are python expressions over numpy arrays with one item for
+each symbol, combined with &, | and ~.  Available are order, the
+execution count of functions count (-1 if not known), the boolean
+columns function, variable, clone, inlined, thunk and address_taken,
+the edge counts callers, callees, references, referring, clones and
+inlinees, and functions vis(WORD, ...), flag(WORD, ...),
+avail(AVAILABILITY), name_is(NAME), name_prefix(PREFIX)
+and name_matches(REGEX).
+""")
+
+def query_main():
+    """The main function."""
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hw:s:n:p:cN",
+                                       ["help"])
+    except getopt.GetoptError as err:
+        print_usage()
+        die(str(err))
+        pass
+
+    where = None
+    sort = None
+    limit = None
+    printed = []
+    count_only = False
+    use_cache = True
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            print_usage()
+            sys.exit(0)
+        elif o == "-w":
+            where = a
+        elif o == "-s":
+            sort = a
+        elif o == "-n":
+            try:
+                limit = int (a)
+            except ValueError:
+                die ("The number of symbols must be an integer.")
+                pass
+        elif o == "-p":
+            printed.append (a)
+        elif o == "-c":
+            count_only = True
+        elif o == "-N":
+            use_cache = False
+            pass
+        continue
+
+    if len (args) != 1:
+        print_usage()
+        die ("You need to specify exactly one dump file.")
+        pass
+    if numpy is None:
+        die ("symtab_query.py needs numpy.")
+        pass
+
+    tab = load_symtab (args[0], use_cache)
+    (indices, columns) = run_query (tab, where, sort, limit)
+    if count_only:
+        print (len (indices))
+        return
+
+    values = [numpy.asarray (evaluate (columns, e))[indices] for e in printed]
+    for (row, i) in enumerate (indices):
+        s = tab.view (int (i))
+        fields = ["%s/%i" % (s.name, s.order)]
+        fields.extend (["%s=%s" % (e, v[row]) for (e, v) in zip (printed,
+                                                                 values)])
+        print (" ".join (fields))
+        pass
+    return
+
+if __name__ == '__main__':
+    query_main()
@@ -0,0 +1,293 @@
+#!/usr/bin/python
+
+# Rendering of dot graphs with a content-addressed cache.  Every image
+# is stored under the SHA1 of the output format and the dot text, so a
+# graph which has not changed never goes through layout again.  The
+# cache directory is $SYMTAB_RENDER_CACHE or ~/.cache/symtab-render
+# and its total size is kept under a limit ($SYMTAB_RENDER_CACHE_SIZE
+# bytes, 256 MB by default) by removing the least recently used images.
+#
+# Renders which are not in the cache can run in a pool of background
+# threads, render_async returns a future of the name of the image so
+# that e.g. gdb is not blocked while dot works.  The threads only wait
+# for dot processes, so they do not need processes of their own, which
+# could not be forked safely from gdb anyway.
+
+import os
+import shutil
+import hashlib
+import subprocess
+import threading
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+default_max_bytes = 256 << 20
+
+def dot_bytes (lines):
+    """Return dot text of LINES, an iterable of strings, as bytes"""
+
+    text = "\n".join (lines)
+    if not isinstance (text, bytes):
+        text = text.encode ("utf-8")
+        pass
+    return text
+
+def run_dot (text, format, path):
+    """Render dot TEXT in FORMAT to file PATH, return PATH.
+
+    The image appears under PATH only once it is complete.  This runs in
+    worker threads of RenderCache.render_async."""
+
+    tmpname = "%s.tmp%i.%i" % (path, os.getpid (),
+                                threading.current_thread ().ident)
+    p = subprocess.Popen (["dot", "-T" + format, "-o", tmpname],
+                          stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    err = p.communicate (text)[1]
+    if p.returncode != 0:
+        try:
+            os.unlink (tmpname)
+        except EnvironmentError:
+            pass
+        raise RuntimeError ("dot failed: %s" % err.decode ("utf-8", "replace"))
+    os.rename (tmpname, path)
+    return path
+
+
+class CompletedRender (object):
+    """Already finished render with the interface of a future"""
+
+    def __init__(self, path = None, exception = None):
+        self.path = path
+        self.error = exception
+        return
+
+    def done (self):
+        return True
+
+    def result (self, timeout = None):
+        if self.error is not None:
+            raise self.error
+        return self.path
+
+    def exception (self, timeout = None):
+        return self.error
+
+    def add_done_callback (self, fn):
+        fn (self)
+        return
+
+
+class FileRender (object):
+    """Future of an image which is copied to FILENAME once FUTURE of its
+    cached image is done"""
+
+    def __init__(self, future, filename):
+        self.filename = filename
+        self.error = None
+        self.callbacks = []
+        self.lock = threading.Lock ()
+        self.event = threading.Event ()
+        future.add_done_callback (self.copy)
+        return
+
+    def copy (self, future):
+        try:
+            shutil.copyfile (future.result (), self.filename)
+        except Exception as e:
+            self.error = e
+            pass
+        self.lock.acquire ()
+        self.event.set ()
+        callbacks = self.callbacks
+        self.callbacks = []
+        self.lock.release ()
+        for fn in callbacks:
+            fn (self)
+            pass
+        return
+
+    def done (self):
+        return self.event.is_set ()
+
+    def result (self, timeout = None):
+        if not self.event.wait (timeout) and not self.event.is_set ():
+            raise RuntimeError ("Rendering of %s timed out" % self.filename)
+        if self.error is not None:
+            raise self.error
+        return self.filename
+
+    def exception (self, timeout = None):
+        try:
+            self.result (timeout)
+        except (RuntimeError, EnvironmentError) as e:
+            return e
+        return None
+
+    def add_done_callback (self, fn):
+        self.lock.acquire ()
+        if not self.event.is_set ():
+            self.callbacks.append (fn)
+            fn = None
+            pass
+        self.lock.release ()
+        if fn is not None:
+            fn (self)
+            pass
+        return
+
+
+class RenderCache (object):
+    """Directory of rendered images named by a hash of their dot text"""
+
+    def __init__(self, directory = None, max_bytes = None, workers = 2):
+        if directory is None:
+            directory = os.environ.get ("SYMTAB_RENDER_CACHE")
+            pass
+        if directory is None:
+            directory = os.path.join (os.path.expanduser ("~"), ".cache",
+                                      "symtab-render")
+            pass
+        if max_bytes is None:
+            max_bytes = int (os.environ.get ("SYMTAB_RENDER_CACHE_SIZE",
+                                             default_max_bytes))
+            pass
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.executor = None
+        self.pending = {}
+        if not os.path.isdir (directory):
+            os.makedirs (directory)
+            pass
+        return
+
+    def path (self, text, format):
+        """Return name of the cached image of dot TEXT (bytes) in FORMAT"""
+
+        h = hashlib.sha1 (format.encode ("ascii") + b"\0" + text)
+        return os.path.join (self.directory, h.hexdigest () + "." + format)
+
+    def lookup (self, path):
+        """Return true if image PATH is cached, marking it recently used"""
+
+        try:
+            os.utime (path, None)
+        except EnvironmentError:
+            return False
+        return True
+
+    def evict (self, keep = None):
+        """Remove least recently used images until the cache fits its size.
+
+        Image KEEP is never removed."""
+
+        entries = []
+        total = 0
+        for name in os.listdir (self.directory):
+            if ".tmp" in name:
+                continue
+            path = os.path.join (self.directory, name)
+            try:
+                st = os.stat (path)
+            except EnvironmentError:
+                continue
+            entries.append ((st.st_mtime, st.st_size, path))
+            total = total + st.st_size
+            pass
+        entries.sort ()
+        for (mtime, size, path) in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink (path)
+                total = total - size
+            except EnvironmentError:
+                pass
+            pass
+        return
+
+    def render (self, lines, format = "png"):
+        """Return name of the image of dot LINES, rendering it if needed"""
+
+        text = dot_bytes (lines)
+        path = self.path (text, format)
+        if not self.lookup (path):
+            run_dot (text, format, path)
+            self.evict (path)
+            pass
+        return path
+
+    def render_async (self, lines, format = "png"):
+        """Return a future of the name of the image of dot LINES.
+
+        Images which are not cached are rendered in background
+        threads, at most once even when requested again before they
+        are finished."""
+
+        text = dot_bytes (lines)
+        path = self.path (text, format)
+        future = self.pending.get (path)
+        if future is not None:
+            return future
+        if self.lookup (path):
+            return CompletedRender (path)
+        if ThreadPoolExecutor is None:
+            try:
+                run_dot (text, format, path)
+            except (RuntimeError, EnvironmentError) as e:
+                return CompletedRender (exception=e)
+            self.evict (path)
+            return CompletedRender (path)
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor (self.workers)
+            pass
+        future = self.executor.submit (run_dot, text, format, path)
+        self.pending[path] = future
+        future.add_done_callback (lambda f: self.finished (path, f))
+        return future
+
+    def finished (self, path, future):
+        self.pending.pop (path, None)
+        if future.exception () is None:
+            self.evict (path)
+            pass
+        return
+
+    def shutdown (self, wait = True):
+        """Stop the background threads, waiting for renders if WAIT"""
+
+        if self.executor is not None:
+            self.executor.shutdown (wait)
+            self.executor = None
+            pass
+        return
+
+
+# Cache used by produce_dot and display_dot of symtab.py
+default_cache = None
+
+def render_cache ():
+    global default_cache
+    if default_cache is None:
+        default_cache = RenderCache ()
+        pass
+    return default_cache
+
+def render_to_file (lines, filename, format = "png"):
+    """Render dot LINES in FORMAT to FILENAME, through the cache"""
+
+    shutil.copyfile (render_cache ().render (lines, format), filename)
+    return
+
+def render_to_file_async (lines, filename, format = "png"):
+    """Return future of rendering dot LINES in FORMAT to FILENAME.
+
+    The result of the future is FILENAME once the image is there."""
+
+    return FileRender (render_cache ().render_async (lines, format), filename)
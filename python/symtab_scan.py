@@ -0,0 +1,118 @@
+#!/usr/bin/python
+
+# Single pass over the symbol table in a (possibly huge) dump, listing
+# or counting symbols with the given properties.  Symbols are streamed
+# one by one so the table is never loaded into memory as a whole.
+
+import sys
+import getopt
+from symtab import *
+
+def print_usage():
+    print ("""  symtab_scan.py - List or count symbols in a symtab dump
+
+Usage: symtab_scan.py [options] dump-file
+
+Options:
+
+-h, --help           Display this help and quit.
+-f                   Only consider functions.
+-V                   Only consider variables.
+-t                   Only consider thunks.
+-i                   Only consider inline copies.
+-v WORD              Only consider symbols with WORD in their visibility.
+-a AVAILABILITY      Only consider symbols with the given availability.
+-c                   Only print the number of matching symbols.
+-s N                 Scan symbol table number N (counted from zero) in
+                     the dump rather than the first one.
+-l                   Only list byte offsets of all symbol tables in the dump.
+""")
+
+def scan_main():
+    """The main function."""
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hfVtiv:a:cs:l",
+                                       ["help"])
+    except getopt.GetoptError as err:
+        print_usage()
+        die(str(err))
+        pass
+
+    kind = None
+    thunks = False
+    inlined = False
+    visibility = []
+    availability = None
+    count_only = False
+    section = None
+    list_sections = False
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            print_usage()
+            sys.exit(0)
+        elif o == "-f":
+            kind = Function
+        elif o == "-V":
+            kind = Variable
+        elif o == "-t":
+            thunks = True
+        elif o == "-i":
+            inlined = True
+        elif o == "-v":
+            visibility.append (a)
+        elif o == "-a":
+            availability = a
+        elif o == "-c":
+            count_only = True
+        elif o == "-s":
+            try:
+                section = int (a)
+            except ValueError:
+                die ("The section number must be an integer.")
+                pass
+        elif o == "-l":
+            list_sections = True
+            pass
+        continue
+
+    if len (args) != 1:
+        print_usage()
+        die ("You need to specify exactly one dump file.")
+        pass
+
+    if list_sections:
+        for (i, offset) in enumerate (index_dump_sections (args[0])):
+            print ("%i: %i" % (i, offset))
+            pass
+        return
+
+    count = 0
+    for sym in iter_dump_symbols (args[0], section):
+        if kind is not None and not isinstance (sym, kind):
+            continue
+        if ((thunks or inlined) and not isinstance (sym, Function)
+            or thunks and not sym.is_thunk
+            or inlined and not sym.is_inlined):
+            continue
+        if availability is not None and sym.availability != availability:
+            continue
+        if visibility:
+            words = attr_words (sym.visibility)
+            if [w for w in visibility if w not in words]:
+                continue
+            pass
+
+        count = count + 1
+        if not count_only:
+            print ("%s/%i" % (sym.name, sym.order))
+            pass
+        pass
+
+    if count_only:
+        print (count)
+        pass
+    return
+
+if __name__ == '__main__':
+    scan_main()
@@ -0,0 +1,184 @@
+#!/usr/bin/python
+
+# Publishing a ColumnarSymtab in shared memory so that worker processes
+# of a multiprocessing pool can use it without parsing the dump again
+# or receiving a pickled copy.  The columns are laid out exactly like
+# in a cache file (see symtab_cache.py) in one shared memory block and
+# workers attach to it by name, their columns are read-only memoryviews
+# of the block, so there is a single copy of the table in memory no
+# matter how many workers run.
+#
+# This needs multiprocessing.shared_memory of python 3.8 or newer.
+#
+# Typical use:
+#
+#   seg = publish (load_symtab ("foo.dump"))
+#   pool = shared_pool (seg, 8)
+#   results = pool.map (analyze_root, orders)
+#
+# where analyze_root calls shared_symtab () to get the table.
+
+import sys
+from symtab import die
+from symtab_columnar import SymbolViews
+from symtab_cache import serialize_columns, deserialize_columns
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+if shared_memory is not None:
+    class AttachedMemory (shared_memory.SharedMemory):
+        """Shared memory block which tables may still use when collected"""
+
+        def __del__ (self):
+            try:
+                self.close ()
+            except BufferError:
+                # Columns refer to the mapping, it goes away with them
+                pass
+            return
+        pass
+    pass
+
+def require_shared_memory ():
+    if shared_memory is None:
+        raise RuntimeError ("Shared memory symtabs need python 3.8 or newer")
+    return
+
+class SharedSymtabSegment (object):
+    """Shared memory block holding a published symbol table.
+
+    The process which published the table owns the block and must call
+    unlink once no worker needs it any more, which also closes it."""
+
+    def __init__(self, tab):
+        require_shared_memory ()
+        pieces = serialize_columns (tab, {})
+        size = sum ([len (p) for p in pieces])
+        self.shm = shared_memory.SharedMemory (create=True, size=max (1, size))
+        pos = 0
+        for p in pieces:
+            self.shm.buf[pos:pos + len (p)] = p
+            pos = pos + len (p)
+            pass
+        self.name = self.shm.name
+        self.size = size
+        return
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, exc_type, exc_value, traceback):
+        self.unlink ()
+        return False
+
+    def unlink (self):
+        """Close and remove the block"""
+
+        if self.shm is not None:
+            self.shm.close ()
+            self.shm.unlink ()
+            self.shm = None
+            pass
+        return
+
+def publish (tab):
+    """Copy ColumnarSymtab TAB to a new SharedSymtabSegment and return it"""
+    return SharedSymtabSegment (tab)
+
+def attach (name):
+    """Return ColumnarSymtab stored in shared memory block NAME.
+
+    Nothing is copied, the columns refer directly to the shared memory,
+    which is kept mapped as long as the table exists."""
+
+    require_shared_memory ()
+    try:
+        # Only the publisher may remove the block, see bpo-39959
+        shm = AttachedMemory (name=name, track=False)
+    except TypeError:
+        shm = AttachedMemory (name=name)
+        pass
+    (tab, header) = deserialize_columns (shm.buf.toreadonly (),
+                                         check_crc=False)
+    # Avoid an array of all indices in every process
+    tab.all_symbols = SymbolViews (tab, range (len (tab.orders)))
+    tab.shared_memory = shm
+    return tab
+
+# The table attached by a worker process of shared_pool
+worker_symtab = None
+
+def attach_worker (name):
+    """Initializer of pool workers attaching to shared memory block NAME"""
+
+    global worker_symtab
+    worker_symtab = attach (name)
+    return
+
+def shared_symtab ():
+    """Return the table shared with this worker process"""
+    return worker_symtab
+
+def shared_pool (segment, processes = None):
+    """Return multiprocessing.Pool whose workers attach to SEGMENT.
+
+    Functions run by the pool get the table from shared_symtab."""
+
+    import multiprocessing
+    return multiprocessing.Pool (processes, attach_worker, (segment.name,))
+
+
+def count_reachable (order):
+    """Return number of functions reachable from the function with ORDER"""
+
+    tab = shared_symtab ()
+    i = tab.order_index (order)
+    seen = set ([i])
+    todo = [i]
+    while todo:
+        for j in tab.edge_targets ("callees", todo.pop ()):
+            if j not in seen:
+                seen.add (j)
+                todo.append (j)
+                pass
+            pass
+        pass
+    return (order, len (seen))
+
+def shm_main():
+    """Count functions reachable from every function without callers"""
+
+    from symtab_cache import load_symtab
+
+    if len (sys.argv) not in (2, 3):
+        die ("You need to specify a dump file and optionally the number "
+             "of processes.")
+        pass
+    try:
+        processes = int (sys.argv[2]) if len (sys.argv) == 3 else None
+    except ValueError:
+        die ("The number of processes must be an integer.")
+        pass
+
+    tab = load_symtab (sys.argv[1])
+    offsets = tab.callers_offsets
+    orders = [tab.orders[i] for i in tab.uninlined_indices
+              if offsets[i] == offsets[i + 1]]
+    with publish (tab) as seg:
+        pool = shared_pool (seg, processes)
+        try:
+            for (order, count) in pool.imap (count_reachable, orders, 64):
+                print ("%i %i" % (order, count))
+                pass
+        finally:
+            pool.close ()
+            pool.join ()
+            pass
+        pass
+    return
+
+if __name__ == '__main__':
+    shm_main()
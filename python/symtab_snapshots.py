@@ -0,0 +1,242 @@
+#!/usr/bin/python
+
+# Series of snapshots of a symbol table, such as the tables dumped
+# after consecutive IPA passes.  Only the first snapshot is stored in
+# full, every later one as a delta against its predecessor: symbols
+# added, removed and changed, and call and reference edges added and
+# removed.  Any snapshot can be turned back into a complete DumpSymtab
+# when needed.
+
+import sys
+from collections import namedtuple
+from symtab import *
+from symtab_columnar import word_attr_string
+
+# Everything known about a symbol, edges are tuples of orders
+SymbolRecord = namedtuple ("SymbolRecord", [
+    "name", "is_function", "visibility", "availability", "attrs",
+    "address_taken", "referring", "references", "unhandled",
+    "clone_of", "inlined_to", "is_thunk", "count", "count_quality",
+    "callers", "callees", "callees_counts", "callees_freqs",
+    "callees_edge_flags"])
+
+def symbol_record (sym):
+    """Return SymbolRecord describing symbol SYM"""
+
+    common = [sym.name, isinstance (sym, Function),
+              word_attr_string (sym.visibility),
+              word_attr_string (sym.availability),
+              word_attr_string (sym.attrs), sym.address_taken,
+              tuple (sym.referring_orders), tuple (sym.references_orders),
+              tuple (sym.unhandled_attributes)]
+    if not isinstance (sym, Function):
+        return SymbolRecord (*(common + [-1, -1, False, -1, "",
+                                         (), (), (), (), ()]))
+    return SymbolRecord (*(common + [
+                sym.clone_of_order if sym.is_clone else -1,
+                sym.inlined_to_order if sym.is_inlined else -1,
+                sym.is_thunk, sym.count, sym.count_quality,
+                tuple (sym.callers_orders),
+                tuple (sym.callees_orders), tuple (sym.callees_counts),
+                tuple (sym.callees_freqs), tuple (sym.callees_edge_flags)]))
+
+def record_symbol (tab, order, rec):
+    """Return a symbol of table TAB with ORDER described by record REC"""
+
+    if rec.is_function:
+        sym = Function (tab, rec.name, order)
+        if rec.clone_of >= 0:
+            sym.is_clone = True
+            sym.clone_of_order = rec.clone_of
+            pass
+        if rec.inlined_to >= 0:
+            sym.is_inlined = True
+            sym.inlined_to_order = rec.inlined_to
+            pass
+        sym.is_thunk = rec.is_thunk
+        sym.count = rec.count
+        sym.count_quality = rec.count_quality
+        sym.callers_orders = list (rec.callers)
+        sym.callees_orders = list (rec.callees)
+        sym.callees_counts = list (rec.callees_counts)
+        sym.callees_freqs = list (rec.callees_freqs)
+        sym.callees_edge_flags = list (rec.callees_edge_flags)
+    else:
+        sym = Variable (tab, rec.name, order)
+        pass
+    vis = simple_attr_value (rec.visibility)
+    sym.visibility = vis if vis != "" else []
+    sym.availability = simple_attr_value (rec.availability)
+    sym.attrs = simple_attr_value (rec.attrs)
+    sym.address_taken = rec.address_taken
+    sym.referring_orders = list (rec.referring)
+    sym.references_orders = list (rec.references)
+    sym.unhandled_attributes = list (rec.unhandled)
+    return sym
+
+def record_edges (order, rec):
+    """Return set of (kind, source, target) edges going out of record REC"""
+
+    r = set ([("call", order, o) for o in rec.callees])
+    r.update ([("reference", order, o) for o in rec.references])
+    return r
+
+
+class SnapshotDelta (object):
+    """Difference between a snapshot and its predecessor.
+
+    ADDED and CHANGED map orders to new records, REMOVED is a set of
+    orders, EDGES_ADDED and EDGES_REMOVED are sets of (kind, source,
+    target) tuples where kind is "call" or "reference"."""
+
+    def __init__(self, old, new):
+        self.added = {}
+        self.changed = {}
+        self.removed = set ()
+        self.edges_added = set ()
+        self.edges_removed = set ()
+        for (order, rec) in new.items ():
+            prev = old.get (order)
+            if prev is None:
+                self.added[order] = rec
+                self.edges_added.update (record_edges (order, rec))
+            elif prev != rec:
+                self.changed[order] = rec
+                old_edges = record_edges (order, prev)
+                new_edges = record_edges (order, rec)
+                self.edges_added.update (new_edges - old_edges)
+                self.edges_removed.update (old_edges - new_edges)
+                pass
+            pass
+        for (order, rec) in old.items ():
+            if order not in new:
+                self.removed.add (order)
+                self.edges_removed.update (record_edges (order, rec))
+                pass
+            pass
+        return
+
+    def __len__ (self):
+        """Return number of symbols the delta touches"""
+        return len (self.added) + len (self.changed) + len (self.removed)
+
+    def apply (self, records):
+        """Turn dictionary of RECORDS of the predecessor into this snapshot"""
+
+        for order in self.removed:
+            del records[order]
+            pass
+        records.update (self.added)
+        records.update (self.changed)
+        return
+
+
+class SnapshotSeries (object):
+    """Symbol tables stored as the first one and deltas of the others"""
+
+    def __init__(self):
+        self.base = None
+        self.deltas = []
+        self.names = []
+        self.last = None
+        return
+
+    def __len__ (self):
+        return len (self.names)
+
+    def add_symbols (self, symbols, name = None):
+        """Append snapshot consisting of SYMBOLS, an iterable of symbols.
+
+        The symbols need not be fixed up, only their orders of other
+        symbols are used."""
+
+        records = {}
+        for sym in symbols:
+            records[sym.order] = symbol_record (sym)
+            pass
+        if self.base is None:
+            self.base = records
+        else:
+            self.deltas.append (SnapshotDelta (self.last, records))
+            pass
+        self.last = records
+        self.names.append (name)
+        return
+
+    def add_table (self, tab, name = None):
+        """Append snapshot of the whole symbol table TAB"""
+        self.add_symbols (tab.all_symbols, name)
+        return
+
+    def add_dump (self, filename, section = None, name = None,
+                  sections = None):
+        """Append snapshot of symbol table SECTION of dump FILENAME.
+
+        Symbols are streamed from the dump, no table is built.
+        SECTIONS are offsets of all tables of the dump if already known,
+        see index_dump_sections."""
+
+        self.add_symbols (iter_dump_symbols (filename, section, sections),
+                          name)
+        return
+
+    def delta (self, k):
+        """Return SnapshotDelta of snapshot K (from 1) against K - 1"""
+        return self.deltas[k - 1]
+
+    def records (self, k):
+        """Return dictionary of records of all symbols of snapshot K"""
+
+        if k < 0:
+            k = k + len (self)
+            pass
+        if k == len (self) - 1:
+            return dict (self.last)
+        records = dict (self.base)
+        for d in self.deltas[:k]:
+            d.apply (records)
+            pass
+        return records
+
+    def materialize (self, k):
+        """Return snapshot K as a fixed up DumpSymtab"""
+
+        tab = DumpSymtab ()
+        for (order, rec) in self.records (k).items ():
+            tab.add_symbol (record_symbol (tab, order, rec))
+            pass
+        tab.fixup ()
+        tab.sort_symbols ()
+        return tab
+
+
+def load_series (filename):
+    """Return SnapshotSeries of all symbol tables in dump FILENAME"""
+
+    series = SnapshotSeries ()
+    sections = index_dump_sections (filename)
+    for i in range (len (sections)):
+        series.add_dump (filename, i, "%s:%i" % (filename, i), sections)
+        pass
+    return series
+
+def snapshots_main():
+    """Print how symbol tables in a dump change from one to the next"""
+
+    if len (sys.argv) != 2:
+        die ("You need to specify exactly one dump file.")
+        pass
+
+    series = load_series (sys.argv[1])
+    print ("Table 0: %i symbols" % len (series.base))
+    for k in range (1, len (series)):
+        d = series.delta (k)
+        print ("Table %i: %i added, %i removed, %i changed symbols, "
+               "%i added, %i removed edges"
+               % (k, len (d.added), len (d.removed), len (d.changed),
+                  len (d.edges_added), len (d.edges_removed)))
+        pass
+    return
+
+if __name__ == '__main__':
+    snapshots_main()
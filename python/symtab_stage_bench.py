@@ -0,0 +1,226 @@
+#!/usr/bin/python
+
+# Benchmark of the stages of DumpSymtab.load_from_dump: reading the
+# dump, fixing up links between symbols and sorting.  Wall time and peak
+# RSS of every stage are measured, each repetition in a fresh process,
+# and reported as JSON along with the git revision of this directory,
+# so that results of different commits can be collected in one file
+# and compared.
+
+import sys
+import os
+import time
+import json
+import getopt
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from symtab import *
+from symtab_cache import file_digest
+from symtab_gen_dump import DumpGenerator
+
+def reset_peak_rss ():
+    """Start measuring peak RSS anew, return False if not possible"""
+
+    try:
+        f = open ("/proc/self/clear_refs", "w")
+        f.write ("5")
+        f.close ()
+    except EnvironmentError:
+        return False
+    return True
+
+def rss_kb ():
+    """Return (current, peak) resident set size of the process in kB"""
+
+    try:
+        f = open ("/proc/self/status")
+        fields = {}
+        for line in f:
+            parts = line.split ()
+            if len (parts) >= 2:
+                fields[parts[0]] = parts[1]
+                pass
+            pass
+        f.close ()
+        return (int (fields["VmRSS:"]), int (fields["VmHWM:"]))
+    except (EnvironmentError, KeyError, ValueError):
+        import resource
+        peak = resource.getrusage (resource.RUSAGE_SELF).ru_maxrss
+        return (None, peak)
+
+def run_stages (args):
+    """Load a dump stage by stage, return number of symbols and results.
+
+    ARGS is a pair of the dump file name and the section to load."""
+
+    (filename, section) = args
+    tab = DumpSymtab ()
+    stages = [("read_dump", lambda: tab.read_dump (
+                    filename, section_offset (filename, section))),
+              ("fixup", tab.fixup),
+              ("sort", tab.sort_symbols)]
+    r = []
+    for (name, stage) in stages:
+        resettable = reset_peak_rss ()
+        (start_rss, start_peak) = rss_kb ()
+        start = time.time ()
+        stage ()
+        elapsed = time.time () - start
+        (end_rss, peak) = rss_kb ()
+        r.append ({"stage" : name,
+                   "time" : elapsed,
+                   "start_rss_kb" : start_rss,
+                   "end_rss_kb" : end_rss,
+                   "peak_rss_kb" : peak,
+                   "peak_is_per_stage" : resettable})
+        pass
+    return (len (tab.all_symbols), r)
+
+def git_revision ():
+    """Return git revision of this directory and whether it is modified"""
+
+    here = os.path.dirname (os.path.abspath (__file__))
+    try:
+        p = subprocess.Popen (["git", "rev-parse", "HEAD"], cwd=here,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        rev = p.communicate ()[0].decode ("ascii").strip ()
+        if p.returncode != 0:
+            return (None, None)
+        p = subprocess.Popen (["git", "diff", "--quiet", "HEAD", "--", "."],
+                              cwd=here)
+        p.communicate ()
+        return (rev, p.returncode != 0)
+    except EnvironmentError:
+        return (None, None)
+
+def bench_stages (filename, section = None, repeat = 3):
+    """Return a dictionary with results of benchmarking load of FILENAME.
+
+    The best time and the largest peak RSS of every stage out of REPEAT
+    runs are reported."""
+
+    runs = []
+    for i in range (repeat):
+        pool = multiprocessing.Pool (1)
+        runs.append (pool.apply (run_stages, ((filename, section),)))
+        pool.close ()
+        pool.join ()
+        pass
+
+    stages = []
+    for (i, first) in enumerate (runs[0][1]):
+        results = [run[1][i] for run in runs]
+        stage = dict (first)
+        stage["time"] = min ([s["time"] for s in results])
+        stage["peak_rss_kb"] = max ([s["peak_rss_kb"] for s in results])
+        stages.append (stage)
+        pass
+
+    (rev, dirty) = git_revision ()
+    return {"revision" : rev,
+            "modified" : dirty,
+            "date" : time.strftime ("%Y-%m-%dT%H:%M:%S"),
+            "python" : platform.python_version (),
+            "machine" : platform.machine (),
+            "dump" : os.path.basename (filename),
+            "dump_size" : os.stat (filename).st_size,
+            "dump_sha1" : file_digest (filename),
+            "section" : section,
+            "repeat" : repeat,
+            "symbols" : runs[0][0],
+            "total_time" : sum ([s["time"] for s in stages]),
+            "stages" : stages}
+
+def print_usage():
+    print ("""  symtab_stage_bench.py - Time the stages of loading a symtab dump
+
+Usage: symtab_stage_bench.py [options] dump-file
+       symtab_stage_bench.py [options] -G number-of-symbols
+
+Options:
+
+-h, --help           Display this help and quit.
+-r N                 Run the benchmark N times, 3 by default.
+-s N                 Load symbol table number N of the dump.
+-G                   Benchmark a dump generated by symtab_gen_dump.py with
+                     default parameters and the given number of symbols.
+-o FILE              Append results as one line of JSON to FILE.
+""")
+
+def stage_bench_main():
+    """The main function."""
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hr:s:Go:", ["help"])
+    except getopt.GetoptError as err:
+        print_usage()
+        die(str(err))
+        pass
+
+    repeat = 3
+    section = None
+    generate = False
+    outname = None
+    try:
+        for o, a in opts:
+            if o in ("-h", "--help"):
+                print_usage()
+                sys.exit(0)
+            elif o == "-r":
+                repeat = int (a)
+            elif o == "-s":
+                section = int (a)
+            elif o == "-G":
+                generate = True
+            elif o == "-o":
+                outname = a
+                pass
+            continue
+    except ValueError as err:
+        die ("Invalid option value: %s" % str (err))
+        pass
+
+    if len (args) != 1 or repeat < 1:
+        print_usage()
+        die ("You need to specify exactly one dump file or symbol count.")
+        pass
+
+    if generate:
+        try:
+            symbols = int (args[0])
+        except ValueError:
+            die ("The number of symbols must be an integer.")
+            pass
+        (fd, filename) = tempfile.mkstemp (prefix="symtab-", suffix=".dump")
+        out = os.fdopen (fd, "w")
+        DumpGenerator (symbols).write (out)
+        out.close ()
+    else:
+        filename = args[0]
+        pass
+
+    try:
+        result = bench_stages (filename, section, repeat)
+    finally:
+        if generate:
+            os.unlink (filename)
+            pass
+        pass
+    if generate:
+        result["dump"] = "generated:%i" % symbols
+        pass
+
+    if outname is None:
+        print (json.dumps (result, sort_keys=True, indent=2))
+    else:
+        out = open (outname, "a")
+        out.write (json.dumps (result, sort_keys=True))
+        out.write ("\n")
+        out.close ()
+        pass
+    return
+
+if __name__ == '__main__':
+    stage_bench_main()